@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк классификатора: predict() по одному сообщению против predict_batch()
+пачками разного размера и против MicroBatcher при параллельных запросах.
+"""
+
+import asyncio
+import random
+import time
+
+from src.ml.batcher import MicroBatcher
+from src.ml.classifier import predict, predict_batch
+
+MESSAGES = 2000
+BATCH_SIZES = [1, 8, 32, 128]
+CONCURRENCY = 64
+
+TEMPLATES = [
+    "Ищем {role} разработчика в команду, удалённо, зарплата от {salary} руб. Пишите @hr_{n}",
+    "Вакансия: {role} developer, опыт от {years} лет. Резюме на jobs{n}@company.com",
+    "Требуется {role} на проект, полная занятость, офис в Алматы. Контакты: https://t.me/hr_{n}",
+    "Всем привет! Кто-нибудь знает хороший курс по {role}?",
+    "Продам ноутбук, почти новый, {salary} руб",
+    "Сегодня митап по {role}, приходите в {years} вечера",
+    "ок",
+    "спасибо, помогло 👍",
+]
+ROLES = ["Python", "Frontend", "Backend", "Fullstack", "DevOps", "QA", "Data Science", "iOS"]
+
+
+def make_corpus(n):
+    rnd = random.Random(42)
+    return [
+        rnd.choice(TEMPLATES).format(
+            role=rnd.choice(ROLES), salary=rnd.randint(100, 900) * 1000,
+            years=rnd.randint(1, 7), n=i,
+        )
+        for i in range(n)
+    ]
+
+
+def bench_single(corpus):
+    started = time.perf_counter()
+    for text in corpus:
+        predict(text)
+    return time.perf_counter() - started
+
+
+def bench_batch(corpus, batch_size):
+    started = time.perf_counter()
+    for i in range(0, len(corpus), batch_size):
+        predict_batch(corpus[i:i + batch_size])
+    return time.perf_counter() - started
+
+
+async def bench_micro_batcher(corpus):
+    """CONCURRENCY воркеров шлют по одному сообщению, как воркеры очереди парсера."""
+    batcher = MicroBatcher(predict_batch)
+    it = iter(corpus)
+
+    async def worker():
+        for text in it:
+            await batcher.predict(text)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return time.perf_counter() - started, batcher.stats()
+
+
+def main():
+    corpus = make_corpus(MESSAGES)
+    predict(corpus[0])  # прогрев
+
+    single = bench_single(corpus)
+    print(f"🐢 predict() по одному: {MESSAGES / single:.0f} сообщ/сек ({single * 1000 / MESSAGES:.3f} мс на сообщение)")
+
+    for size in BATCH_SIZES:
+        elapsed = bench_batch(corpus, size)
+        print(f"📦 predict_batch(), пачка {size:>3}: {MESSAGES / elapsed:.0f} сообщ/сек "
+              f"(x{single / elapsed:.1f})")
+
+    elapsed, stats = asyncio.run(bench_micro_batcher(corpus))
+    print(f"🚀 MicroBatcher, {CONCURRENCY} параллельных запросов: {MESSAGES / elapsed:.0f} сообщ/сек "
+          f"(x{single / elapsed:.1f}), средняя пачка {stats['avg_batch']:.1f}")
+
+    # Результаты должны совпадать с одиночным predict
+    for text, (label, prob) in zip(corpus[:200], predict_batch(corpus[:200])):
+        single_label, single_prob = predict(text)
+        assert single_label == label and abs(single_prob - prob) < 1e-9, text
+    print("✅ predict_batch совпадает с predict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк извлечения контактов из текста сообщения (без HTTP):
+старая реализация (несколько re.findall + BeautifulSoup на каждое сообщение)
+против однопроходного extract_contacts из src/parser/message_parser.py.
+"""
+
+import random
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from src.parser.message_parser import extract_contacts
+
+MESSAGES = 5000
+ROUNDS = 3
+
+PLAIN_TEMPLATES = [
+    "Ищем {role} разработчика в продуктовую команду.\nТребования: опыт от {years} лет, SQL, Git.\n"
+    "Условия: удалёнка, ЗП от {salary} руб.\nРезюме: hr{n}@company{n}.kz или @hr_manager_{n}",
+    "🔥 Вакансия: {role} developer\n📍 Алматы / remote\n💰 {salary}$\nПодробнее: https://hh.kz/vacancy/{n}?utm_source=tg\n"
+    "Откликнуться: https://t.me/recruiter_{n}",
+    "Всем привет! Кто-нибудь проходил курс по {role}? Стоит того?",
+    "Спасибо за митап, слайды тут https://disk.example.com/s/{n}",
+    "#вакансия #{role}\nКомпания ищет {role}, опыт {years}+.\nКонтакты: jobs@bigtech{n}.com, telegram: @bigtech_hr{n}",
+    "ок, договорились",
+]
+HTML_TEMPLATE = (
+    '<b>Вакансия {role}</b>\nОпыт {years}+ лет. Пишите <a href="https://t.me/hr_html_{n}">HR</a> '
+    'или на <a href="mailto:cv{n}@corp.com">почту</a>'
+)
+ROLES = ["Python", "Frontend", "Backend", "DevOps", "QA", "Android", "Data"]
+
+
+def legacy_extract(text):
+    """Копия старого extract_contacts_from_text без скачивания страниц."""
+    emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
+    usernames = []
+    links = re.findall(r"https?://\S+", text)
+    soup = BeautifulSoup(text, "html.parser")
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if "t.me/" in href or "telegram.me/" in href:
+            uname = re.search(r"t\.me/([a-zA-Z0-9_]{3,32})", href)
+            if uname:
+                usernames.append("@" + uname.group(1))
+    usernames += re.findall(r"@([a-zA-Z0-9_]{3,32})", text)
+    usernames = ["@" + u if not u.startswith("@") else u for u in usernames]
+    return list(set(emails)), list(set(usernames)), links
+
+
+def make_corpus(n):
+    rnd = random.Random(7)
+    corpus = []
+    for i in range(n):
+        template = HTML_TEMPLATE if rnd.random() < 0.1 else rnd.choice(PLAIN_TEMPLATES)
+        corpus.append(template.format(
+            role=rnd.choice(ROLES), years=rnd.randint(1, 6), salary=rnd.randint(100, 900) * 1000, n=i,
+        ))
+    return corpus
+
+
+def bench(fn, corpus):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    corpus = make_corpus(MESSAGES)
+    legacy = bench(legacy_extract, corpus)
+    new = bench(extract_contacts, corpus)
+    print(f"🧪 {MESSAGES} сообщений (~10% с HTML-разметкой), лучший из {ROUNDS} прогонов")
+    print(f"🐢 Старое извлечение: {legacy * 1e6 / MESSAGES:.1f} мкс/сообщение")
+    print(f"🚀 extract_contacts:  {new * 1e6 / MESSAGES:.1f} мкс/сообщение (x{legacy / new:.1f})")
+
+    for title, part in (("без разметки", [t for t in corpus if "<" not in t]),
+                        ("с HTML", [t for t in corpus if "<" in t])):
+        legacy_part = bench(legacy_extract, part)
+        new_part = bench(extract_contacts, part)
+        print(f"   {title}: {legacy_part * 1e6 / len(part):.1f} -> {new_part * 1e6 / len(part):.1f} мкс/сообщение")
+
+    # Старые правила находили "username" внутри email (hr@company.kz -> @company)
+    sample = corpus[0]
+    print(f"\nПример: {sample!r}")
+    print(f"  старое: {legacy_extract(sample)}")
+    print(f"  новое:  {extract_contacts(sample)}")
+
+
+if __name__ == "__main__":
+    main()
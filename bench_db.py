@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Стоимость работы с БД на одно сообщение-вакансию:
+- было: sqlite3.connect() на каждый вызов, журнал DELETE, fsync на каждый коммит;
+- стало: долгоживущее соединение потока, WAL + настроенные PRAGMA, кэш запросов.
+
+Путь сообщения: save_job → already_sent → mark_sent → notification_already_sent → save_job_notification.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from src.db import database
+
+MESSAGES = 300
+
+
+def legacy_save_job(text, h):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        conn.execute("""INSERT OR IGNORE INTO jobs
+                        (text, chat_id, msg_id, prob, usernames, emails, links, hash)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                     (text, "chat", "1", 0.9, "@hr_user", "hr@corp.com", "", h))
+
+
+def legacy_already_sent(username):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        cur = conn.execute("""SELECT sent_at FROM jobs_sent
+                              WHERE username=? AND sent_at > datetime('now', '-1 day')
+                              ORDER BY sent_at DESC LIMIT 1""", (username,))
+        return cur.fetchone() is not None
+
+
+def legacy_mark_sent(username, h):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        conn.execute("INSERT INTO jobs_sent (username, text_hash, sent_at) VALUES (?, ?, datetime('now'))",
+                     (username, h))
+
+
+def legacy_notification_already_sent(h, user):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        cur = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE job_hash = ? AND sent_to_user = ?",
+                           (h, user))
+        return cur.fetchone()[0] > 0
+
+
+def legacy_save_job_notification(h, msg_id, user):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        conn.execute("""INSERT INTO job_notifications (job_hash, notification_msg_id, sent_to_user, status)
+                        VALUES (?, ?, ?, 'pending')""", (h, msg_id, user))
+
+
+def run_legacy(prefix):
+    for i in range(MESSAGES):
+        text = f"{prefix} вакансия Python-разработчик №{i}"
+        h = database._hash_text(text)
+        username = f"hr_{prefix}_{i}"
+        legacy_save_job(text, h)
+        if not legacy_already_sent(username):
+            legacy_mark_sent(username, h)
+        if not legacy_notification_already_sent(h, "bench"):
+            legacy_save_job_notification(h, str(i), "bench")
+
+
+def run_current(prefix):
+    for i in range(MESSAGES):
+        text = f"{prefix} вакансия Python-разработчик №{i}"
+        h = database.save_job(text, "chat", "1", 0.9, ["@hr_user"], ["hr@corp.com"], [])
+        username = f"hr_{prefix}_{i}"
+        if not database.already_sent(username, h):
+            database.mark_sent(username, h)
+        if not database.notification_already_sent(h, "bench"):
+            database.save_job_notification(h, str(i), "bench")
+
+
+def measure(title, fn, prefix):
+    started = time.perf_counter()
+    fn(prefix)
+    elapsed = time.perf_counter() - started
+    per_message = elapsed / MESSAGES * 1000
+    print(f"⏱ {title}: {elapsed:.2f} с на {MESSAGES} сообщений, {per_message:.2f} мс/сообщение")
+    return per_message
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Было: отдельная БД в режиме по умолчанию (журнал DELETE, synchronous=FULL)
+        database.DB_PATH = os.path.join(tmp, "legacy.sqlite3")
+        database.init_db()
+        database.close_connections()
+        with sqlite3.connect(database.DB_PATH) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        before = measure("было: connect на каждый вызов", run_legacy, "legacy")
+
+        database.DB_PATH = os.path.join(tmp, "current.sqlite3")
+        database.init_db()
+        after = measure("стало: долгоживущее соединение + WAL", run_current, "current")
+        database.close_connections()
+
+    print(f"🚀 Ускорение: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Время init_db при большой таблице jobs_sent (по умолчанию 1M строк, ~10% дублей
+и username в разном регистре / с "@"):
+- было: на каждом старте cleanup_duplicate_usernames — вся таблица в Python,
+  DELETE FROM jobs_sent и вставка всех строк обратно по одной;
+- стало: первый старт — миграция 3 (три set-based SQL-запроса + уникальный индекс),
+  последующие старты — миграций нет, таблица не трогается.
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from src.db import database
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DUPLICATE_EVERY = 10  # каждая 10-я запись — дубль предыдущей с другим написанием username
+
+
+def build_legacy_db(path):
+    """БД в состоянии до миграции 3 (без уникального ключа), заполненная ROWS записями."""
+    database.DB_PATH = path
+    migrations = database.MIGRATIONS
+    database.MIGRATIONS = [m for m in migrations if m[0] < 3]
+    try:
+        database.init_db()
+    finally:
+        database.MIGRATIONS = migrations
+
+    def rows():
+        for i in range(ROWS):
+            if i % DUPLICATE_EVERY == DUPLICATE_EVERY - 1:
+                n = i - 1
+                yield f"@HR_{n}", f"hash{n % 1000}"
+            else:
+                yield f"hr_{i}", f"hash{i % 1000}"
+
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO jobs_sent (username, text_hash, sent_at) VALUES (?, ?, datetime('now'))",
+                         rows())
+    database.close_connections()
+
+
+def legacy_cleanup_duplicate_usernames(path):
+    """Копия старой cleanup_duplicate_usernames, выполнявшейся на каждом старте."""
+    with sqlite3.connect(path) as conn:
+        records = conn.execute("SELECT username, text_hash, sent_at FROM jobs_sent").fetchall()
+        normalized_records = {}
+        for username, text_hash, sent_at in records:
+            key = (database._normalize_username(username), text_hash)
+            if key not in normalized_records:
+                normalized_records[key] = (key[0], text_hash, sent_at)
+        conn.execute("DELETE FROM jobs_sent")
+        for normalized_username, text_hash, sent_at in normalized_records.values():
+            conn.execute("INSERT INTO jobs_sent (username, text_hash, sent_at) VALUES (?, ?, ?)",
+                         (normalized_username, text_hash, sent_at))
+    return len(normalized_records)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "base.sqlite3")
+        print(f"📦 Заполняем jobs_sent: {ROWS} строк...")
+        build_legacy_db(base)
+
+        legacy = os.path.join(tmp, "legacy.sqlite3")
+        shutil.copy(base, legacy)
+        elapsed, left = timed(legacy_cleanup_duplicate_usernames, legacy)
+        print(f"⏱ было: очистка дублей на каждом старте — {elapsed:.2f} с (осталось {left} строк)")
+
+        database.DB_PATH = os.path.join(tmp, "current.sqlite3")
+        shutil.copy(base, database.DB_PATH)
+        elapsed, _ = timed(database.init_db)
+        with database.connection() as conn:
+            left = conn.execute("SELECT COUNT(*) FROM jobs_sent").fetchone()[0]
+        print(f"⏱ стало: первый старт с миграцией 3 — {elapsed:.2f} с (осталось {left} строк)")
+
+        database.close_connections()
+        elapsed, _ = timed(database.init_db)
+        print(f"⏱ стало: обычный старт — {elapsed * 1000:.1f} мс")
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк обогащения ссылок: старый последовательный requests.get
+против асинхронного LinkEnricher. Страницы отдаёт локальный HTTP-сервер
+с искусственной задержкой, так что сеть не нужна.
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.parser.link_enricher import LinkEnricher, MAX_CONCURRENT_REQUESTS
+from src.parser.message_parser import extract_page_contacts
+
+PAGE_DELAY = 0.5   # задержка ответа "сайта", сек
+LINKS_PER_MESSAGE = 5
+MESSAGES = 10
+
+PAGE_HTML = """<html><body>
+<h1>Вакансия: Python разработчик</h1>
+<p>Пишите на hr{n}@company.com или в телеграм @hr_manager_{n}</p>
+<a href="https://t.me/recruiter_{n}">Рекрутер</a>
+</body></html>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Локальная заглушка job-борда: отвечает с задержкой HTML-страницей с контактами."""
+
+    def do_GET(self):
+        time.sleep(PAGE_DELAY)
+        n = self.path.strip("/").split("/")[-1] or "0"
+        body = PAGE_HTML.format(n=n).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_messages(base_url):
+    return [
+        [f"{base_url}/vacancy/{m * LINKS_PER_MESSAGE + i}" for i in range(LINKS_PER_MESSAGE)]
+        for m in range(MESSAGES)
+    ]
+
+
+def bench_sequential(messages):
+    """Старое поведение: requests.get по одной ссылке внутри обработчика."""
+    started = time.perf_counter()
+    found = 0
+    for links in messages:
+        for link in links:
+            response = requests.get(link, timeout=5, headers={"User-Agent": "Mozilla/5.0"})
+            if response.status_code == 200:
+                emails, usernames = extract_page_contacts(response.text)
+                found += len(emails) + len(usernames)
+    return time.perf_counter() - started, found
+
+
+async def bench_async(messages):
+    """Новое поведение: сообщения обрабатываются параллельно, ссылки внутри — тоже."""
+    # Все "сайты" здесь живут на одном 127.0.0.1, поэтому доменный лимит
+    # поднимаем до глобального — иначе меряли бы один домен, а не реальный поток.
+    enricher = LinkEnricher(max_per_domain=MAX_CONCURRENT_REQUESTS)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(enricher.enrich(links) for links in messages))
+    elapsed = time.perf_counter() - started
+    await enricher.close()
+    found = sum(len(emails) + len(usernames) for emails, usernames in results)
+    return elapsed, found
+
+
+async def bench_loop_stall(messages):
+    """Сколько event loop был заблокирован, пока шло обогащение одного сообщения."""
+    enricher = LinkEnricher()
+    max_gap = 0.0
+    stop = False
+
+    async def ticker():
+        nonlocal max_gap
+        last = time.perf_counter()
+        while not stop:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last - 0.01)
+            last = now
+
+    tick_task = asyncio.create_task(ticker())
+    await enricher.enrich(messages[0])
+    stop = True
+    await tick_task
+    await enricher.close()
+    return max_gap
+
+
+def main():
+    server = start_stand_in_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    messages = make_messages(base_url)
+    total_links = MESSAGES * LINKS_PER_MESSAGE
+    print(f"🧪 {MESSAGES} сообщений по {LINKS_PER_MESSAGE} ссылок, задержка страницы {PAGE_DELAY} сек")
+
+    seq_time, seq_found = bench_sequential(messages)
+    print(f"🐢 Последовательно (requests): {seq_time:.2f} сек, "
+          f"{total_links / seq_time:.1f} ссылок/сек, контактов: {seq_found}")
+
+    async_time, async_found = asyncio.run(bench_async(messages))
+    print(f"🚀 Асинхронно (LinkEnricher): {async_time:.2f} сек, "
+          f"{total_links / async_time:.1f} ссылок/сек, контактов: {async_found}")
+    print(f"📈 Ускорение: x{seq_time / async_time:.1f}")
+
+    stall = asyncio.run(bench_loop_stall(messages))
+    print(f"⏱ Максимальная блокировка event loop при обогащении: {stall * 1000:.1f} мс "
+          f"(раньше — {PAGE_DELAY * LINKS_PER_MESSAGE * 1000:.0f} мс на сообщение)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
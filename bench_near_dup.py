@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Поиск почти одинаковых вакансий (src/parser/near_dup.py): время assign() в зависимости
+от размера индекса, доля найденных репостов с мелкими правками и ложные склейки
+разных вакансий. Для сравнения — точный хэш текста (_hash_text), который видит
+только побайтовые повторы.
+
+python bench_near_dup.py [кластеров в индексе]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from src.db.database import _hash_text
+from src.parser.near_dup import NearDupIndex, signature, similarity
+
+CLUSTERS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+REPOSTS = 2000
+
+EMOJI = ["🔥", "🚀", "💼", "✅", "⚡", "📢", ""]
+TAGS = ["#вакансия", "#job", "#remote", "#python", "#frontend", "#удалёнка", "#it"]
+WORDS = ["ищем", "разработчика", "удалённо", "офис", "зарплата", "опыт", "лет", "команда", "проект", "стартап",
+         "senior", "middle", "junior", "remote", "требования", "условия", "график", "гибкий", "бонусы", "python",
+         "django", "react", "golang", "kubernetes", "postgresql", "docker", "typescript", "аналитик", "данных"]
+
+
+def make_job(rnd, n):
+    lines = [f"{rnd.choice(EMOJI)} Вакансия: {rnd.choice(WORDS)} {rnd.choice(WORDS)} в компанию company{n}"]
+    for _ in range(rnd.randint(5, 9)):
+        lines.append("- " + " ".join(rnd.choices(WORDS, k=rnd.randint(4, 9))))
+    lines.append(f"Зарплата от {rnd.randint(100, 400)} 000 руб")
+    lines.append(f"Контакты: @hr_company{n} {rnd.choice(TAGS)}")
+    return "\n".join(lines)
+
+
+def perturb(rnd, text):
+    """Репост с мелкими правками: другой эмодзи, хэштег, порядок пары строк, одно слово."""
+    lines = text.split("\n")
+    kind = rnd.choice(["emoji", "tag", "reorder", "word"])
+    if kind == "emoji":
+        lines[0] = rnd.choice(EMOJI[:-1]) + "" + lines[0]
+    elif kind == "tag":
+        lines[-1] += " " + rnd.choice(TAGS)
+    elif kind == "reorder":
+        i, j = rnd.sample(range(1, len(lines) - 2), 2)
+        lines[i], lines[j] = lines[j], lines[i]
+    else:
+        i = rnd.randrange(1, len(lines) - 2)
+        words = lines[i].split()
+        words[rnd.randrange(len(words))] = rnd.choice(WORDS)
+        lines[i] = " ".join(words)
+    return "\n".join(lines), kind
+
+
+def main():
+    rnd = random.Random(7)
+    index = NearDupIndex(max_clusters=CLUSTERS)
+    jobs = []
+
+    timings = []
+    false_merges = 0
+    checkpoints = {CLUSTERS // 10, CLUSTERS // 2, CLUSTERS}
+    for n in range(CLUSTERS):
+        text = make_job(rnd, n)
+        jobs.append(text)
+        started = time.perf_counter()
+        cluster_hash, _ = index._assign(_hash_text(text), text)
+        timings.append(time.perf_counter() - started)
+        if cluster_hash != _hash_text(text):
+            false_merges += 1
+        if n + 1 in checkpoints:
+            last = sorted(timings[-1000:])
+            print(f"📦 {n + 1:>6} кластеров: assign p50 {statistics.median(last) * 1000:.3f} мс, "
+                  f"p95 {last[int(len(last) * 0.95)] * 1000:.3f} мс, "
+                  f"кандидатов в среднем {index.stats()['avg_candidates']:.2f}")
+
+    found = exact = 0
+    by_kind = {}
+    sims = []
+    for _ in range(REPOSTS):
+        original = rnd.choice(jobs)
+        repost, kind = perturb(rnd, original)
+        cluster_hash, _ = index._assign(_hash_text(repost), repost)
+        hit = cluster_hash == _hash_text(original)
+        found += hit
+        exact += _hash_text(repost) == _hash_text(original)
+        total, hits = by_kind.get(kind, (0, 0))
+        by_kind[kind] = (total + 1, hits + hit)
+        sims.append(similarity(signature(original), signature(repost)))
+
+    print(f"\n♻ Репосты с правками: найдено {found}/{REPOSTS} ({found / REPOSTS:.1%}), "
+          f"точный хэш нашёл бы {exact}/{REPOSTS}")
+    for kind, (total, hits) in sorted(by_kind.items()):
+        print(f"   {kind:<8} {hits}/{total}")
+    print(f"   оценка сходства репост/оригинал: медиана {statistics.median(sims):.2f}, минимум {min(sims):.2f}")
+    print(f"🚫 Ложные склейки разных вакансий: {false_merges}/{CLUSTERS}")
+    print(f"💾 Память индекса: ~{index.memory_bytes() / 2 ** 20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Задержка /search (FTS5, bm25 по всем совпадениям) на большом корпусе против LIKE '%...%' по jobs.text.
+Частые слова (remote, python) совпадают с сотнями тысяч строк — это худший случай ранжирования.
+
+Корпус — синтетические вакансии: ~50 слов (словарь с распределением Ципфа,
+типичные слова вакансий, 1–3 стека), по умолчанию 1M строк: python bench_search.py [строк]
+"""
+
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.bot.search import PAGE_SIZE, parse_search_query
+from src.db import database
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+RUNS = 20
+DEEP_OFFSET = 100 * PAGE_SIZE   # далёкая страница: OFFSET не бесплатен и для FTS5
+
+STACKS = ["python", "django", "fastapi", "javascript", "react", "vue", "golang", "rust", "java", "kotlin",
+          "postgresql", "kubernetes", "docker", "typescript", "nodejs", "csharp", "dotnet", "php", "laravel", "swift"]
+WORDS = ["ищем", "разработчика", "удалённо", "офис", "зарплата", "опыт", "лет", "команда", "проект", "стартап",
+         "senior", "middle", "junior", "remote", "вакансия", "требования", "условия", "график", "гибкий", "бонусы"]
+VOCABULARY = 50_000      # прочие слова — псевдослова с распределением Ципфа, как в живом тексте
+WORDS_PER_JOB = 40
+CHATS = [f"-100{n}" for n in range(200)]
+
+QUERIES = [
+    "remote",                   # частое слово: ~20% корпуса
+    "python",                   # частый стек
+    "python django",            # два стека
+    "js react remote",          # синоним стека + частое слово
+    "rust senior chat:-1007",   # фильтр по чату
+    "kotlin swift laravel",     # редкое сочетание
+    "разраб*",                  # префикс
+    "laravel swift гибкий chat:-10042",  # мало совпадений: LIKE проходит всю таблицу
+]
+
+
+def build_corpus(path):
+    database.DB_PATH = path
+    database.init_db()
+    rnd = random.Random(42)
+    syllables = ["ка", "ро", "ми", "та", "ле", "но", "ви", "ба", "зу", "ще", "ты", "пэ", "гу", "дэ", "жо", "фи"]
+    vocabulary = ["".join(rnd.choices(syllables, k=rnd.randint(2, 4))) + str(n) for n in range(VOCABULARY)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+
+    def rows():
+        for i in range(ROWS):
+            words = rnd.choices(vocabulary, cum_weights=cum_weights, k=WORDS_PER_JOB)
+            words += rnd.sample(WORDS, 4) + rnd.sample(STACKS, rnd.randint(1, 3))
+            rnd.shuffle(words)
+            yield " ".join(words), rnd.choice(CHATS), rnd.random(), f"h{i}"
+
+    started = time.perf_counter()
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO jobs (text, chat_id, prob, hash) VALUES (?, ?, ?, ?)", rows())
+        conn.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('optimize')")
+    print(f"📦 Корпус: {ROWS} вакансий за {time.perf_counter() - started:.1f} с")
+
+
+def measure(fn):
+    times = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[len(times) // 2] * 1000, times[int(len(times) * 0.95) - 1] * 1000
+
+
+def like_search(query):
+    """Тот же поиск без индекса и без ранжирования: первая страница самых свежих совпадений через LIKE."""
+    words = [w for w in query.split() if not w.startswith("chat:")]
+    chats = [w[5:] for w in query.split() if w.startswith("chat:")]
+    where = " AND ".join(["text LIKE ?"] * len(words) + ["chat_id = ?"] * len(chats))
+    with database.connection() as conn:
+        return conn.execute(f"SELECT hash FROM jobs WHERE {where} ORDER BY id DESC LIMIT ?",
+                            [f"%{w.rstrip('*')}%" for w in words] + chats + [PAGE_SIZE + 1]).fetchall()
+
+
+def count_matches(groups, chat_id):
+    """Сколько строк ранжирует bm25 для запроса (весь корпус, без LIMIT)."""
+    fts_query = " AND ".join("(" + " OR ".join(database._fts_phrase(p) for p in group) + ")" for group in groups)
+    chat_join, params = "", [fts_query]
+    if chat_id is not None:
+        chat_join, params = "JOIN jobs c ON c.id = jobs_fts.rowid AND c.chat_id = ?", [chat_id, fts_query]
+    with database.connection() as conn:
+        return conn.execute(f"SELECT count(*) FROM jobs_fts {chat_join} WHERE jobs_fts MATCH ?", params).fetchone()[0]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        build_corpus(os.path.join(tmp, "search.sqlite3"))
+        for query in QUERIES:
+            groups, chat_id = parse_search_query(query)
+            matches = count_matches(groups, chat_id)
+            p50, p95 = measure(lambda: database.search_jobs(groups, chat_id, 0, PAGE_SIZE + 1))
+            deep_p50, _ = measure(lambda: database.search_jobs(groups, chat_id, DEEP_OFFSET, PAGE_SIZE + 1))
+            like_p50, _ = measure(lambda: like_search(query))
+            print(f"⏱ {query!r}: FTS5 p50 {p50:.2f} мс, p95 {p95:.2f} мс, страница {DEEP_OFFSET // PAGE_SIZE + 1} "
+                  f"{deep_p50:.2f} мс (совпадений {matches}) | LIKE p50 {like_p50:.2f} мс")
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
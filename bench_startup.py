@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Время старта классификатора, каждый замер — в отдельном свежем процессе:
+- как было: импорт модуля = joblib + sklearn-пикли + стоп-слова NLTK;
+- как стало: импорт модуля (ленивый) и warm_up с pickle / с компактной моделью.
+"""
+
+import json
+import subprocess
+import sys
+
+RUNS = 5
+
+SNIPPETS = {
+    "было: eager-импорт (joblib + pickle + NLTK)": """
+import time
+t = time.perf_counter()
+import joblib
+model = joblib.load("src/ml/classifier.pkl")
+vectorizer = joblib.load("src/ml/vectorizer.pkl")
+try:
+    from nltk.corpus import stopwords
+    stop_words = set(stopwords.words('russian')) | set(stopwords.words('english'))
+except LookupError:
+    pass
+ready = time.perf_counter() - t
+print(ready)
+""",
+    "стало: import src.ml.classifier": """
+import time
+t = time.perf_counter()
+import src.ml.classifier
+print(time.perf_counter() - t)
+""",
+    "стало: import + warm_up('sklearn')": """
+import time
+t = time.perf_counter()
+from src.ml.classifier import warm_up
+warm_up("sklearn")
+print(time.perf_counter() - t)
+""",
+    "стало: import + warm_up('compact')": """
+import time
+t = time.perf_counter()
+from src.ml.classifier import warm_up
+warm_up("compact")
+print(time.perf_counter() - t)
+""",
+}
+
+
+def measure(snippet):
+    times = []
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", snippet],
+                             capture_output=True, text=True, check=True).stdout
+        times.append(float(out.strip().splitlines()[-1]))
+    return min(times), sum(times) / len(times)
+
+
+def main():
+    results = {}
+    for title, snippet in SNIPPETS.items():
+        best, avg = measure(snippet)
+        results[title] = {"best_ms": round(best * 1000, 1), "avg_ms": round(avg * 1000, 1)}
+        print(f"⏱ {title}: лучшее {best * 1000:.1f} мс, среднее {avg * 1000:.1f} мс")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,61 @@
 import asyncio
 from src.bot.bot import start_bot, bot
-from src.parser.telethone_client import start_parser, set_bot_instance, client
-from src.bot.notifications import set_telethon_client
+from src.parser.telethone_client import start_parser, set_bot_instance, client, near_dup
+from src.bot.notifications import set_telethon_client, set_notification_bot
 from src.db.database import init_db
+from src.db import async_db
+from src.db.retention import retention_scheduler
+from src.bot.outbox import outbox_scheduler
+from src.bot.peer_cache import peer_resolver
+from src.bot.broadcaster import broadcaster
+from src.utils.email_sender import mailer
+from src.ml.classifier import warm_up
 
 async def main():
     init_db()  # создаём таблицы, если их нет
     
+    # Загружаем модель заранее (в потоке), чтобы первое сообщение не ждало
+    await asyncio.to_thread(warm_up)
+
+    # Индекс почти одинаковых вакансий (подписи последних кластеров из БД)
+    await near_dup.warm()
+
+    # Индекс дедупликации в памяти (already_sent / notification_already_sent без БД)
+    await async_db.warm_dedup_index()
+
+    # Кэш username -> peer для контактов последних вакансий (без RPC)
+    await peer_resolver.warm()
+    
     # Передаем экземпляр бота в парсер для отправки уведомлений
     set_bot_instance(bot)
     
     # Передаем Telethon клиент в модуль уведомлений
     set_telethon_client(client)
+
+    # Бот для обновления уведомлений по результатам отправок резюме
+    set_notification_bot(bot)
+    
+    # Фоновая очистка старых данных (небольшими пачками)
+    retention_scheduler.start()
+
+    # Очередь отправки резюме (с лимитом скорости и повтором после FloodWait)
+    outbox_scheduler.start()
+
+    # Дайджесты уведомлений (для получателей в режиме digest)
+    broadcaster.start()
     
-    await asyncio.gather(
-        start_parser(),  # Telethon userbot (чтение чатов + автоотправка резюме)
-        start_bot()      # Aiogram bot (команды /jobs и т.п.)
-    )
+    try:
+        await asyncio.gather(
+            start_parser(),  # Telethon userbot (чтение чатов + автоотправка резюме)
+            start_bot()      # Aiogram bot (команды /jobs и т.п.)
+        )
+    finally:
+        await broadcaster.stop()
+        await outbox_scheduler.stop()
+        await mailer.close()
+        await retention_scheduler.stop()
+        # Дописываем в БД всё, что ещё стоит в очереди писателя
+        await async_db.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
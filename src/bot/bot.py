@@ -1,47 +1,81 @@
 from aiogram import Bot, Dispatcher, types
-from aiogram.filters import Command
+from aiogram import F
+from aiogram.filters import Command, CommandObject
 from config.config import BOT_TOKEN
-from src.db.database import get_recent_jobs, get_pending_notifications_count
+from src.db.async_db import get_jobs_page, get_pending_notifications_count, get_stats, rebuild_counters, search_jobs
+from src.db.retention import retention_scheduler
 from src.bot.handlers import split_message
 from src.bot.notifications import handle_notification_callback
-import sqlite3
+from src.bot.broadcaster import broadcaster, DIGEST_MINUTES
+from src.bot import jobs_list, search
+from src.utils.metrics import format_metrics
 from datetime import datetime
 
+# --- Настройки ---
+# Кому доступны подписка на уведомления (в них контакты рекрутеров) и служебные команды:
+# chat id или user id; по умолчанию — владелец (чат из прежнего TARGET_CHAT_IDS)
+ADMIN_CHAT_IDS = {"1011374221"}
+
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 
+async def _require_admin(message: types.Message) -> bool:
+    """True, если команду прислал администратор (из его личного чата или из группы, где он состоит); иначе отказ."""
+    user_id = message.from_user.id if message.from_user else None
+    if str(message.chat.id) in ADMIN_CHAT_IDS or str(user_id) in ADMIN_CHAT_IDS:
+        return True
+    print(f"⛔ Команда {message.text!r} от чата {message.chat.id} (user {user_id}) отклонена: не администратор")
+    await message.answer("⛔ Эта команда доступна только администратору бота.")
+    return False
+
 @dp.message(Command("start"))
 async def start(message: types.Message):
-    await message.answer("Привет! Я ищу вакансии и автоматически отправляю резюме по найденным контактам.\n\n📋 <b>Команды:</b>\n• /jobs - последние найденные вакансии\n• /notifications - ожидающие уведомления\n• /stats - статистика откликов\n• /cleanup - очистка старых данных\n• /myid - получить ваш Chat ID для настройки уведомлений\n\n📨 <b>Уведомления:</b>\nПри нахождении новой вакансии вы получите уведомление с кнопками для отклика.", parse_mode="HTML")
+    await message.answer("Привет! Я ищу вакансии и автоматически отправляю резюме по найденным контактам.\n\n📋 <b>Команды:</b>\n• /jobs [min:0.8] [chat:&lt;id&gt;] [from:2026-10-01] [to:2026-10-18] [contacts] - найденные вакансии\n• /search &lt;запрос&gt; - поиск по вакансиям (например: /search python django chat:-100123)\n• /notifications - ожидающие уведомления\n• /stats - статистика откликов\n• /rebuild_stats - пересчитать статистику\n• /cleanup - очистка старых данных\n• /convert_db - разрешить уменьшение файла БД после очистки (разово)\n• /metrics - внутренние метрики\n• /subscribe [digest [минут]] - получать уведомления (сразу или дайджестом)\n• /unsubscribe - отписаться от уведомлений\n• /myid - получить ваш Chat ID\n\n📨 <b>Уведомления:</b>\nПри нахождении новой вакансии вы получите уведомление с кнопками для отклика.", parse_mode="HTML")
+
+async def _jobs_page(filters: dict, before_id: int = None, after_id: int = None):
+    """Текст и клавиатура одной страницы /jobs."""
+    rows, has_older, has_newer = await get_jobs_page(before_id, after_id, jobs_list.JOBS_PAGE_SIZE,
+                                                     **jobs_list.query_args(filters))
+    return jobs_list.format_page(rows, filters), jobs_list.page_keyboard(rows, filters, has_older, has_newer)
 
 @dp.message(Command("jobs"))
-async def jobs(message: types.Message):
-    rows = get_recent_jobs(limit=10)
-    if not rows:
-        await message.answer("Пока вакансий нет.")
+async def jobs(message: types.Message, command: CommandObject):
+    """Найденные вакансии постранично: /jobs [min:0.8] [chat:<id>] [from:...] [to:...] [contacts]"""
+    try:
+        filters = jobs_list.parse_jobs_args(command.args)
+    except ValueError as e:
+        await message.answer(f"Непонятный фильтр: {e}\n"
+                             "Использование: /jobs [min:0.8] [chat:<id>] [from:2026-10-01] [to:2026-10-18] [contacts]")
         return
+    text, keyboard = await _jobs_page(filters)
+    await message.answer(text, reply_markup=keyboard)
 
-    # компактный список превью
-    lines = []
-    for text, usernames, emails, links, prob, created_at in rows:
-        preview = (text.replace("\n", " ").strip()[:200] + ("…" if len(text) > 200 else ""))
-        parts = []
-        if usernames:
-            parts.append("@" + usernames.split(",")[0])
-        if emails:
-            parts.append(emails.split(",")[0])
-        if links:
-            parts.append(links.split(",")[0])
-        contact = " | ".join(parts) if parts else "контактов нет"
-        lines.append(f"• {preview}\n  score: {prob:.2f} | {contact}")
-
-    full = "Последние вакансии:\n\n" + "\n\n".join(lines)
-    for chunk in split_message(full):
-        await message.answer(chunk)
+async def _search_page(query_text: str, query_id: int, offset: int):
+    """Текст и клавиатура одной страницы результатов /search."""
+    groups, chat_id = search.parse_search_query(query_text)
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    rows = await search_jobs(groups, chat_id, offset, search.PAGE_SIZE + 1)
+    has_next = len(rows) > search.PAGE_SIZE
+    rows = rows[:search.PAGE_SIZE]
+    return (search.format_results(query_text, rows, offset),
+            search.results_keyboard(query_id, rows, offset, has_next))
+
+@dp.message(Command("search"))
+async def search_command(message: types.Message, command: CommandObject):
+    """Полнотекстовый поиск по вакансиям: /search <слова> [chat:<id>]"""
+    query_text = (command.args or "").strip()
+    if not search.parse_search_query(query_text)[0]:
+        await message.answer("Использование: /search &lt;слова&gt; [chat:&lt;id&gt;]\n"
+                             "Например: /search python django или /search js remote chat:-100123",
+                             parse_mode="HTML")
+        return
+    query_id = search.save_query(query_text)
+    text, keyboard = await _search_page(query_text, query_id, 0)
+    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
 
 @dp.message(Command("notifications"))
 async def notifications(message: types.Message):
-    count = get_pending_notifications_count()
+    count = await get_pending_notifications_count()
     if count == 0:
         await message.answer("Нет ожидающих уведомлений о вакансиях.")
     else:
@@ -50,25 +84,13 @@ async def notifications(message: types.Message):
 @dp.message(Command("stats"))
 async def stats(message: types.Message):
     """Показывает статистику откликов"""
-    import sqlite3
-    
-    with sqlite3.connect("data/db.sqlite3") as conn:
-        # Общее количество вакансий
-        total_jobs = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
-        
-        # Количество отправленных резюме
-        total_sent = conn.execute("SELECT COUNT(*) FROM jobs_sent").fetchone()[0]
-        
-        # Статистика уведомлений
-        confirmed = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'confirmed'").fetchone()[0]
-        skipped = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'skipped'").fetchone()[0]
-        pending = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'pending'").fetchone()[0]
-        
-        # Последние 5 откликов
-        recent_sent = conn.execute("""
-            SELECT username, sent_at FROM jobs_sent 
-            ORDER BY sent_at DESC LIMIT 5
-        """).fetchall()
+    stats_data = await get_stats()
+    total_jobs = stats_data["total_jobs"]
+    total_sent = stats_data["total_sent"]
+    confirmed = stats_data["confirmed"]
+    skipped = stats_data["skipped"]
+    pending = stats_data["pending"]
+    recent_sent = stats_data["recent_sent"]
     
     stats_text = f"📊 <b>Статистика откликов:</b>\n\n"
     stats_text += f"📋 Всего вакансий найдено: {total_jobs}\n"
@@ -78,6 +100,19 @@ async def stats(message: types.Message):
     stats_text += f"❌ Пропущено: {skipped}\n"
     stats_text += f"⏳ Ожидает: {pending}\n\n"
     
+    stats_text += f"🗓 <b>По периодам</b> (вакансии / резюме / подтверждено / пропущено):\n"
+    for window, title in (("today", "Сегодня"), ("7d", "7 дней"), ("30d", "30 дней")):
+        counts = stats_data["windows"][window]
+        stats_text += (f"• {title}: {counts['jobs']} / {counts['sent']} / "
+                       f"{counts['status:confirmed']} / {counts['status:skipped']}\n")
+    stats_text += "\n"
+    
+    if stats_data["top_chats"]:
+        stats_text += f"💬 <b>Чаты-источники:</b>\n"
+        for chat_id, count in stats_data["top_chats"]:
+            stats_text += f"• {chat_id}: {count}\n"
+        stats_text += "\n"
+    
     if recent_sent:
         stats_text += f"📅 <b>Последние отклики:</b>\n"
         for username, sent_at in recent_sent:
@@ -85,37 +120,97 @@ async def stats(message: types.Message):
     
     await message.answer(stats_text, parse_mode="HTML")
 
+@dp.message(Command("rebuild_stats"))
+async def rebuild_stats(message: types.Message):
+    """Пересчитывает счётчики /stats по исходным таблицам"""
+    if not await _require_admin(message):
+        return
+    started = datetime.now()
+    rows = await rebuild_counters()
+    elapsed = (datetime.now() - started).total_seconds()
+    await message.answer(f"🔄 Счётчики статистики пересчитаны: {rows} записей за {elapsed:.1f} с")
+
 @dp.message(Command("cleanup"))
 async def cleanup(message: types.Message):
-    """Очищает старые уведомления и записи"""
-    import sqlite3
-    
-    with sqlite3.connect("data/db.sqlite3") as conn:
-        # Удаляем уведомления старше 30 дней
-        old_notifications = conn.execute("""
-            DELETE FROM job_notifications 
-            WHERE created_at < datetime('now', '-30 days')
-        """).rowcount
-        
-        # Удаляем записи об отправке старше 30 дней
-        old_sent = conn.execute("""
-            DELETE FROM jobs_sent 
-            WHERE sent_at < datetime('now', '-30 days')
-        """).rowcount
-        
-        # Удаляем вакансии старше 60 дней
-        old_jobs = conn.execute("""
-            DELETE FROM jobs 
-            WHERE created_at < datetime('now', '-60 days')
-        """).rowcount
+    """Запускает очистку старых данных в фоне и показывает её прогресс"""
+    # Удаляет планировщик небольшими пачками, команда не ждёт окончания (повторный /cleanup — прогресс)
+    started = retention_scheduler.request_run()
+    progress = retention_scheduler.progress()
+    deleted = progress["deleted"]
     
-    cleanup_text = f"🧹 <b>Очистка завершена:</b>\n\n"
-    cleanup_text += f"🗑️ Удалено уведомлений: {old_notifications}\n"
-    cleanup_text += f"🗑️ Удалено записей об отправке: {old_sent}\n"
-    cleanup_text += f"🗑️ Удалено вакансий: {old_jobs}\n"
+    if started:
+        cleanup_text = f"🧹 <b>Очистка запущена в фоне.</b> Повторите /cleanup, чтобы увидеть прогресс.\n\n"
+        if progress["last_finished"]:
+            last = datetime.fromtimestamp(progress["last_finished"]).strftime("%d.%m.%Y %H:%M")
+            cleanup_text += f"Прошлая очистка ({last}, {progress['last_duration']:.1f} с):\n"
+    elif progress["phase"] == "vacuum":
+        cleanup_text = f"🧹 <b>Очистка идёт:</b> сжатие файла БД, осталось страниц: {progress['free_pages']}\n\n"
+    elif progress["phase"] == "convert":
+        cleanup_text = (f"🛠 <b>Идёт перевод БД в auto_vacuum=INCREMENTAL</b> (/convert_db): "
+                        f"{progress['convert_elapsed']:.0f} с, очистка — после него\n\n")
+    else:
+        cleanup_text = f"🧹 <b>Очистка идёт</b> (тиков: {progress['ticks']})\n\n"
+    cleanup_text += f"🗑️ Удалено уведомлений: {deleted.get('job_notifications', 0)}\n"
+    cleanup_text += f"🗑️ Удалено записей об отправке: {deleted.get('jobs_sent', 0)}\n"
+    cleanup_text += f"🗑️ Удалено вакансий: {deleted.get('jobs', 0)}\n"
+    cleanup_text += f"🗑️ Удалено записей кэша ссылок: {deleted.get('link_cache', 0)}\n"
     
     await message.answer(cleanup_text, parse_mode="HTML")
 
+@dp.message(Command("convert_db"))
+async def convert_db(message: types.Message):
+    """Разово переводит БД в auto_vacuum=INCREMENTAL (для больших старых БД init_db этого не делает)"""
+    if not await _require_admin(message):
+        return
+    if not retention_scheduler.request_convert():
+        progress = retention_scheduler.progress()
+        if progress["phase"] == "convert":
+            await message.answer(f"🛠 Перевод БД уже идёт: {progress['convert_elapsed']:.0f} с")
+        else:
+            await message.answer("🧹 Сейчас идёт очистка, повторите /convert_db после неё (прогресс — /cleanup)")
+        return
+    await message.answer("🛠 Перевод БД в auto_vacuum=INCREMENTAL запущен в фоне (VACUUM переписывает весь файл; "
+                         "записи в БД ждут в очереди до конца). Прогресс — /cleanup")
+
+@dp.message(Command("metrics"))
+async def metrics(message: types.Message):
+    """Показывает внутренние метрики (кэши, очереди и т.п.)"""
+    if not await _require_admin(message):
+        return
+    text = "📈 <b>Метрики:</b>\n\n" + format_metrics()
+    for chunk in split_message(text):
+        await message.answer(chunk, parse_mode="HTML")
+
+@dp.message(Command("subscribe"))
+async def subscribe(message: types.Message, command: CommandObject):
+    """Подписка чата на уведомления: /subscribe — сразу, /subscribe digest [минут] — дайджестом"""
+    if not await _require_admin(message):
+        return
+    args = (command.args or "").split()
+    mode = args[0].lower() if args else "instant"
+    try:
+        minutes = int(args[1]) if len(args) > 1 else DIGEST_MINUTES
+        if mode not in ("instant", "digest") or len(args) > 2 or minutes <= 0:
+            raise ValueError(command.args)
+    except ValueError:
+        await message.answer("Использование: /subscribe — уведомление на каждую вакансию\n"
+                             f"/subscribe digest [минут] — одно сообщение с вакансиями за окно (по умолчанию {DIGEST_MINUTES})")
+        return
+    await broadcaster.subscribe(message.chat.id, mode, minutes)
+    if mode == "digest":
+        await message.answer(f"✅ Подписка оформлена: дайджест вакансий раз в {minutes} мин.")
+    else:
+        await message.answer("✅ Подписка оформлена: уведомление на каждую новую вакансию.")
+
+@dp.message(Command("unsubscribe"))
+async def unsubscribe(message: types.Message):
+    if not await _require_admin(message):
+        return
+    if await broadcaster.unsubscribe(message.chat.id):
+        await message.answer("Подписка отменена, уведомления в этот чат больше не придут.")
+    else:
+        await message.answer("Этот чат и не был подписан.")
+
 @dp.message(Command("myid"))
 async def myid(message: types.Message):
     """Показывает chat_id пользователя для настройки уведомлений"""
@@ -128,10 +223,31 @@ async def myid(message: types.Message):
     info_text += f"💬 <b>Chat ID:</b> {chat_id}\n"
     info_text += f"👤 <b>Username:</b> @{username}\n\n"
     info_text += f"💡 <b>Для настройки уведомлений:</b>\n"
-    info_text += f"Добавьте ваш Chat ID ({chat_id}) в список target_chat_ids в файле src/bot/notifications.py"
+    info_text += f"Администратор бота (ADMIN_CHAT_IDS в src/bot/bot.py) отправляет /subscribe в этот чат (или /subscribe digest — одним сообщением раз в {DIGEST_MINUTES} мин)"
     
     await message.answer(info_text, parse_mode="HTML")
 
+# Регистрируются раньше общего обработчика callback'ов ниже
+@dp.callback_query(F.data.startswith(jobs_list.CALLBACK_PREFIX))
+async def handle_jobs_page(callback: types.CallbackQuery):
+    """Кнопки "новее/старее" в /jobs"""
+    before_id, after_id, filters = jobs_list.decode_cursor(callback.data)
+    text, keyboard = await _jobs_page(filters, before_id, after_id)
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+@dp.callback_query(F.data.startswith("srch_"))
+async def handle_search_page(callback: types.CallbackQuery):
+    """Кнопки "назад/дальше" в результатах /search"""
+    _, query_id, offset = callback.data.split("_")
+    query_text = search.get_saved_query(int(query_id))
+    if query_text is None:
+        await callback.answer("Поиск устарел, повторите /search", show_alert=True)
+        return
+    text, keyboard = await _search_page(query_text, int(query_id), int(offset))
+    await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    await callback.answer()
+
 @dp.callback_query()
 async def handle_callback(callback: types.CallbackQuery):
     """Обрабатывает все callback'и от inline кнопок"""
@@ -0,0 +1,210 @@
+"""
+Рассылка уведомлений через aiogram-бота с учётом лимитов Bot API.
+
+Получатели — таблица notification_recipients (команды /subscribe, /unsubscribe),
+список держится в памяти и перечитывается после изменений. Каждый вызов Bot API
+(отправка и редактирование) проходит через два token bucket: чата (не чаще
+CHAT_RATE сообщений в секунду в один чат) и общий (GLOBAL_RATE в секунду на бота).
+На TelegramRetryAfter чат встаёт на паузу на retry_after секунд, вызов повторяется.
+
+Получатели в режиме digest получают не уведомление на каждую вакансию, а одно
+сообщение со всеми вакансиями за digest_minutes (отсчёт от первой вакансии в
+очереди). Очередь дайджеста — таблица digest_items, поэтому переживает перезапуск.
+"""
+
+import asyncio
+import html
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.db.async_db import (
+    add_digest_items,
+    delete_notification_recipient,
+    finish_digest,
+    get_digest_items,
+    get_job_by_hash,
+    get_notification_recipients,
+    save_notification_recipient,
+)
+from src.utils.metrics import register
+from src.utils.rate_limit import TokenBucket
+
+# --- Настройки ---
+GLOBAL_RATE = 25               # вызовов Bot API в секунду на бота (лимит Telegram — около 30)
+GLOBAL_BURST = 25
+CHAT_RATE = 1                  # сообщений в секунду в один чат
+CHAT_BURST = 3
+RETRY_AFTER_MARGIN = 1         # запас к retry_after, сек
+MAX_RETRIES = 3                # повторов одного вызова после TelegramRetryAfter
+DIGEST_MINUTES = 30            # окно дайджеста по умолчанию, мин
+DIGEST_CHECK_INTERVAL = 60     # как часто проверяем, не пора ли отправить дайджест, сек
+DIGEST_MAX_ITEMS = 15          # вакансий в одном сообщении дайджеста (лимит длины сообщения)
+DIGEST_PREVIEW_CHARS = 150
+
+
+def format_digest(jobs, minutes: int):
+    """Текст и кнопки дайджеста; jobs — [(job_hash, job_info)] в порядке поступления."""
+    lines = []
+    buttons = []
+    for number, (job_hash, (text, usernames, emails, links, prob, created_at)) in enumerate(jobs, 1):
+        preview = " ".join(text.split())
+        if len(preview) > DIGEST_PREVIEW_CHARS:
+            preview = preview[:DIGEST_PREVIEW_CHARS] + "…"
+        contacts = ["@" + u.lstrip("@") for u in usernames] + list(emails) + list(links)
+        contact = html.escape(contacts[0]) if contacts else "контактов нет"
+        lines.append(f"{number}. {html.escape(preview)}\n   📊 {prob:.2f} | {contact}")
+        buttons.append(InlineKeyboardButton(text=f"📋 {number}", callback_data=f"full_{job_hash}"))
+    text = f"🗂 <b>Новые вакансии за {minutes} мин: {len(jobs)}</b>\n\n" + "\n\n".join(lines)
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons[i:i + 5] for i in range(0, len(buttons), 5)])
+    return text, keyboard
+
+
+class Broadcaster:
+    """Отправка в чаты с лимитами + получатели из БД + дайджесты."""
+
+    def __init__(self):
+        self.bot = None
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chat_buckets = {}
+        self._recipients = None  # [(chat_id, mode, digest_minutes)] или None — перечитать из БД
+        self.task = None
+
+        self.sent = 0
+        self.edited = 0
+        self.retry_after = 0
+        self.failed = 0
+        self.digests = 0
+        self.digest_jobs = 0
+
+    def set_bot(self, bot):
+        self.bot = bot
+
+    # --- Получатели ---
+
+    async def recipients(self):
+        if self._recipients is None:
+            self._recipients = await get_notification_recipients()
+        return self._recipients
+
+    async def subscribe(self, chat_id, mode: str = "instant", digest_minutes: int = None):
+        await save_notification_recipient(str(chat_id), mode, digest_minutes if mode == "digest" else None)
+        self._recipients = None
+        if mode == "instant":
+            # накопленный дайджест не ждёт окна
+            await self.flush_digest(str(chat_id), DIGEST_MINUTES)
+
+    async def unsubscribe(self, chat_id) -> bool:
+        self._recipients = None
+        return await delete_notification_recipient(str(chat_id))
+
+    # --- Вызовы Bot API с лимитами ---
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        if key not in self._chat_buckets:
+            self._chat_buckets[key] = TokenBucket(CHAT_RATE, CHAT_BURST)
+        return self._chat_buckets[key]
+
+    async def _call(self, chat_id, method, **kwargs):
+        bucket = self._chat_bucket(chat_id)
+        for attempt in range(MAX_RETRIES + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await method(chat_id=chat_id, **kwargs)
+            except TelegramRetryAfter as e:
+                self.retry_after += 1
+                bucket.pause(e.retry_after + RETRY_AFTER_MARGIN)
+                print(f"⏳ Bot API: retry after {e.retry_after} с для чата {chat_id}")
+                if attempt == MAX_RETRIES:
+                    self.failed += 1
+                    raise
+            except Exception:
+                self.failed += 1
+                raise
+
+    async def send(self, chat_id, text: str, **kwargs):
+        message = await self._call(chat_id, self.bot.send_message, text=text, **kwargs)
+        self.sent += 1
+        return message
+
+    async def edit(self, chat_id, message_id: int, text: str, **kwargs):
+        result = await self._call(chat_id, self.bot.edit_message_text, message_id=message_id, text=text, **kwargs)
+        self.edited += 1
+        return result
+
+    # --- Дайджесты ---
+
+    async def add_to_digest(self, job_hash: str, chat_ids) -> int:
+        return await add_digest_items(job_hash, chat_ids, time.time())
+
+    async def flush_digest(self, chat_id: str, minutes: int) -> int:
+        """Отправляет всё, что ждёт дайджеста чата. Возвращает число вакансий."""
+        items = await get_digest_items(chat_id)
+        flushed = 0
+        for start in range(0, len(items), DIGEST_MAX_ITEMS):
+            chunk = [job_hash for job_hash, _ in items[start:start + DIGEST_MAX_ITEMS]]
+            jobs = []
+            for job_hash in chunk:
+                job_info = await get_job_by_hash(job_hash)
+                if job_info:  # вакансию могли удалить по сроку хранения
+                    jobs.append((job_hash, job_info))
+            if jobs:
+                text, keyboard = format_digest(jobs, minutes)
+                message = await self.send(chat_id, text, parse_mode="HTML", reply_markup=keyboard)
+                self.digests += 1
+                self.digest_jobs += len(jobs)
+                flushed += len(jobs)
+            sent_hashes = [job_hash for job_hash, _ in jobs]
+            # вакансии, удалённые по сроку хранения, просто уходят из очереди
+            await finish_digest(chat_id, str(message.message_id) if jobs else None, sent_hashes,
+                                set(chunk) - set(sent_hashes))
+        if flushed:
+            print(f"🗂 Дайджест в чат {chat_id}: {flushed} вакансий")
+        return flushed
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(DIGEST_CHECK_INTERVAL)
+            now = time.time()
+            for chat_id, mode, digest_minutes in await self.recipients():
+                if mode != "digest":
+                    continue
+                minutes = digest_minutes or DIGEST_MINUTES
+                try:
+                    items = await get_digest_items(chat_id)
+                    if items and items[0][1] <= now - minutes * 60:
+                        await self.flush_digest(chat_id, minutes)
+                except Exception as e:
+                    print(f"❌ Ошибка отправки дайджеста в чат {chat_id}: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def stats(self):
+        return {
+            "recipients": len(self._recipients) if self._recipients is not None else None,
+            "sent": self.sent,
+            "edited": self.edited,
+            "retry_after": self.retry_after,
+            "failed": self.failed,
+            "digests": self.digests,
+            "digest_jobs": self.digest_jobs,
+            "global_paused_s": self.global_bucket.paused_for(),
+        }
+
+
+broadcaster = Broadcaster()
+register("broadcaster", broadcaster.stats)
@@ -1,5 +1,4 @@
 import os
-import re
 import asyncio
 from telethon.errors.rpcerrorlist import (
     UserPrivacyRestrictedError,
@@ -8,6 +7,9 @@ from telethon.errors.rpcerrorlist import (
     PeerIdInvalidError,
     FloodWaitError,
 )
+from src.parser.message_parser import extract_contacts, TME_LINK_RE, TME_RESERVED
+from src.bot.peer_cache import peer_resolver
+from src.bot.resume_asset import resume_assets
 
 MAX_MESSAGE_LENGTH = 4000
 
@@ -15,34 +17,17 @@ def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH):
     """Разбивает длинный текст на части для Telegram (для ответов бота пользователю)."""
     return [text[i:i + max_length] for i in range(0, len(text), max_length)]
 
+# Извлечение контактов — общие правила из src/parser/message_parser.py
 def extract_emails(text: str):
-    return re.findall(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", text)
+    return extract_contacts(text)[0]
 
 def extract_telegram_usernames(text: str):
-    """
-    Достаём @usernames, избегая email.
-    Матчится только если перед @ пробел/начало строки.
-    """
-    text_wo_emails = re.sub(r'[\w\.-]+@[\w\.-]+\.\w+', ' ', text)
-    usernames = re.findall(r'(?<!\S)@([A-Za-z0-9_]{5,32})\b', text_wo_emails)
-
-    # Уникализируем, сохраняем порядок
-    seen, out = set(), []
-    for u in usernames:
-        if u.lower() not in seen:
-            seen.add(u.lower())
-            out.append(u)
-    return out
+    """Достаём usernames (без @) из @упоминаний и t.me-ссылок, без учёта email."""
+    return [u[1:] for u in extract_contacts(text)[1]]
 
 def extract_links(text: str):
     """Достаём http/https ссылки."""
-    links = re.findall(r'(https?://[^\s\)\]\}]+)', text)
-    seen, out = set(), []
-    for l in links:
-        if l not in seen:
-            seen.add(l)
-            out.append(l)
-    return out
+    return extract_contacts(text)[2]
 
 def extract_usernames_from_links(links: list[str]):
     """
@@ -52,17 +37,17 @@ def extract_usernames_from_links(links: list[str]):
     """
     usernames = []
     for link in links:
-        match = re.search(r'(?:https?://)?t\.me/([A-Za-z0-9_]{5,32})', link)
-        if match:
-            uname = match.group(1)
-            if uname not in usernames:
-                usernames.append(uname)
+        match = TME_LINK_RE.match(link.strip())
+        if match and match.group(1).lower() not in TME_RESERVED and match.group(1) not in usernames:
+            usernames.append(match.group(1))
     return usernames
 
 async def send_resume_via_telethon(client, employer_username: str, resume_path: str = "data/resume.pdf",
                                    greeting: str = "Здравствуйте! Вот моё резюме."):
     """
     Отправляет приветственное сообщение и PDF резюме через Telethon.
+    Получатель разрешается через кэш peer_resolver (без RPC для знакомых username),
+    PDF отправляется через resume_assets (без повторной загрузки файла).
     Возвращает (success: bool, error: str|None)
     """
     uname = (employer_username or "").strip()
@@ -73,11 +58,23 @@ async def send_resume_via_telethon(client, employer_username: str, resume_path:
         uname = "@" + uname
 
     try:
-        entity = await client.get_entity(uname)
-        await client.send_message(entity, greeting)
+        entity, error = await peer_resolver.resolve(client, uname)
+        if error:
+            print(f"⚠️ Нельзя написать пользователю {uname}: {error}")
+            return False, error
+        try:
+            await client.send_message(entity, greeting)
+        except PeerIdInvalidError:
+            # access_hash из кэша устарел — разрешаем username заново и пробуем ещё раз
+            entity, error = await peer_resolver.resolve(client, uname, refresh=True)
+            if error:
+                print(f"⚠️ Нельзя написать пользователю {uname}: {error}")
+                return False, error
+            await client.send_message(entity, greeting)
 
         if os.path.exists(resume_path):
-            await client.send_file(entity, resume_path, caption="Резюме (PDF)")
+            # PDF загружается в Telegram один раз, дальше отправляется уже загруженный документ
+            await resume_assets.send(client, entity, resume_path, caption="Резюме (PDF)")
         else:
             await client.send_message(entity, "PDF резюме временно недоступно — ответьте, и я дошлю ссылку.")
 
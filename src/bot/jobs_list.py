@@ -0,0 +1,141 @@
+"""
+/jobs: фильтры из аргументов команды, курсор в callback_data кнопок "новее/старее"
+и оформление страницы.
+
+Фильтры: min:0.8 — вероятность не ниже, chat:<id> — только этот чат,
+from:2026-10-01 / to:2026-10-18 — даты (обе включительно), contacts — только с контактами.
+Курсор и фильтры целиком живут в callback_data ("jobs:o123:p0.8,c-100123,..."),
+поэтому кнопки работают и после перезапуска бота.
+"""
+
+from datetime import date, timedelta
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+JOBS_PAGE_SIZE = 10
+CONTACT_CHARS = 80  # длиннее обрезаем, чтобы страница поместилась в одно сообщение
+CALLBACK_PREFIX = "jobs:"
+
+
+def parse_jobs_args(text: str) -> dict:
+    """Фильтры из текста после /jobs. ValueError — если аргумент не распознан."""
+    filters = {}
+    for arg in (text or "").split():
+        key, _, value = arg.partition(":")
+        key = key.lower()
+        if key in ("min", "prob") and value:
+            filters["min_prob"] = float(value)
+        elif key == "chat" and value:
+            filters["chat_id"] = str(int(value))
+        elif key == "from" and value:
+            filters["since"] = date.fromisoformat(value)
+        elif key == "to" and value:
+            filters["until"] = date.fromisoformat(value)
+        elif key == "contacts" and not value:
+            filters["has_contacts"] = True
+        else:
+            raise ValueError(arg)
+    return filters
+
+
+def query_args(filters: dict) -> dict:
+    """Фильтры в аргументы database.get_jobs_page (даты -> границы created_at)."""
+    args = dict(filters)
+    if "since" in args:
+        args["since"] = args["since"].isoformat()
+    if "until" in args:
+        args["until"] = (args["until"] + timedelta(days=1)).isoformat()
+    return args
+
+
+def encode_filters(filters: dict) -> str:
+    parts = []
+    if "min_prob" in filters:
+        parts.append(f"p{filters['min_prob']:g}")
+    if "chat_id" in filters:
+        parts.append(f"c{filters['chat_id']}")
+    if "since" in filters:
+        parts.append(f"s{filters['since']:%Y%m%d}")
+    if "until" in filters:
+        parts.append(f"u{filters['until']:%Y%m%d}")
+    if filters.get("has_contacts"):
+        parts.append("k")
+    return ",".join(parts)
+
+
+def decode_filters(encoded: str) -> dict:
+    filters = {}
+    for part in filter(None, encoded.split(",")):
+        kind, value = part[0], part[1:]
+        if kind == "p":
+            filters["min_prob"] = float(value)
+        elif kind == "c":
+            filters["chat_id"] = value
+        elif kind == "s":
+            filters["since"] = date(int(value[:4]), int(value[4:6]), int(value[6:]))
+        elif kind == "u":
+            filters["until"] = date(int(value[:4]), int(value[4:6]), int(value[6:]))
+        elif kind == "k":
+            filters["has_contacts"] = True
+    return filters
+
+
+def encode_cursor(direction: str, job_id: int, filters: dict) -> str:
+    """callback_data кнопки: direction "o" — старее job_id, "n" — новее (лимит Telegram — 64 байта)."""
+    return f"{CALLBACK_PREFIX}{direction}{job_id}:{encode_filters(filters)}"
+
+
+def decode_cursor(data: str):
+    """(before_id, after_id, filters) из callback_data."""
+    cursor, _, encoded = data[len(CALLBACK_PREFIX):].partition(":")
+    job_id = int(cursor[1:])
+    before_id, after_id = (job_id, None) if cursor[0] == "o" else (None, job_id)
+    return before_id, after_id, decode_filters(encoded)
+
+
+def describe_filters(filters: dict) -> str:
+    parts = []
+    if "min_prob" in filters:
+        parts.append(f"score ≥ {filters['min_prob']:g}")
+    if "chat_id" in filters:
+        parts.append(f"чат {filters['chat_id']}")
+    if "since" in filters:
+        parts.append(f"с {filters['since']:%d.%m.%Y}")
+    if "until" in filters:
+        parts.append(f"по {filters['until']:%d.%m.%Y}")
+    if filters.get("has_contacts"):
+        parts.append("с контактами")
+    return ", ".join(parts)
+
+
+def format_page(rows, filters: dict) -> str:
+    if not rows:
+        return "Вакансий по этим фильтрам нет." if filters else "Пока вакансий нет."
+
+    # компактный список превью
+    lines = []
+    for _, preview, truncated, prob, created_at, _, usernames, emails, links in rows:
+        preview = preview.replace("\n", " ").strip() + ("…" if truncated else "")
+        parts = []
+        if usernames:
+            parts.append("@" + usernames[0].lstrip("@"))
+        if emails:
+            parts.append(emails[0])
+        if links:
+            parts.append(links[0])
+        contact = " | ".join(parts)[:CONTACT_CHARS] if parts else "контактов нет"
+        score = f"{prob:.2f}" if prob is not None else "—"
+        lines.append(f"• {preview}\n  score: {score} | {contact} | {created_at}")
+
+    title = "Вакансии" + (f" ({describe_filters(filters)})" if filters else "")
+    return f"{title}:\n\n" + "\n\n".join(lines)
+
+
+def page_keyboard(rows, filters: dict, has_older: bool, has_newer: bool):
+    """Кнопки "новее/старее" с курсором по id крайних вакансий страницы."""
+    buttons = []
+    if rows and has_newer:
+        buttons.append(InlineKeyboardButton(text="◀ Новее", callback_data=encode_cursor("n", rows[0][0], filters)))
+    if rows and has_older:
+        buttons.append(InlineKeyboardButton(text="Старее ▶", callback_data=encode_cursor("o", rows[-1][0], filters)))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
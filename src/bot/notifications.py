@@ -1,87 +1,88 @@
+import html
+
 from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
-from src.db.database import (
+from src.db.async_db import (
     save_job_notification, 
     update_notification_status, 
     get_job_by_hash,
-    mark_sent,
+    get_job_notifications,
+    get_outbox_for_job,
     already_sent,
+    enqueue_outbox,
     notification_already_sent
 )
 from src.bot.handlers import send_resume_via_telethon
+from src.bot.broadcaster import broadcaster
+from src.bot.outbox import outbox_scheduler
 from src.utils.email_sender import send_resume_email
 import asyncio
-from telethon.errors import FloodWaitError
 from datetime import datetime
 
+RESUME_PATH = "data/resume.pdf"
+NOTIFICATION_EDIT_DELAY = 1.0  # результаты отправок за это время попадают в одно редактирование уведомления, сек
+DELIVERY_LINES = 10            # сколько отправок показываем в уведомлении построчно
+
+# Значок отправки по статусу в outbox
+DELIVERY_ICONS = {"pending": "⏳", "sent": "✅", "skipped": "⏭", "failed": "❌"}
+
 # Глобальная переменная для хранения Telethon клиента
 telethon_client = None
+_edit_tasks = {}  # job_hash -> отложенное редактирование уведомлений
 
 def set_telethon_client(client):
     """Устанавливает Telethon клиент для отправки резюме"""
     global telethon_client
     telethon_client = client
 
-async def send_job_notification(bot: Bot, job_hash: str, target_user: str = "iliyasls"):
+def set_notification_bot(bot: Bot):
+    """Устанавливает бота для рассылки уведомлений и их обновления по результатам отправок"""
+    broadcaster.set_bot(bot)
+
+async def _send_telegram(username: str, job_hash: str):
+    if telethon_client is None:
+        return False, "no_telethon_client"
+    return await send_resume_via_telethon(telethon_client, username, RESUME_PATH)
+
+async def _send_email(email: str, job_hash: str):
+    return await send_resume_email(email, RESUME_PATH)
+
+# Резюме отправляет планировщик очереди (src/bot/outbox.py) с лимитом на канал
+outbox_scheduler.set_sender("telegram", _send_telegram)
+outbox_scheduler.set_sender("email", _send_email)
+
+def notification_recipient(chat_id) -> str:
+    """Значение sent_to_user в job_notifications для уведомления в чат chat_id"""
+    return f"chat_{chat_id}"
+
+def _format_deliveries(deliveries) -> str:
+    if not deliveries:
+        return "\n❌ <b>Резюме не отправляется</b>\n📝 Нет новых контактов для отправки"
+    sent = sum(1 for _, _, status, _, _ in deliveries if status == "sent")
+    lines = []
+    for channel, recipient, status, attempts, error in deliveries[:DELIVERY_LINES]:
+        icon = "🔁" if status == "pending" and attempts else DELIVERY_ICONS.get(status, "•")
+        label = "@" + recipient.lstrip("@") if channel == "telegram" else recipient
+        line = f"{icon} {html.escape(label)}"
+        if status == "skipped":
+            line += " — уже отправлено"
+        elif error and status != "sent":
+            line += f" — {html.escape(error[:100])}"
+        lines.append(line)
+    if len(deliveries) > DELIVERY_LINES:
+        lines.append(f"… и ещё {len(deliveries) - DELIVERY_LINES}")
+    return f"\n📤 <b>Отправка резюме</b> ({sent}/{len(deliveries)}):\n" + "\n".join(lines)
+
+def render_notification(job_hash: str, job_info, deliveries, status: str = "pending"):
     """
-    Отправляет уведомление о новой вакансии с кнопками для отклика
+    Текст и кнопки уведомления о вакансии — целиком из состояния в БД
+    (вакансия, её отправки в outbox, статус уведомления), поэтому уведомление
+    можно перерисовать в любой момент.
     """
-    # Получаем информацию о вакансии
-    job_info = get_job_by_hash(job_hash)
-    if not job_info:
-        print(f"❌ Вакансия с хэшем {job_hash} не найдена")
-        return None
-    
     text, usernames, emails, links, prob, created_at = job_info
-    
-    # Проверяем, не отправляли ли уже уведомление для этой вакансии
-    if notification_already_sent(job_hash, target_user):
-        print(f"📨 Уведомление для вакансии {job_hash} уже отправлено пользователю {target_user}")
-        return "already_sent"
-    
-    # Автоматически отправляем резюме по всем доступным контактам
-    sent_count = 0
-    errors = []
-    
-    print(f"🚀 Автоматически отправляем резюме для вакансии {job_hash}...")
-    
-    # Отправляем в Telegram
-    if usernames and telethon_client:
-        for username in usernames.split(","):
-            username = username.strip()
-            if username and not already_sent(username, job_hash):
-                try:
-                    success, error = await send_resume_via_telethon(
-                        telethon_client, 
-                        username, 
-                        "data/resume.pdf"
-                    )
-                    if success:
-                        mark_sent(username, job_hash)
-                        sent_count += 1
-                        print(f"✅ Резюме отправлено в Telegram -> {username}")
-                    else:
-                        errors.append(f"Telegram {username}: {error}")
-                        print(f"❌ Ошибка отправки в Telegram {username}: {error}")
-                except Exception as e:
-                    errors.append(f"Telegram {username}: {str(e)}")
-                    print(f"❌ Исключение при отправке в Telegram {username}: {e}")
-    
-    # Отправляем на email
-    if emails:
-        for email in emails.split(","):
-            email = email.strip()
-            if email and not already_sent(email, job_hash):
-                try:
-                    send_resume_email(email, "data/resume.pdf")
-                    mark_sent(email, job_hash)
-                    sent_count += 1
-                    print(f"✅ Резюме отправлено по email -> {email}")
-                except Exception as e:
-                    errors.append(f"Email {email}: {str(e)}")
-                    print(f"❌ Ошибка отправки email {email}: {e}")
-    
+
     # Форматируем время в читаемом виде
     try:
         # Парсим время из БД и форматируем
@@ -97,68 +98,144 @@ async def send_job_notification(bot: Bot, job_hash: str, target_user: str = "ili
     
     # Добавляем контакты
     contacts = []
-    if usernames:
-        contacts.extend([f"@{u}" for u in usernames.split(",") if u.strip()])
-    if emails:
-        contacts.extend(emails.split(","))
-    if links:
-        contacts.extend(links.split(","))
+    contacts.extend("@" + u.lstrip("@") for u in usernames)
+    contacts.extend(emails)
+    contacts.extend(links)
     
     if contacts:
         notification_text += f"📞 <b>Контакты:</b> {', '.join(contacts[:3])}\n"
     
-    # Добавляем информацию об автоматической отправке
-    if sent_count > 0:
-        notification_text += f"\n✅ <b>Резюме автоматически отправлено!</b>\n📤 Отправлено: {sent_count} контактов"
-        if errors:
-            notification_text += f"\n⚠️ Ошибки: {len(errors)}"
-    else:
-        notification_text += f"\n❌ <b>Не удалось отправить резюме</b>\n"
-        if errors:
-            notification_text += f"⚠️ Ошибки: {len(errors)}"
-        else:
-            notification_text += f"📝 Нет доступных контактов для отправки"
+    # Ход отправки резюме (обновляется по мере результатов)
+    notification_text += _format_deliveries(deliveries)
+
+    if status == "confirmed":
+        notification_text += "\n\n✅ <b>Отправка подтверждена!</b>"
+    elif status == "skipped":
+        notification_text += "\n\n❌ <b>Вакансия пропущена</b>"
     
-    # Создаем inline кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
+    # Создаем inline кнопки (после ответа остаётся только полный текст)
+    buttons = []
+    if status == "pending":
+        buttons.append([
             InlineKeyboardButton(text="✅ Подтвердить отправку", callback_data=f"confirm_{job_hash}"),
             InlineKeyboardButton(text="❌ Пропустить", callback_data=f"skip_{job_hash}")
-        ],
-        [
-            InlineKeyboardButton(text="📋 Полный текст", callback_data=f"full_{job_hash}")
-        ]
-    ])
+        ])
+    buttons.append([InlineKeyboardButton(text="📋 Полный текст", callback_data=f"full_{job_hash}")])
+    return notification_text, InlineKeyboardMarkup(inline_keyboard=buttons)
+
+async def send_job_notification(bot: Bot, job_hash: str):
+    """
+    Отправляет уведомление о новой вакансии с кнопками для отклика.
+    job_hash — хэш кластера (src/parser/near_dup.py): почти одинаковые вакансии
+    уведомляются и рассылаются один раз.
+    Резюме рассылает очередь (src/bot/outbox.py) параллельно по каналам; уведомление
+    уходит сразу и редактируется по мере результатов отправок.
+    Получатели и лимиты Bot API — src/bot/broadcaster.py; получателям в режиме
+    digest вакансия попадает в ближайший дайджест.
+    """
+    if broadcaster.bot is None:
+        broadcaster.set_bot(bot)  # запуск без main.py (тестовые скрипты)
+
+    # Получаем информацию о вакансии
+    job_info = await get_job_by_hash(job_hash)
+    if not job_info:
+        print(f"❌ Вакансия с хэшем {job_hash} не найдена")
+        return None
+    
+    text, usernames, emails, links, prob, created_at = job_info
+    
+    # Проверяем, не отправляли ли уже уведомление для этой вакансии — тем же ключом, что пишет save_job_notification
+    recipients = await broadcaster.recipients()
+    if not recipients:
+        print("📭 Нет получателей уведомлений — отправьте боту /subscribe")
+        return None
+    instant_chat_ids, digest_chat_ids = [], []
+    for chat_id, mode, _ in recipients:
+        if not await notification_already_sent(job_hash, notification_recipient(chat_id)):
+            (digest_chat_ids if mode == "digest" else instant_chat_ids).append(chat_id)
+    if not instant_chat_ids and not digest_chat_ids:
+        print(f"📨 Уведомление для вакансии {job_hash} уже отправлено")
+        return "already_sent"
+    
+    # Ставим отправку резюме по всем доступным контактам в очередь (outbox)
+    sends = []
+    for username in usernames:
+        if not await already_sent(username, job_hash):
+            sends.append(("telegram", username))
+    for email in emails:
+        if not await already_sent(email, job_hash):
+            sends.append(("email", email))
+    queued_count = await enqueue_outbox(job_hash, sends) if sends else 0
+    if queued_count:
+        print(f"🚀 Резюме для вакансии {job_hash} поставлено в очередь: {queued_count} контактов")
+    
+    queued_digests = await broadcaster.add_to_digest(job_hash, digest_chat_ids) if digest_chat_ids else 0
     
-    # Список возможных chat_id для отправки уведомлений
-    # Добавьте сюда свой chat_id после первого запуска бота
-    target_chat_ids = ["1011374221"
-        # "YOUR_CHAT_ID_HERE",  # Замените на ваш chat_id
-        # Можно добавить несколько chat_id для отправки нескольким пользователям
-    ]
+    notification_text, keyboard = render_notification(job_hash, job_info, await get_outbox_for_job(job_hash))
     
-    # Отправляем уведомления по всем настроенным chat_id
-    sent_count_notifications = 0
-    for chat_id in target_chat_ids:
+    async def notify_chat(chat_id):
         try:
-            message = await bot.send_message(
-                chat_id=chat_id,
-                text=notification_text,
+            message = await broadcaster.send(
+                chat_id,
+                notification_text,
                 parse_mode="HTML",
                 reply_markup=keyboard
             )
             
             # Сохраняем информацию об уведомлении
-            save_job_notification(job_hash, str(message.message_id), f"chat_{chat_id}")
+            await save_job_notification(job_hash, str(message.message_id), notification_recipient(chat_id))
             
             print(f"📨 Уведомление о вакансии отправлено в чат {chat_id}")
-            sent_count_notifications += 1
+            return True
             
         except Exception as e:
             print(f"❌ Ошибка отправки уведомления в чат {chat_id}: {e}")
+            return False
+
+    # Отправляем уведомления во все чаты, где их ещё не было (лимиты — в broadcaster)
+    sent_count_notifications = sum(await asyncio.gather(*(notify_chat(chat_id) for chat_id in instant_chat_ids)))
+
+    # Будим очередь, когда уведомления сохранены — результаты отправок будут их редактировать
+    if queued_count:
+        outbox_scheduler.notify()
     
+    # вакансии, впервые поставленные в дайджест, считаем доставленными — сообщение уйдёт по окну
+    sent_count_notifications += queued_digests
     return sent_count_notifications if sent_count_notifications > 0 else None
 
+async def refresh_notifications(job_hash: str):
+    """Перерисовывает все уведомления о вакансии по текущему состоянию отправок."""
+    job_info = await get_job_by_hash(job_hash)
+    if not job_info or broadcaster.bot is None:
+        return
+    deliveries = await get_outbox_for_job(job_hash)
+    for msg_id, sent_to_user, status in await get_job_notifications(job_hash):
+        # дайджест — общее сообщение для многих вакансий, его не перерисовываем
+        if not sent_to_user.startswith("chat_") or status == "digest":
+            continue
+        text, keyboard = render_notification(job_hash, job_info, deliveries, status)
+        try:
+            await broadcaster.edit(sent_to_user[len("chat_"):], int(msg_id), text, parse_mode="HTML",
+                                   reply_markup=keyboard)
+        except TelegramBadRequest as e:
+            if "not modified" not in str(e):
+                print(f"❌ Ошибка обновления уведомления {msg_id}: {e}")
+        except Exception as e:
+            print(f"❌ Ошибка обновления уведомления {msg_id}: {e}")
+
+async def _delayed_refresh(job_hash: str):
+    await asyncio.sleep(NOTIFICATION_EDIT_DELAY)
+    # результаты, пришедшие после этой точки, запланируют следующее редактирование
+    _edit_tasks.pop(job_hash, None)
+    await refresh_notifications(job_hash)
+
+async def _on_delivery(job_hash: str, channel: str, recipient: str, status: str, error: str = None):
+    """Результат отправки из очереди: обновить уведомление (не чаще раза в NOTIFICATION_EDIT_DELAY)."""
+    if broadcaster.bot is not None and job_hash not in _edit_tasks:
+        _edit_tasks[job_hash] = asyncio.create_task(_delayed_refresh(job_hash))
+
+outbox_scheduler.add_listener(_on_delivery)
+
 async def handle_notification_callback(callback: types.CallbackQuery, bot: Bot):
     """
     Обрабатывает нажатия на кнопки уведомлений
@@ -187,23 +264,16 @@ async def handle_confirm_job(callback: types.CallbackQuery, bot: Bot, job_hash:
     """
     Обрабатывает подтверждение отправки резюме
     """
-    job_info = get_job_by_hash(job_hash)
+    job_info = await get_job_by_hash(job_hash)
     if not job_info:
         await callback.answer("Вакансия не найдена", show_alert=True)
         return
     
-    text, usernames, emails, links, prob, created_at = job_info
-    
     # Обновляем статус уведомления
-    update_notification_status(str(callback.message.message_id), "confirmed")
-    
-    # Обновляем сообщение
-    new_text = callback.message.text + "\n\n✅ <b>Отправка подтверждена!</b>"
+    await update_notification_status(str(callback.message.message_id), "confirmed")
     
-    # Убираем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📋 Полный текст", callback_data=f"full_{job_hash}")]
-    ])
+    # Перерисовываем сообщение с текущим ходом отправок, кнопки убираем
+    new_text, keyboard = render_notification(job_hash, job_info, await get_outbox_for_job(job_hash), "confirmed")
     
     await callback.message.edit_text(
         text=new_text,
@@ -217,16 +287,16 @@ async def handle_skip_job(callback: types.CallbackQuery, bot: Bot, job_hash: str
     """
     Обрабатывает пропуск вакансии
     """
+    job_info = await get_job_by_hash(job_hash)
+    if not job_info:
+        await callback.answer("Вакансия не найдена", show_alert=True)
+        return
+
     # Обновляем статус уведомления
-    update_notification_status(str(callback.message.message_id), "skipped")
-    
-    # Обновляем сообщение
-    new_text = callback.message.text + "\n\n❌ <b>Вакансия пропущена</b>"
+    await update_notification_status(str(callback.message.message_id), "skipped")
     
-    # Убираем кнопки
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📋 Полный текст", callback_data=f"full_{job_hash}")]
-    ])
+    # Перерисовываем сообщение с текущим ходом отправок, кнопки убираем
+    new_text, keyboard = render_notification(job_hash, job_info, await get_outbox_for_job(job_hash), "skipped")
     
     await callback.message.edit_text(
         text=new_text,
@@ -240,7 +310,7 @@ async def handle_show_full_text(callback: types.CallbackQuery, bot: Bot, job_has
     """
     Показывает полный текст вакансии
     """
-    job_info = get_job_by_hash(job_hash)
+    job_info = await get_job_by_hash(job_hash)
     if not job_info:
         await callback.answer("Вакансия не найдена", show_alert=True)
         return
@@ -0,0 +1,262 @@
+"""
+Очередь исходящих отправок резюме (таблица outbox). Отправки не уходят сразу
+пачкой, а ставятся в outbox; планировщик разбирает каждый канал (telegram, email)
+через свой token bucket с OUTBOX_RATES, до OUTBOX_CONCURRENCY отправок канала
+идут параллельно, но одному получателю — не больше одной отправки за раз
+(иначе две вакансии одного рекрутера прошли бы already_sent одновременно).
+На FloodWait канал целиком встаёт на паузу на указанное время,
+отправка повторяется после неё. Очередь в БД, поэтому ожидающие отправки
+переживают перезапуск. Результат каждой попытки передаётся подписчикам
+(add_listener) — по нему обновляется уведомление о вакансии.
+"""
+
+import asyncio
+import collections
+import re
+import time
+
+from src.db.async_db import (
+    already_sent,
+    finish_outbox,
+    get_due_outbox,
+    get_next_outbox_attempt,
+    get_outbox_backlog,
+    retry_outbox,
+)
+from src.utils.metrics import register
+from src.utils.rate_limit import TokenBucket
+
+# --- Настройки ---
+# канал -> (отправок в минуту, всплеск)
+OUTBOX_RATES = {
+    "telegram": (2, 3),
+    "email": (10, 5),
+}
+# канал -> сколько отправок идут одновременно (email — по числу SMTP-соединений)
+OUTBOX_CONCURRENCY = {
+    "telegram": 2,
+    "email": 3,
+}
+OUTBOX_FETCH = 20              # сколько отправок канала читаем из БД за раз
+OUTBOX_POLL_INTERVAL = 30      # как часто проверяем очередь без новых отправок, сек
+OUTBOX_MAX_ATTEMPTS = 5        # после стольких ошибок отправка помечается failed
+OUTBOX_RETRY_BASE = 60         # пауза перед повтором после ошибки, сек (удваивается с каждой попыткой)
+FLOODWAIT_MARGIN = 1           # запас к времени FloodWait, сек
+
+# Ошибки, после которых повторять бессмысленно (см. send_resume_via_telethon)
+PERMANENT_ERRORS = {
+    "empty_username",
+    "UserPrivacyRestrictedError",
+    "UserIsBlockedError",
+    "ChatWriteForbiddenError",
+    "PeerIdInvalidError",
+    "UsernameInvalidError",
+    "UsernameNotOccupiedError",
+    "username_not_found",
+    "email_recipient_refused",
+}
+_floodwait_re = re.compile(r"floodwait_(\d+)s")
+
+
+def _recipient_key(recipient: str) -> str:
+    """Как нормализует получателя already_sent: без @ и регистра."""
+    return recipient.strip().lstrip("@").lower()
+
+
+class OutboxChannel:
+    """Состояние одного канала: отправитель, token bucket и счётчики."""
+
+    def __init__(self, name: str, send, per_minute: float, burst: int, concurrency: int):
+        self.name = name
+        self.send = send  # async (recipient, job_hash) -> (success, error)
+        self.bucket = TokenBucket(per_minute / 60, burst)
+        self.slots = asyncio.Semaphore(concurrency)
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.flood_hit = False  # отправка пачки получила FloodWait — новые не начинаем
+        self.in_flight_recipients = set()  # получатели, которым отправка уже идёт
+
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retried = 0
+        self.floodwaits = 0
+        self.backlog = 0
+        self.in_flight = 0
+        self.deferred = 0
+        self.recent = collections.deque()  # время отправок за последнюю минуту
+
+    def sent_last_minute(self) -> int:
+        cutoff = time.monotonic() - 60
+        while self.recent and self.recent[0] < cutoff:
+            self.recent.popleft()
+        return len(self.recent)
+
+
+class OutboxScheduler:
+    """Фоновые задачи по одной на канал: outbox -> token bucket -> отправитель."""
+
+    def __init__(self, rates: dict = None, concurrency: dict = None):
+        self.rates = dict(OUTBOX_RATES if rates is None else rates)
+        self.concurrency = dict(OUTBOX_CONCURRENCY if concurrency is None else concurrency)
+        self.channels = {}
+        self.listeners = []
+
+    def set_sender(self, channel: str, send):
+        """Задаёт отправитель канала: async send(recipient, job_hash) -> (success, error)."""
+        per_minute, burst = self.rates[channel]
+        self.channels[channel] = OutboxChannel(channel, send, per_minute, burst, self.concurrency.get(channel, 1))
+
+    def add_listener(self, callback):
+        """Подписка на результаты: async callback(job_hash, channel, recipient, status, error)."""
+        self.listeners.append(callback)
+
+    async def _emit(self, job_hash: str, channel: str, recipient: str, status: str, error: str = None):
+        for callback in self.listeners:
+            try:
+                await callback(job_hash, channel, recipient, status, error)
+            except Exception as e:
+                print(f"❌ Ошибка обработчика результата отправки: {e}")
+
+    def start(self):
+        for channel in self.channels.values():
+            if channel.task is None:
+                channel.task = asyncio.create_task(self._loop(channel))
+
+    async def stop(self):
+        for channel in self.channels.values():
+            if channel.task is not None:
+                channel.task.cancel()
+                try:
+                    await channel.task
+                except asyncio.CancelledError:
+                    pass
+                channel.task = None
+
+    def notify(self, channel: str = None):
+        """Будит планировщик после постановки новых отправок."""
+        for name, state in self.channels.items():
+            if channel is None or name == channel:
+                state.wakeup.set()
+
+    async def _loop(self, channel: OutboxChannel):
+        while True:
+            try:
+                await self._drain(channel)
+                next_attempt = await get_next_outbox_attempt(channel.name)
+            except Exception as e:
+                print(f"❌ Ошибка очереди отправок ({channel.name}): {e}")
+                next_attempt = None
+            timeout = OUTBOX_POLL_INTERVAL
+            if next_attempt is not None:
+                timeout = min(timeout, max(next_attempt - time.time(), 0))
+            try:
+                await asyncio.wait_for(channel.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            channel.wakeup.clear()
+
+    async def _drain(self, channel: OutboxChannel):
+        """Отправляет всё, чему пора, с учётом лимита и параллельности канала."""
+        while True:
+            channel.backlog = (await get_outbox_backlog()).get(channel.name, 0)
+            rows = await get_due_outbox(channel.name, time.time(), OUTBOX_FETCH)
+            if not rows:
+                return
+            tasks = []
+            for outbox_id, recipient, job_hash, attempts in rows:
+                key = _recipient_key(recipient)
+                if key in channel.in_flight_recipients:
+                    # этому получателю уже отправляем (другая вакансия) — строка остаётся pending
+                    # и попадёт в следующую выборку, где already_sent увидит результат первой
+                    channel.deferred += 1
+                    continue
+                await channel.slots.acquire()
+                if not channel.flood_hit:
+                    await channel.bucket.acquire()
+                if channel.flood_hit:
+                    channel.slots.release()
+                    break
+                channel.in_flight_recipients.add(key)
+                tasks.append(asyncio.create_task(
+                    self._send_in_slot(channel, outbox_id, recipient, job_hash, attempts)))
+            # Пачку дожидаемся целиком: незавершённые отправки ещё pending и попали бы в следующую выборку
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, Exception):
+                    print(f"❌ Ошибка очереди отправок ({channel.name}): {result}")
+            if channel.flood_hit:
+                channel.flood_hit = False
+                return  # канал на паузе (FloodWait) — остальные подождут
+
+    async def _send_in_slot(self, channel: OutboxChannel, outbox_id: int, recipient: str, job_hash: str,
+                            attempts: int):
+        channel.in_flight += 1
+        try:
+            if not await self._send_one(channel, outbox_id, recipient, job_hash, attempts):
+                channel.flood_hit = True
+        finally:
+            channel.in_flight -= 1
+            channel.in_flight_recipients.discard(_recipient_key(recipient))
+            channel.slots.release()
+
+    async def _send_one(self, channel: OutboxChannel, outbox_id: int, recipient: str, job_hash: str,
+                        attempts: int) -> bool:
+        """Одна отправка; False — канал встал на паузу."""
+        if await already_sent(recipient, job_hash):
+            channel.skipped += 1
+            await finish_outbox(outbox_id, "skipped", "already_sent")
+            await self._emit(job_hash, channel.name, recipient, "skipped", "already_sent")
+            return True
+
+        try:
+            success, error = await channel.send(recipient, job_hash)
+        except Exception as e:
+            success, error = False, str(e)
+
+        if success:
+            channel.sent += 1
+            channel.recent.append(time.monotonic())
+            await finish_outbox(outbox_id, "sent")
+            print(f"✅ Резюме отправлено ({channel.name}) -> {recipient}")
+            await self._emit(job_hash, channel.name, recipient, "sent")
+            return True
+
+        flood = _floodwait_re.fullmatch(error or "")
+        if flood:
+            wait = int(flood.group(1)) + FLOODWAIT_MARGIN
+            channel.floodwaits += 1
+            channel.bucket.pause(wait)
+            await retry_outbox(outbox_id, time.time() + wait, error, count_attempt=False)
+            print(f"⏳ {channel.name}: FloodWait, канал на паузе {wait} с")
+            await self._emit(job_hash, channel.name, recipient, "pending", error)
+            return False
+
+        if error in PERMANENT_ERRORS or attempts + 1 >= OUTBOX_MAX_ATTEMPTS:
+            channel.failed += 1
+            await finish_outbox(outbox_id, "failed", error)
+            print(f"❌ Отправка {recipient} ({channel.name}) не удалась: {error}")
+            await self._emit(job_hash, channel.name, recipient, "failed", error)
+        else:
+            channel.retried += 1
+            await retry_outbox(outbox_id, time.time() + OUTBOX_RETRY_BASE * 2 ** attempts, error)
+            await self._emit(job_hash, channel.name, recipient, "pending", error)
+        return True
+
+    def stats(self):
+        stats = {}
+        for name, channel in self.channels.items():
+            stats[f"{name}_sent"] = channel.sent
+            stats[f"{name}_sent_last_minute"] = channel.sent_last_minute()
+            stats[f"{name}_skipped"] = channel.skipped
+            stats[f"{name}_failed"] = channel.failed
+            stats[f"{name}_retried"] = channel.retried
+            stats[f"{name}_floodwaits"] = channel.floodwaits
+            stats[f"{name}_paused_s"] = channel.bucket.paused_for()
+            stats[f"{name}_backlog"] = channel.backlog
+            stats[f"{name}_in_flight"] = channel.in_flight
+            stats[f"{name}_deferred"] = channel.deferred
+        return stats
+
+
+outbox_scheduler = OutboxScheduler()
+register("outbox", outbox_scheduler.stats)
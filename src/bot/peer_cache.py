@@ -0,0 +1,140 @@
+"""
+Кэш разрешения username -> peer (id + access_hash) для отправок через Telethon.
+
+client.get_entity("@user") на каждую отправку — это ResolveUsername (один из самых
+жёстко лимитируемых методов) плюс GetUsers, а рекрутеры повторяются постоянно.
+Здесь username разрешается один раз: результат — в LRU в памяти и в таблице
+peer_cache на PEER_TTL, отправка идёт сразу на InputPeer без RPC. Ненайденные
+username и PeerIdInvalid кэшируются отрицательно на NEGATIVE_TTL.
+"""
+
+import time
+
+from telethon import types, utils
+from telethon.errors.rpcerrorlist import PeerIdInvalidError, UsernameInvalidError, UsernameNotOccupiedError
+
+from src.db.async_db import get_peer_cache, get_recent_contact_peers, save_peer_cache
+from src.utils.helpers import LRUCache
+from src.utils.metrics import register
+
+# --- Настройки ---
+PEER_TTL = 7 * 24 * 60 * 60     # сколько доверяем разрешённому username (его могут сменить), сек
+NEGATIVE_TTL = 6 * 60 * 60      # сколько не пытаемся снова разрешить ненайденный username, сек
+MEMORY_CACHE_SIZE = 5000        # размер LRU в памяти
+WARM_JOBS = 5000                # при старте грузим в память записи для контактов стольких последних вакансий
+
+_PEER_TYPES = {
+    "user": lambda peer_id, access_hash: types.InputPeerUser(peer_id, access_hash),
+    "channel": lambda peer_id, access_hash: types.InputPeerChannel(peer_id, access_hash),
+    "chat": lambda peer_id, access_hash: types.InputPeerChat(peer_id),
+}
+
+
+def _key(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+
+def _describe(peer):
+    """InputPeer -> (peer_type, peer_id, access_hash) для хранения в БД."""
+    if isinstance(peer, types.InputPeerUser):
+        return "user", peer.user_id, peer.access_hash
+    if isinstance(peer, types.InputPeerChannel):
+        return "channel", peer.channel_id, peer.access_hash
+    if isinstance(peer, types.InputPeerChat):
+        return "chat", peer.chat_id, None
+    return None
+
+
+class PeerResolver:
+    """LRU в памяти + таблица peer_cache; RPC только при промахе."""
+
+    def __init__(self, ttl: float = PEER_TTL, negative_ttl: float = NEGATIVE_TTL,
+                 memory_size: int = MEMORY_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = LRUCache(memory_size)  # username -> (peer | None, error, expires_at)
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.negative_hits = 0
+        self.rpc_calls = 0   # обращения к Telethon за разрешением (верхняя оценка RPC)
+        self.refreshed = 0
+
+    async def _cached(self, key: str):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and entry[2] >= now:
+            self.memory_hits += 1
+            return entry
+        row = await get_peer_cache(key)
+        if row is None or row[4] < now:
+            return None
+        peer_type, peer_id, access_hash, error, expires_at = row
+        peer = _PEER_TYPES[peer_type](peer_id, access_hash) if peer_type else None
+        entry = (peer, error, expires_at)
+        self._memory.put(key, entry)
+        self.db_hits += 1
+        return entry
+
+    async def resolve(self, client, username: str, refresh: bool = False):
+        """
+        Возвращает (input_peer, None) или (None, error), где error — имя ошибки
+        ("PeerIdInvalidError", "username_not_found", ...), в том числе из отрицательного кэша.
+        refresh=True — игнорировать кэш (access_hash устарел).
+        """
+        key = _key(username)
+        if refresh:
+            self.refreshed += 1
+        else:
+            entry = await self._cached(key)
+            if entry is not None:
+                peer, error, _ = entry
+                if error:
+                    self.negative_hits += 1
+                return peer, error
+
+        self.rpc_calls += 1
+        try:
+            peer = utils.get_input_peer(await client.get_input_entity("@" + key))
+        except (PeerIdInvalidError, UsernameInvalidError, UsernameNotOccupiedError) as e:
+            await self._store(key, None, e.__class__.__name__, self.negative_ttl)
+            return None, e.__class__.__name__
+        except ValueError:
+            # Telethon: 'No user has "..." as username'
+            await self._store(key, None, "username_not_found", self.negative_ttl)
+            return None, "username_not_found"
+        await self._store(key, peer, None, self.ttl)
+        return peer, None
+
+    async def _store(self, key, peer, error, ttl):
+        expires_at = time.time() + ttl
+        described = _describe(peer) if peer is not None else None
+        if peer is not None and described is None:
+            return  # InputPeerSelf и т.п. — не кэшируем
+        self._memory.put(key, (peer, error, expires_at))
+        peer_type, peer_id, access_hash = described or (None, None, None)
+        await save_peer_cache(key, peer_type, peer_id, access_hash, error, expires_at)
+
+    async def warm(self, jobs: int = WARM_JOBS):
+        """Одним запросом грузит в память записи для контактов последних вакансий."""
+        rows = await get_recent_contact_peers(jobs, time.time())
+        for username, peer_type, peer_id, access_hash, error, expires_at in rows:
+            peer = _PEER_TYPES[peer_type](peer_id, access_hash) if peer_type else None
+            self._memory.put(username, (peer, error, expires_at))
+        print(f"👥 Кэш получателей: загружено {len(rows)} записей")
+
+    def stats(self):
+        resolves = self.memory_hits + self.db_hits + self.rpc_calls
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "negative_hits": self.negative_hits,
+            "rpc_calls": self.rpc_calls,
+            "rpc_per_resolve": self.rpc_calls / resolves if resolves else 0.0,
+            "refreshed": self.refreshed,
+            "memory_size": len(self._memory),
+        }
+
+
+peer_resolver = PeerResolver()
+register("peer_cache", peer_resolver.stats)
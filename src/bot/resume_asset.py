@@ -0,0 +1,158 @@
+"""
+Переиспользование загруженного в Telegram файла резюме.
+
+client.send_file(entity, "data/resume.pdf") на каждую отправку заново загружает
+весь PDF (upload.saveFilePart по частям + sendMedia). Здесь файл загружается
+один раз: документ из ответа (id, access_hash, file_reference) хранится в памяти
+и в таблице uploaded_files, следующие отправки идут одним sendMedia с
+InputDocument. Файл на диске сверяется по mtime и размеру, при их изменении —
+по sha256; перезагрузка только если изменилось содержимое или Telegram ответил
+FileReferenceExpired.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+
+from telethon import types
+from telethon.errors.rpcerrorlist import FileReferenceExpiredError, FileReferenceInvalidError, MediaEmptyError
+
+from src.db.async_db import get_uploaded_file, save_uploaded_file
+from src.utils.metrics import register
+
+# Ответы, после которых сохранённый документ больше не годится — загружаем файл заново
+STALE_DOCUMENT_ERRORS = (FileReferenceExpiredError, FileReferenceInvalidError, MediaEmptyError)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedDocument:
+    """Версия файла на диске и документ Telegram, загруженный из неё."""
+
+    __slots__ = ("sha256", "mtime", "size", "document")
+
+    def __init__(self, sha256: str, mtime: float, size: int, document: types.InputDocument):
+        self.sha256 = sha256
+        self.mtime = mtime
+        self.size = size
+        self.document = document
+
+
+class ResumeAssetManager:
+    """Отправка файла через Telethon: загрузка один раз, дальше — InputDocument."""
+
+    def __init__(self):
+        self._entries = {}  # path -> CachedDocument | None (None — в БД тоже нет)
+        self._locks = {}
+
+        self.uploads = 0
+        self.reuses = 0
+        self.upload_ms = 0.0
+        self.reuse_ms = 0.0
+        self.changed = 0          # файл на диске изменился — перезагрузка
+        self.stale_documents = 0  # FileReferenceExpired и т.п. — перезагрузка
+
+    async def _entry(self, path: str):
+        if path not in self._entries:
+            row = await get_uploaded_file(path)
+            if row is not None:
+                sha256, mtime, size, doc_id, access_hash, file_reference = row
+                row = CachedDocument(sha256, mtime, size, types.InputDocument(doc_id, access_hash, file_reference))
+            self._entries[path] = row
+        return self._entries[path]
+
+    async def _current(self, path: str):
+        """Документ для текущей версии файла или None, если файл нужно загрузить."""
+        entry = await self._entry(path)
+        if entry is None:
+            return None
+        st = os.stat(path)
+        if entry.mtime == st.st_mtime and entry.size == st.st_size:
+            return entry.document
+        # mtime сменился (копирование, touch) — сверяем содержимое
+        sha256 = await asyncio.to_thread(_sha256, path)
+        if sha256 == entry.sha256:
+            await self._store(path, sha256, st.st_mtime, st.st_size, entry.document)
+            return entry.document
+        self.changed += 1
+        print(f"📎 {path} изменился — будет загружен заново")
+        self._entries[path] = None
+        return None
+
+    async def _store(self, path, sha256, mtime, size, document):
+        self._entries[path] = CachedDocument(sha256, mtime, size, document)
+        await save_uploaded_file(path, sha256, mtime, size, document.id, document.access_hash,
+                                 document.file_reference)
+
+    async def _send_cached(self, client, entity, path: str, document, kwargs):
+        start = time.perf_counter()
+        message = await client.send_file(entity, document, **kwargs)
+        self.reuses += 1
+        self.reuse_ms += (time.perf_counter() - start) * 1000
+        # Telegram мог выдать новый file_reference — держим самый свежий
+        sent = getattr(message.media, "document", None)
+        entry = self._entries.get(path)
+        if sent is not None and entry is not None and sent.file_reference != document.file_reference:
+            await self._store(path, entry.sha256, entry.mtime, entry.size,
+                              types.InputDocument(sent.id, sent.access_hash, sent.file_reference))
+        return message
+
+    async def _upload(self, client, entity, path: str, kwargs):
+        st = os.stat(path)
+        sha256 = await asyncio.to_thread(_sha256, path)
+        start = time.perf_counter()
+        message = await client.send_file(entity, path, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.uploads += 1
+        self.upload_ms += elapsed
+        print(f"📎 {path} загружен в Telegram за {elapsed:.0f} мс")
+        sent = getattr(message.media, "document", None)
+        if sent is not None:
+            await self._store(path, sha256, st.st_mtime, st.st_size,
+                              types.InputDocument(sent.id, sent.access_hash, sent.file_reference))
+        return message
+
+    async def send(self, client, entity, path: str, **kwargs):
+        """
+        Как client.send_file(entity, path, **kwargs), но файл загружается только
+        при первой отправке, изменении содержимого или устаревшем документе.
+        """
+        document = await self._current(path)
+        if document is not None:
+            try:
+                return await self._send_cached(client, entity, path, document, kwargs)
+            except STALE_DOCUMENT_ERRORS as e:
+                self.stale_documents += 1
+                print(f"📎 Документ {path} устарел ({e.__class__.__name__}) — загружаем заново")
+                entry = self._entries.get(path)
+                if entry is not None and entry.document is document:
+                    self._entries[path] = None
+
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            # Пока ждали, файл мог загрузить параллельный отправитель
+            fresh = await self._current(path)
+            if fresh is not None and fresh is not document:
+                return await self._send_cached(client, entity, path, fresh, kwargs)
+            return await self._upload(client, entity, path, kwargs)
+
+    def stats(self):
+        return {
+            "uploads": self.uploads,
+            "reuses": self.reuses,
+            "avg_upload_send_ms": self.upload_ms / self.uploads if self.uploads else 0.0,
+            "avg_reuse_send_ms": self.reuse_ms / self.reuses if self.reuses else 0.0,
+            "changed": self.changed,
+            "stale_documents": self.stale_documents,
+        }
+
+
+resume_assets = ResumeAssetManager()
+register("resume_asset", resume_assets.stats)
@@ -0,0 +1,111 @@
+"""
+/search: разбор запроса пользователя в выражение FTS5, оформление результатов
+и кнопки пагинации.
+
+Запрос: слова через пробел (все должны встретиться), "слово*" — поиск по префиксу,
+chat:<id> — только вакансии из этого чата. Названия технологий раскрываются
+в синонимы из STACK_KEYWORDS: "js" найдёт и "javascript".
+"""
+
+import html
+import itertools
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from src.utils.helpers import LRUCache
+
+PAGE_SIZE = 5
+SAVED_QUERIES = 1000  # сколько последних запросов помним для кнопок "дальше/назад"
+
+# Синонимы технологий (токенизатор FTS5 выбрасывает "#", "+" и ".", поэтому "c#" -> "c")
+STACK_KEYWORDS = {
+    "js": ["js", "javascript"],
+    "javascript": ["js", "javascript"],
+    "ts": ["ts", "typescript"],
+    "typescript": ["ts", "typescript"],
+    "go": ["go", "golang"],
+    "golang": ["go", "golang"],
+    "py": ["py", "python"],
+    "python": ["python", "py"],
+    "c#": ["csharp", "c#", ".net", "dotnet"],
+    "csharp": ["csharp", "c#", ".net", "dotnet"],
+    ".net": [".net", "dotnet", "csharp"],
+    "dotnet": [".net", "dotnet", "csharp"],
+    "c++": ["cpp", "c++"],
+    "cpp": ["cpp", "c++"],
+    "k8s": ["k8s", "kubernetes"],
+    "kubernetes": ["k8s", "kubernetes"],
+    "postgres": ["postgres", "postgresql"],
+    "postgresql": ["postgres", "postgresql"],
+    "react": ["react", "reactjs"],
+    "vue": ["vue", "vuejs"],
+    "node": ["node", "nodejs"],
+    "nodejs": ["node", "nodejs"],
+    "ml": ["ml", "machine learning"],
+    "фронтенд": ["фронтенд", "frontend"],
+    "frontend": ["фронтенд", "frontend"],
+    "бэкенд": ["бэкенд", "бекенд", "backend"],
+    "backend": ["бэкенд", "бекенд", "backend"],
+}
+
+_saved_queries = LRUCache(SAVED_QUERIES)
+_query_ids = itertools.count(1)
+
+
+def parse_search_query(text: str):
+    """
+    Разбирает текст после /search. Возвращает (groups, chat_id): groups — список групп
+    синонимов для database.search_jobs (из каждой группы должно встретиться хоть одно слово),
+    пустой, если искать нечего.
+    """
+    chat_id = None
+    groups = []
+    for word in text.split():
+        if word.lower().startswith("chat:") and len(word) > 5:
+            chat_id = word[5:]
+            continue
+        variants = STACK_KEYWORDS.get(word.lower().rstrip("*"))
+        if variants:
+            groups.append(list(variants))
+        elif word.strip('"*'):
+            groups.append([word.strip('"')])
+    return groups, chat_id
+
+
+def save_query(text: str) -> int:
+    """Запоминает запрос и возвращает короткий id для callback_data (лимит Telegram — 64 байта)."""
+    query_id = next(_query_ids)
+    _saved_queries.put(query_id, text)
+    return query_id
+
+
+def get_saved_query(query_id: int):
+    return _saved_queries.get(query_id)
+
+
+def format_results(query_text: str, rows, offset: int) -> str:
+    if not rows:
+        return "🔎 Ничего не найдено." if offset == 0 else "🔎 Больше результатов нет."
+    lines = [f"🔎 <b>Поиск:</b> {html.escape(query_text)} (результаты {offset + 1}–{offset + len(rows)})\n"]
+    for n, (job_hash, snippet, prob, created_at, chat_id) in enumerate(rows, offset + 1):
+        snippet = html.escape(" ".join(snippet.split())).replace("\x02", "<b>").replace("\x03", "</b>")
+        score = f"{prob:.2f}" if prob is not None else "—"
+        lines.append(f"{n}. {snippet}\n  score: {score} | чат: {chat_id} | {created_at}")
+    return "\n\n".join(lines)
+
+
+def results_keyboard(query_id: int, rows, offset: int, has_next: bool):
+    """Кнопки "полный текст" для каждой вакансии на странице + "назад/дальше"."""
+    keyboard = [[
+        InlineKeyboardButton(text=f"📋 {n}", callback_data=f"full_{row[0]}")
+        for n, row in enumerate(rows, offset + 1)
+    ]] if rows else []
+    buttons = []
+    if offset > 0:
+        buttons.append(InlineKeyboardButton(text="◀ Назад",
+                                            callback_data=f"srch_{query_id}_{max(offset - PAGE_SIZE, 0)}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton(text="Дальше ▶", callback_data=f"srch_{query_id}_{offset + PAGE_SIZE}"))
+    if buttons:
+        keyboard.append(buttons)
+    return InlineKeyboardMarkup(inline_keyboard=keyboard) if keyboard else None
@@ -0,0 +1,409 @@
+"""
+Асинхронный слой над src/db/database.py для кода, работающего в event loop
+(Telethon и aiogram): ни один запрос к SQLite не выполняется в потоке loop.
+
+- Записи уходят в один поток-писатель, который собирает их в групповые коммиты:
+  одна транзакция (и один fsync) на пачку до WRITE_BATCH_MAX_SIZE записей или
+  WRITE_BATCH_MAX_WAIT_MS с момента первой. Каждая запись — в своём SAVEPOINT,
+  поэтому ошибка одной не откатывает остальные.
+- Чтения выполняются в небольшом пуле потоков-читателей (в WAL они не мешают писателю).
+- Проверки дедупликации (already_sent, notification_already_sent) отвечают из
+  индекса в памяти (src/db/dedup_index.py), который обновляется здесь же сквозной
+  записью; в БД идут только промахи индекса — и тогда сначала дожидаются коммита
+  всех уже поставленных записей, поэтому видят свои же mark_sent / save_job_notification / save_job.
+"""
+
+import asyncio
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.db import database
+from src.db.dedup_index import SENT_WINDOW, dedup_index
+from src.utils.metrics import register
+
+# --- Настройки ---
+WRITE_BATCH_MAX_SIZE = 64      # максимум записей в одном коммите
+WRITE_BATCH_MAX_WAIT_MS = 5    # сколько писатель ждёт, пока наберётся пачка, мс
+READER_THREADS = 4             # размер пула потоков-читателей
+
+
+def _resolve(future, ok, value):
+    if future.done():
+        return  # вызывающий уже отменил ожидание
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class DBWriter:
+    """Единственный поток, который пишет в БД, с групповыми коммитами."""
+
+    def __init__(self, max_size: int = WRITE_BATCH_MAX_SIZE, max_wait_ms: float = WRITE_BATCH_MAX_WAIT_MS):
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Прогресс писателя — номера записей, а не future вызывающих (их могут отменить раньше коммита)
+        self._submitted = 0  # номер последней поставленной записи
+        self._committed = 0  # номер последней записи закоммиченной пачки (пачки идут строго по порядку)
+        self._waiters = []  # [(номер, loop, future)] — ожидающие barrier()
+
+        self.writes = 0
+        self.failed = 0
+        self.commits = 0
+        self.max_batch = 0
+        self.commit_time = 0.0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args, **kwargs) -> asyncio.Future:
+        """Ставит вызов fn(*args, **kwargs) в очередь писателя; future завершится после COMMIT."""
+        return self._put(functools.partial(fn, *args, **kwargs), exclusive=False)
+
+    def submit_exclusive(self, fn, *args, **kwargs) -> asyncio.Future:
+        """
+        Ставит fn(*args, **kwargs) в очередь писателя отдельно от пачек и вне транзакции
+        (например, VACUUM). Записи, поставленные после, ждут его в очереди, а не упираются в busy_timeout.
+        """
+        return self._put(functools.partial(fn, *args, **kwargs), exclusive=True)
+
+    def _put(self, call, exclusive: bool) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_started()
+        with self._lock:
+            # номер и место в очереди — под одним lock, чтобы номера шли в порядке очереди
+            self._submitted += 1
+            self._queue.put((call, loop, future, self._submitted, exclusive))
+        return future
+
+    async def barrier(self):
+        """Ждёт, пока будут закоммичены все записи, поставленные до этого вызова."""
+        with self._lock:
+            target = self._submitted
+            if self._committed >= target:
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append((target, waiter.get_loop(), waiter))
+        await waiter
+
+    def _advance(self, seq: int):
+        """Пачка до записи seq закоммичена (поток писателя): будим дождавшихся barrier()."""
+        with self._lock:
+            self._committed = seq
+            ready = [waiter for waiter in self._waiters if waiter[0] <= seq]
+            self._waiters = [waiter for waiter in self._waiters if waiter[0] > seq]
+        for _, loop, waiter in ready:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter, True, None)
+            except RuntimeError:
+                pass  # loop уже закрыт
+
+    def _run(self):
+        carry = None  # отдельный вызов, встреченный при наборе пачки, — после неё
+        while True:
+            item = carry if carry is not None else self._queue.get()
+            carry = None
+            if item is None:
+                return
+            if item[4]:
+                self._run_exclusive(item)
+                continue
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if item[4]:
+                    carry = item
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _run_exclusive(self, item):
+        call, loop, future, seq, _ = item
+        try:
+            result = (True, call())
+        except Exception as e:
+            self.failed += 1
+            result = (False, e)
+        self._advance(seq)
+        try:
+            loop.call_soon_threadsafe(_resolve, future, *result)
+        except RuntimeError:
+            pass  # loop уже закрыт
+
+    def _commit(self, batch):
+        started = time.perf_counter()
+        results = []
+        try:
+            with database.transaction() as conn:
+                for call, _, _, _, _ in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        value = call()
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        results.append((False, e))
+                    else:
+                        conn.execute("RELEASE write")
+                        results.append((True, value))
+        except Exception as e:
+            print(f"❌ Ошибка группового коммита ({len(batch)} записей): {e}")
+            results = [(False, e)] * len(batch)
+
+        self.commits += 1
+        self.writes += len(batch)
+        self.failed += sum(1 for ok, _ in results if not ok)
+        self.max_batch = max(self.max_batch, len(batch))
+        self.commit_time += time.perf_counter() - started
+
+        # результаты — после _advance: кто дождался своей записи, сразу видит её и в barrier()
+        self._advance(batch[-1][3])
+        for (_, loop, future, _, _), (ok, value) in zip(batch, results):
+            try:
+                loop.call_soon_threadsafe(_resolve, future, ok, value)
+            except RuntimeError:
+                pass  # loop уже закрыт — результат никому не нужен
+
+    def stop(self):
+        """Дописывает очередь и останавливает поток (блокирующий вызов)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self):
+        return {
+            "writes": self.writes,
+            "failed": self.failed,
+            "commits": self.commits,
+            "avg_batch": self.writes / self.commits if self.commits else 0.0,
+            "max_batch": self.max_batch,
+            "avg_commit_ms": self.commit_time / self.commits * 1000 if self.commits else 0.0,
+            "queue_size": self._queue.qsize(),
+        }
+
+
+db_writer = DBWriter()
+register("db_writer", db_writer.stats)
+_readers = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="db-reader")
+
+
+async def _read(fn, *args, consistent: bool = False):
+    if consistent:
+        await db_writer.barrier()
+    return await asyncio.get_running_loop().run_in_executor(_readers, functools.partial(fn, *args))
+
+
+# --- Индекс дедупликации ---
+
+async def warm_notification_index():
+    notifications = dedup_index.notifications
+    notifications.start_warm()
+    try:
+        rows = await _read(database.get_notification_keys, consistent=True)
+        index = await asyncio.to_thread(notifications.build, rows)
+    except BaseException:
+        notifications.abort_warm()
+        raise
+    notifications.finish_warm(index)
+    return len(rows)
+
+async def warm_dedup_index():
+    """Прогрев индекса дедупликации при старте: отправки за окно и все уведомления."""
+    start = time.perf_counter()
+    sent = await _read(database.get_recent_sent, SENT_WINDOW, consistent=True)
+    dedup_index.sent.load(sent)
+    notifications = await warm_notification_index()
+    stats = dedup_index.stats()
+    print(f"🧮 Индекс дедупликации: {len(sent)} получателей за окно, {notifications} уведомлений, "
+          f"{(stats['sent_memory_kb'] + stats['notify_memory_kb']) / 1024:.1f} МБ "
+          f"за {(time.perf_counter() - start) * 1000:.0f} мс")
+
+_rewarm_task = None
+
+def _rewarm_notifications_if_needed():
+    """Фильтр Блума переполнился — пересобираем его в фоне с большей ёмкостью."""
+    global _rewarm_task
+    if dedup_index.notifications.needs_rewarm and (_rewarm_task is None or _rewarm_task.done()):
+        _rewarm_task = asyncio.get_running_loop().create_task(warm_notification_index())
+
+
+async def close():
+    """Дожидается записи всех поставленных изменений и закрывает потоки."""
+    await asyncio.to_thread(db_writer.stop)
+    _readers.shutdown(wait=True)
+    database.close_connections()
+
+
+# --- Записи (через поток-писатель) ---
+
+async def save_job(text, chat_id=None, msg_id=None, prob=None, usernames=None, emails=None, links=None,
+                   cluster_hash=None):
+    return await db_writer.submit(database.save_job, text, chat_id=chat_id, msg_id=msg_id, prob=prob,
+                                  usernames=usernames, emails=emails, links=links, cluster_hash=cluster_hash)
+
+async def mark_sent(username: str, text_hash: str):
+    dedup_index.sent.add(username)
+    return await db_writer.submit(database.mark_sent, username, text_hash)
+
+async def save_job_notification(job_hash: str, notification_msg_id: str, sent_to_user: str):
+    dedup_index.notifications.add(job_hash, sent_to_user)
+    _rewarm_notifications_if_needed()
+    return await db_writer.submit(database.save_job_notification, job_hash, notification_msg_id, sent_to_user)
+
+async def update_notification_status(notification_msg_id: str, status: str):
+    return await db_writer.submit(database.update_notification_status, notification_msg_id, status)
+
+async def save_cluster_signature(cluster_hash: str, signature: bytes):
+    return await db_writer.submit(database.save_cluster_signature, cluster_hash, signature)
+
+async def set_job_cluster(job_hash: str, cluster_hash: str):
+    return await db_writer.submit(database.set_job_cluster, job_hash, cluster_hash)
+
+async def enqueue_outbox(job_hash: str, sends) -> int:
+    return await db_writer.submit(database.enqueue_outbox, job_hash, list(sends))
+
+async def finish_outbox(outbox_id: int, status: str, error: str = None):
+    row = await db_writer.submit(database.finish_outbox, outbox_id, status, error)
+    if row is not None and status == "sent":
+        dedup_index.sent.add(row[0])
+    return row
+
+async def retry_outbox(outbox_id: int, next_attempt_at: float, error: str, count_attempt: bool = True):
+    return await db_writer.submit(database.retry_outbox, outbox_id, next_attempt_at, error, count_attempt)
+
+async def save_peer_cache(username: str, peer_type: str, peer_id: int, access_hash: int, error: str,
+                          expires_at: float):
+    return await db_writer.submit(database.save_peer_cache, username, peer_type, peer_id, access_hash, error,
+                                  expires_at)
+
+async def save_uploaded_file(path: str, sha256: str, mtime: float, size: int, doc_id: int, access_hash: int,
+                             file_reference: bytes):
+    return await db_writer.submit(database.save_uploaded_file, path, sha256, mtime, size, doc_id, access_hash,
+                                  file_reference)
+
+async def save_notification_recipient(chat_id: str, mode: str = "instant", digest_minutes: int = None):
+    return await db_writer.submit(database.save_notification_recipient, chat_id, mode, digest_minutes)
+
+async def delete_notification_recipient(chat_id: str) -> bool:
+    return await db_writer.submit(database.delete_notification_recipient, chat_id)
+
+async def add_digest_items(job_hash: str, chat_ids, created_at: float) -> int:
+    return await db_writer.submit(database.add_digest_items, job_hash, chat_ids, created_at)
+
+async def finish_digest(chat_id: str, notification_msg_id: str, job_hashes, dropped=()):
+    for job_hash in job_hashes:
+        dedup_index.notifications.add(job_hash, f"chat_{chat_id}")
+    _rewarm_notifications_if_needed()
+    return await db_writer.submit(database.finish_digest, chat_id, notification_msg_id, job_hashes, dropped)
+
+async def rebuild_counters():
+    return await db_writer.submit(database.rebuild_counters)
+
+async def save_link_cache(url: str, emails, usernames, ok: bool, expires_at: float):
+    return await db_writer.submit(database.save_link_cache, url, emails, usernames, ok, expires_at)
+
+
+# --- Чтения (пул читателей) ---
+
+async def already_sent(username: str, text_hash: str) -> bool:
+    cached = dedup_index.sent.lookup(username)
+    if cached is not None:
+        return cached
+    return await _read(database.already_sent, username, text_hash, consistent=True)
+
+async def notification_already_sent(job_hash: str, target_user: str) -> bool:
+    cached = dedup_index.notifications.lookup(job_hash, target_user)
+    if cached is not None:
+        return cached
+    return await _read(database.notification_already_sent, job_hash, target_user, consistent=True)
+
+async def get_job_by_hash(job_hash: str):
+    return await _read(database.get_job_by_hash, job_hash, consistent=True)
+
+async def get_job_notification_status(job_hash: str, target_user: str):
+    return await _read(database.get_job_notification_status, job_hash, target_user, consistent=True)
+
+async def get_recent_jobs(limit: int = 10):
+    return await _read(database.get_recent_jobs, limit)
+
+async def get_jobs_page(before_id: int = None, after_id: int = None, limit: int = 10, **filters):
+    return await _read(functools.partial(database.get_jobs_page, before_id, after_id, limit, **filters))
+
+async def get_pending_notifications_count():
+    return await _read(database.get_pending_notifications_count)
+
+async def get_stats():
+    return await _read(database.get_stats)
+
+async def search_jobs(groups, chat_id: str = None, offset: int = 0, limit: int = 5):
+    return await _read(database.search_jobs, groups, chat_id, offset, limit)
+
+async def get_cluster_signatures(limit: int):
+    return await _read(database.get_cluster_signatures, limit)
+
+async def get_recent_job_texts(limit: int):
+    return await _read(database.get_recent_job_texts, limit)
+
+async def get_due_outbox(channel: str, now: float, limit: int):
+    return await _read(database.get_due_outbox, channel, now, limit, consistent=True)
+
+async def get_next_outbox_attempt(channel: str):
+    return await _read(database.get_next_outbox_attempt, channel, consistent=True)
+
+async def get_outbox_backlog():
+    return await _read(database.get_outbox_backlog)
+
+async def get_outbox_for_job(job_hash: str):
+    return await _read(database.get_outbox_for_job, job_hash, consistent=True)
+
+async def get_job_notifications(job_hash: str):
+    return await _read(database.get_job_notifications, job_hash, consistent=True)
+
+async def get_notification_recipients():
+    return await _read(database.get_notification_recipients, consistent=True)
+
+async def get_digest_items(chat_id: str):
+    return await _read(database.get_digest_items, chat_id, consistent=True)
+
+async def get_peer_cache(username: str):
+    return await _read(database.get_peer_cache, username)
+
+async def get_recent_contact_peers(jobs: int, now: float):
+    return await _read(database.get_recent_contact_peers, jobs, now)
+
+async def get_uploaded_file(path: str):
+    return await _read(database.get_uploaded_file, path, consistent=True)
+
+async def get_link_cache(url: str):
+    return await _read(database.get_link_cache, url)
+
+async def get_jobs_by_contact(value: str, kind: str = None, limit: int = 50):
+    return await _read(database.get_jobs_by_contact, value, kind, limit)
+
+async def count_jobs_by_contact(value: str, kind: str = None) -> int:
+    return await _read(database.count_jobs_by_contact, value, kind)
@@ -1,10 +1,93 @@
 import sqlite3
 import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
 
 DB_PATH = "data/db.sqlite3"
 
+# --- Настройки соединения ---
+# WAL: читатели не блокируют писателя; synchronous=NORMAL в WAL безопасен и не делает fsync на каждый коммит
+PRAGMAS = {
+    # Новый файл БД сразу создаётся с incremental auto_vacuum (для существующих см. init_db)
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,        # ~20 МБ страничного кэша
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,        # мс ждём блокировку вместо мгновенного "database is locked"
+    "temp_store": "MEMORY",
+}
+STATEMENT_CACHE_SIZE = 256       # сколько подготовленных запросов держит каждое соединение
+# Старые файлы БД не больше этого init_db сам переводит в auto_vacuum=INCREMENTAL (VACUUM — доли секунды);
+# большие остаются как есть, пока администратор не переведёт их командой /convert_db
+AUTO_VACUUM_CONVERT_MAX_MB = 32
+
+# Одно долгоживущее соединение на поток (sqlite3-соединения нельзя делить между потоками)
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_generation = 0  # увеличивается в close_connections(), чтобы потоки переоткрыли соединения
+
+def get_connection() -> sqlite3.Connection:
+    """Возвращает долгоживущее соединение текущего потока, при первом вызове открывает его."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_PATH and _local.generation == _generation:
+        return conn
+
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    # isolation_level=None: транзакциями управляем сами (см. transaction())
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, cached_statements=STATEMENT_CACHE_SIZE)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    _local.conn = conn
+    _local.path = DB_PATH
+    _local.generation = _generation
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+def close_connections():
+    """Закрывает все открытые соединения (при остановке и в тестах)."""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # соединение чужого потока — закроется вместе с ним
+        _connections.clear()
+    _local.conn = None
+
+@contextmanager
+def connection():
+    """Соединение для чтения: без явной транзакции (autocommit)."""
+    yield get_connection()
+
+@contextmanager
+def transaction():
+    """
+    Транзакция на долгоживущем соединении: COMMIT при успехе, ROLLBACK при ошибке.
+    Вложенный вызов выполняется в рамках уже открытой транзакции.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
+    with transaction() as conn:
         # Старая таблица для совместимости с /jobs (если ты её уже используешь)
         conn.execute("""CREATE TABLE IF NOT EXISTS messages (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -40,38 +123,458 @@ def init_db():
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (job_hash) REFERENCES jobs (hash)
         )""")
-    
-    # Очищаем дублирующие записи при инициализации
-    cleanup_duplicate_usernames()
-    # Очищаем старые записи
-    cleanup_old_records()
+        # Кэш контактов, найденных на страницах по ссылкам (ключ — нормализованный URL)
+        conn.execute("""CREATE TABLE IF NOT EXISTS link_cache (
+            url TEXT PRIMARY KEY,
+            emails TEXT,
+            usernames TEXT,
+            ok INTEGER DEFAULT 1,
+            expires_at REAL
+        )""")
+
+    # Индексы и прочие изменения схемы — версионированными миграциями
+    run_migrations()
+    # Старые записи удаляет планировщик src/db/retention.py, а не init_db
+    _enable_incremental_vacuum()
+
+def _enable_incremental_vacuum():
+    """
+    Старую небольшую БД сразу переводит в auto_vacuum=INCREMENTAL, чтобы после удаления
+    старых записей файл можно было уменьшать по частям (incremental_vacuum). Большую
+    не трогает: VACUUM переписывает весь файл и на это время блокирует БД — её переводит
+    администратор (convert_to_incremental_vacuum через /convert_db), а до тех пор очистка
+    просто удаляет пачками, и освободившиеся страницы переиспользуются без уменьшения файла.
+    """
+    if incremental_vacuum_enabled():
+        return
+    size_mb = get_db_size_mb()
+    if size_mb > AUTO_VACUUM_CONVERT_MAX_MB:
+        print(f"ℹ БД ({size_mb:.0f} МБ) без auto_vacuum=INCREMENTAL: после очистки файл не уменьшается. "
+              f"Перевести (БД будет занята на время VACUUM): /convert_db")
+        return
+    elapsed = convert_to_incremental_vacuum()
+    print(f"🛠 БД переведена в auto_vacuum=INCREMENTAL за {elapsed * 1000:.0f} мс")
+
+def incremental_vacuum_enabled() -> bool:
+    conn = get_connection()
+    # Соединение помнит режим с прошлого чтения заголовка: после /convert_db в другом потоке
+    # PRAGMA вернула бы старое значение, пока это соединение что-нибудь не прочитает
+    conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+def get_db_size_mb() -> float:
+    conn = get_connection()
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    return pages * conn.execute("PRAGMA page_size").fetchone()[0] / (1024 * 1024)
+
+def convert_to_incremental_vacuum() -> float:
+    """
+    Разово переводит БД в auto_vacuum=INCREMENTAL (режим хранится в файле). VACUUM
+    переписывает весь файл; вызывать вне транзакции. Возвращает длительность, сек (0 — уже переведена).
+    """
+    if incremental_vacuum_enabled():
+        return 0.0
+    conn = get_connection()
+    started = time.perf_counter()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+    return time.perf_counter() - started
+
+# --- Контакты вакансий ---
+# Каждый контакт — отдельная строка job_contacts: по ним можно искать
+# ("какие вакансии упоминают @recruiter_x") и не нужно резать строки при чтении.
+CONTACT_KINDS = ("username", "email", "link")
+
+def _normalize_contact(kind: str, value: str) -> str:
+    value = value.strip()
+    if kind == "username":
+        return _normalize_username(value)
+    if kind == "email":
+        return value.lower()
+    return value.rstrip("/")
+
+def _insert_job_contacts(conn, job_id: int, usernames, emails, links):
+    rows = []
+    for kind, values in zip(CONTACT_KINDS, (usernames, emails, links)):
+        for value in values or []:
+            if value and value.strip():
+                rows.append((job_id, kind, value.strip(), _normalize_contact(kind, value)))
+    conn.executemany("""INSERT OR IGNORE INTO job_contacts (job_id, kind, value, value_normalized)
+                        VALUES (?, ?, ?, ?)""", rows)
+
+def _backfill_job_contacts(conn):
+    """Разовый перенос контактов из строк через запятую в job_contacts."""
+    cur = conn.execute("SELECT id, usernames, emails, links FROM jobs")
+    for job_id, usernames, emails, links in cur.fetchall():
+        _insert_job_contacts(conn, job_id, *[(s or "").split(",") for s in (usernames, emails, links)])
+
+# --- Счётчики для /stats ---
+# Таблица counters(name, period, start, value): period = 'total' (start = '') | 'hour' | 'day'.
+# Обновляется триггерами в той же транзакции, что и запись, поэтому /stats не считает COUNT(*).
+# Итоги ('total') совпадают с числом строк в таблицах (при удалении старых уменьшаются),
+# почасовые и дневные корзины — история событий, при удалении строк не меняются.
+COUNTER_WINDOWS = {"today": 1, "7d": 7, "30d": 30}  # окно -> сколько дневных корзин суммировать
+
+def _counter_sql(name_sql: str, period: str, start_sql: str, delta: int) -> str:
+    return (f"INSERT INTO counters (name, period, start, value) VALUES ({name_sql}, '{period}', {start_sql}, {delta}) "
+            f"ON CONFLICT (name, period, start) DO UPDATE SET value = value + {delta};")
+
+def _bump_sql(name_sql: str, ts_sql: str = None, delta: int = 1) -> str:
+    """Итог name += delta, и (если задано время ts_sql) его почасовая и дневная корзины."""
+    sql = _counter_sql(name_sql, "total", "''", delta)
+    if ts_sql:
+        sql += _counter_sql(name_sql, "hour", f"strftime('%Y-%m-%d %H', {ts_sql})", delta)
+        sql += _counter_sql(name_sql, "day", f"date({ts_sql})", delta)
+    return sql
+
+def _chat_counter(chat_sql: str) -> str:
+    return f"'chat:' || COALESCE({chat_sql}, '?')"
+
+COUNTER_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_jobs_insert AFTER INSERT ON jobs BEGIN
+            {_bump_sql("'jobs'", "NEW.created_at")}
+            {_bump_sql(_chat_counter("NEW.chat_id"), "NEW.created_at")}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_jobs_delete AFTER DELETE ON jobs BEGIN
+            {_bump_sql("'jobs'", delta=-1)}
+            {_bump_sql(_chat_counter("OLD.chat_id"), delta=-1)}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_sent_insert AFTER INSERT ON jobs_sent BEGIN
+            {_bump_sql("'sent'", "NEW.sent_at")}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_sent_delete AFTER DELETE ON jobs_sent BEGIN
+            {_bump_sql("'sent'", delta=-1)}
+        END""",
+    # Статус уведомления — текущее состояние (итог), смена статуса — событие (корзины по времени смены)
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_notifications_insert AFTER INSERT ON job_notifications BEGIN
+            {_bump_sql("'notifications'", "NEW.created_at")}
+            {_bump_sql("'status:' || NEW.status")}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_notifications_status AFTER UPDATE OF status ON job_notifications
+        WHEN NEW.status IS NOT OLD.status BEGIN
+            {_bump_sql("'status:' || OLD.status", delta=-1)}
+            {_bump_sql("'status:' || NEW.status", "datetime('now')")}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_counters_notifications_delete AFTER DELETE ON job_notifications BEGIN
+            {_bump_sql("'notifications'", delta=-1)}
+            {_bump_sql("'status:' || OLD.status", delta=-1)}
+        END""",
+]
+
+def rebuild_counters():
+    """
+    Пересчитывает counters с нуля по исходным таблицам. Время смены статуса уведомления
+    не хранится, поэтому корзины confirmed/skipped восстанавливаются по времени создания.
+    Возвращает число строк в counters.
+    """
+    sources = [
+        ("'jobs'", "jobs", "created_at"),
+        (_chat_counter("chat_id"), "jobs", "created_at"),
+        ("'sent'", "jobs_sent", "sent_at"),
+        ("'notifications'", "job_notifications", "created_at"),
+    ]
+    with transaction() as conn:
+        conn.execute("DELETE FROM counters")
+        for name_sql, table, ts in sources:
+            conn.execute(f"""INSERT INTO counters (name, period, start, value)
+                             SELECT {name_sql}, 'total', '', COUNT(*) FROM {table} GROUP BY 1""")
+            conn.execute(f"""INSERT INTO counters (name, period, start, value)
+                             SELECT {name_sql}, 'hour', strftime('%Y-%m-%d %H', {ts}), COUNT(*)
+                             FROM {table} GROUP BY 1, 3""")
+            conn.execute(f"""INSERT INTO counters (name, period, start, value)
+                             SELECT {name_sql}, 'day', date({ts}), COUNT(*) FROM {table} GROUP BY 1, 3""")
+        conn.execute("""INSERT INTO counters (name, period, start, value)
+                        SELECT 'status:' || status, 'total', '', COUNT(*) FROM job_notifications GROUP BY 1""")
+        for period, start_sql in (("hour", "strftime('%Y-%m-%d %H', created_at)"), ("day", "date(created_at)")):
+            conn.execute(f"""INSERT INTO counters (name, period, start, value)
+                             SELECT 'status:' || status, '{period}', {start_sql}, COUNT(*)
+                             FROM job_notifications WHERE status != 'pending' GROUP BY 1, 3""")
+        # Таблица пустая — итог 0, а не отсутствие строки
+        for name in ("jobs", "sent", "notifications"):
+            conn.execute("INSERT OR IGNORE INTO counters (name, period, start, value) VALUES (?, 'total', '', 0)",
+                         (name,))
+        return conn.execute("SELECT COUNT(*) FROM counters").fetchone()[0]
+
+# --- Миграции схемы ---
+# Каждая миграция: (версия, описание, шаги). Шаг — SQL-строка или функция f(conn).
+# Применённые версии записываются в schema_version; при старте выполняются только новые,
+# каждая — в своей транзакции. Уже выпущенные миграции не меняем, только добавляем новые.
+MIGRATIONS = [
+    (1, "индексы для горячих запросов", [
+        # already_sent: WHERE username=? AND sent_at > ? ORDER BY sent_at — покрывающий индекс
+        "CREATE INDEX IF NOT EXISTS idx_jobs_sent_username_sent_at ON jobs_sent (username, sent_at)",
+        # /stats (последние отправки) и очистка старых записей
+        "CREATE INDEX IF NOT EXISTS idx_jobs_sent_sent_at ON jobs_sent (sent_at)",
+        # notification_already_sent и get_job_notification_status — покрывающий индекс
+        """CREATE INDEX IF NOT EXISTS idx_job_notifications_job_user
+           ON job_notifications (job_hash, sent_to_user, status, created_at)""",
+        # update_notification_status
+        "CREATE INDEX IF NOT EXISTS idx_job_notifications_msg_id ON job_notifications (notification_msg_id)",
+        # /notifications и /stats
+        "CREATE INDEX IF NOT EXISTS idx_job_notifications_status ON job_notifications (status)",
+        "CREATE INDEX IF NOT EXISTS idx_job_notifications_created_at ON job_notifications (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_chat_id ON jobs (chat_id)",
+        "CREATE INDEX IF NOT EXISTS idx_link_cache_expires_at ON link_cache (expires_at)",
+    ]),
+    (2, "нормализованные контакты вакансий (job_contacts)", [
+        """CREATE TABLE IF NOT EXISTS job_contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL REFERENCES jobs (id),
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            value_normalized TEXT NOT NULL,
+            UNIQUE (job_id, kind, value_normalized)
+        )""",
+        # Поиск вакансий по контакту — по индексу, независимо от размера таблицы
+        "CREATE INDEX IF NOT EXISTS idx_job_contacts_value ON job_contacts (value_normalized, kind, job_id)",
+        # Контакты удаляются вместе с вакансией (в т.ч. при очистке старых)
+        """CREATE TRIGGER IF NOT EXISTS trg_jobs_delete_contacts AFTER DELETE ON jobs BEGIN
+               DELETE FROM job_contacts WHERE job_id = OLD.id;
+           END""",
+        _backfill_job_contacts,
+    ]),
+    (3, "уникальный ключ (username, text_hash) в jobs_sent", [
+        # Разовая чистка старых записей, раньше она выполнялась при каждом старте:
+        # приводим username к нормализованному виду (как _normalize_username) ...
+        """UPDATE jobs_sent SET username = lower(CASE WHEN substr(trim(username), 1, 1) = '@'
+                                                     THEN substr(trim(username), 2)
+                                                     ELSE trim(username) END)
+           WHERE username != lower(CASE WHEN substr(trim(username), 1, 1) = '@'
+                                        THEN substr(trim(username), 2)
+                                        ELSE trim(username) END)""",
+        # ... и оставляем по одной (самой свежей) записи на пару (username, text_hash)
+        """DELETE FROM jobs_sent WHERE id IN (
+               SELECT id FROM (
+                   SELECT id, ROW_NUMBER() OVER (PARTITION BY username, text_hash
+                                                 ORDER BY sent_at DESC, id DESC) AS rn
+                   FROM jobs_sent)
+               WHERE rn > 1)""",
+        # Дальше дубли не появляются: mark_sent делает UPSERT по этому ключу
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_sent_username_hash ON jobs_sent (username, text_hash)",
+    ]),
+    (4, "счётчики для /stats (counters)", [
+        """CREATE TABLE IF NOT EXISTS counters (
+            name TEXT NOT NULL,
+            period TEXT NOT NULL,
+            start TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, period, start)
+        ) WITHOUT ROWID""",
+        # Итоги по всем чатам (period='total') — без прохода по их почасовым/дневным корзинам
+        "CREATE INDEX IF NOT EXISTS idx_counters_period_name ON counters (period, name)",
+        *COUNTER_TRIGGERS,
+        lambda conn: rebuild_counters(),
+    ]),
+    (5, "полнотекстовый поиск по вакансиям (jobs_fts)", [
+        # external content: текст хранится только в jobs, в jobs_fts — лишь индекс
+        """CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+            text, content='jobs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_jobs_fts_insert AFTER INSERT ON jobs BEGIN
+               INSERT INTO jobs_fts (rowid, text) VALUES (NEW.id, NEW.text);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_jobs_fts_delete AFTER DELETE ON jobs BEGIN
+               INSERT INTO jobs_fts (jobs_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_jobs_fts_update AFTER UPDATE OF text ON jobs BEGIN
+               INSERT INTO jobs_fts (jobs_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+               INSERT INTO jobs_fts (rowid, text) VALUES (NEW.id, NEW.text);
+           END""",
+        # Индексируем уже сохранённые вакансии
+        "INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')",
+    ]),
+    (6, "кластеры почти одинаковых вакансий (job_clusters)", [
+        # NULL — вакансия сама себе кластер (старые записи, см. COALESCE в запросах)
+        "ALTER TABLE jobs ADD COLUMN cluster_hash TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_cluster_hash ON jobs (cluster_hash)",
+        # MinHash-подпись первой вакансии каждого кластера (src/parser/near_dup.py)
+        """CREATE TABLE IF NOT EXISTS job_clusters (
+            cluster_hash TEXT PRIMARY KEY,
+            signature BLOB NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_job_clusters_created_at ON job_clusters (created_at)",
+    ]),
+    (7, "очередь исходящих отправок (outbox)", [
+        # Одна строка на (канал, получатель, вакансия); status: pending | sent | skipped | failed
+        """CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            job_hash TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            sent_at TEXT,
+            UNIQUE (channel, recipient, job_hash)
+        )""",
+        # Выборка планировщика: только ожидающие, по каналу и времени следующей попытки
+        """CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (channel, next_attempt_at)
+           WHERE status = 'pending'""",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_job_hash ON outbox (job_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_created_at ON outbox (created_at)",
+    ]),
+    (8, "кэш разрешения username -> peer для Telethon (peer_cache)", [
+        # peer_type: user | channel | chat; error — отрицательная запись (username не найден и т.п.)
+        """CREATE TABLE IF NOT EXISTS peer_cache (
+            username TEXT PRIMARY KEY,
+            peer_type TEXT,
+            peer_id INTEGER,
+            access_hash INTEGER,
+            error TEXT,
+            expires_at REAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_peer_cache_expires_at ON peer_cache (expires_at)",
+    ]),
+    (9, "загруженные в Telegram файлы (uploaded_files)", [
+        # sha256/mtime/size — версия файла на диске, doc_* — документ Telegram, загруженный из неё
+        """CREATE TABLE IF NOT EXISTS uploaded_files (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            doc_id INTEGER NOT NULL,
+            access_hash INTEGER NOT NULL,
+            file_reference BLOB NOT NULL,
+            uploaded_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]),
+    (10, "получатели уведомлений и дайджесты (notification_recipients, digest_items)", [
+        # mode: instant — уведомление на каждую вакансию, digest — одно сообщение за digest_minutes
+        """CREATE TABLE IF NOT EXISTS notification_recipients (
+            chat_id TEXT PRIMARY KEY,
+            mode TEXT NOT NULL DEFAULT 'instant',
+            digest_minutes INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )""",
+        # Чат, который раньше был прописан в TARGET_CHAT_IDS
+        "INSERT OR IGNORE INTO notification_recipients (chat_id) VALUES ('1011374221')",
+        # Вакансии, ждущие дайджеста (created_at — unix time постановки)
+        """CREATE TABLE IF NOT EXISTS digest_items (
+            chat_id TEXT NOT NULL,
+            job_hash TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (chat_id, job_hash)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_digest_items_created_at ON digest_items (created_at)",
+    ]),
+]
+
+def get_schema_version() -> int:
+    with connection() as conn:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def run_migrations():
+    """Доводит схему существующей БД до последней версии (на месте, при старте)."""
+    with transaction() as conn:
+        conn.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )""")
+    current = get_schema_version()
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        started = time.perf_counter()
+        with transaction() as conn:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                         (version, description))
+        print(f"🛠 Миграция {version} ({description}) применена за {(time.perf_counter() - started) * 1000:.0f} мс")
 
 def _hash_text(text: str) -> str:
     return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:16]
 
 def save_message(text: str):
-    with sqlite3.connect(DB_PATH) as conn:
+    with transaction() as conn:
         conn.execute("INSERT INTO messages (text) VALUES (?)", (text,))
 
 def get_all_messages():
-    with sqlite3.connect(DB_PATH) as conn:
+    with connection() as conn:
         cur = conn.execute("SELECT text FROM messages ORDER BY id DESC")
         return [r[0] for r in cur.fetchall()]
 
-def save_job(text, chat_id=None, msg_id=None, prob=None, usernames=None, emails=None, links=None):
+def save_job(text, chat_id=None, msg_id=None, prob=None, usernames=None, emails=None, links=None,
+             cluster_hash=None):
     h = _hash_text(text)
-    usernames_s = ",".join(usernames or [])
-    emails_s = ",".join(emails or [])
-    links_s = ",".join(links or [])
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute("""INSERT OR IGNORE INTO jobs
-                        (text, chat_id, msg_id, prob, usernames, emails, links, hash)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                     (text, str(chat_id) if chat_id is not None else None,
-                      str(msg_id) if msg_id is not None else None,
-                      prob, usernames_s, emails_s, links_s, h))
+    with transaction() as conn:
+        # Колонки usernames/emails/links остаются в схеме для старых БД, контакты — в job_contacts
+        cur = conn.execute("""INSERT OR IGNORE INTO jobs
+                              (text, chat_id, msg_id, prob, hash, cluster_hash)
+                              VALUES (?, ?, ?, ?, ?, ?)""",
+                           (text, str(chat_id) if chat_id is not None else None,
+                            str(msg_id) if msg_id is not None else None,
+                            prob, h, cluster_hash))
+        if cur.rowcount:
+            _insert_job_contacts(conn, cur.lastrowid, usernames, emails, links)
     return h  # возвращаем хэш для связи
 
+def save_cluster_signature(cluster_hash: str, signature: bytes):
+    """Запоминает MinHash-подпись нового кластера почти одинаковых вакансий."""
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO job_clusters (cluster_hash, signature) VALUES (?, ?)",
+                     (cluster_hash, signature))
+
+def set_job_cluster(job_hash: str, cluster_hash: str):
+    with transaction() as conn:
+        conn.execute("UPDATE jobs SET cluster_hash = ? WHERE hash = ?", (cluster_hash, job_hash))
+
+def get_cluster_signatures(limit: int):
+    """Подписи limit самых свежих кластеров: [(cluster_hash, signature)], от старых к новым."""
+    with connection() as conn:
+        rows = conn.execute("""SELECT cluster_hash, signature FROM job_clusters
+                               ORDER BY created_at DESC LIMIT ?""", (limit,)).fetchall()
+    return rows[::-1]
+
+def get_recent_job_texts(limit: int):
+    """[(hash, text)] limit самых свежих вакансий, от старых к новым — для первичной кластеризации."""
+    with connection() as conn:
+        rows = conn.execute("SELECT hash, text FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    return rows[::-1]
+
+def _get_contacts(conn, job_ids):
+    """{job_id: (usernames, emails, links)} одним запросом, в порядке сохранения."""
+    contacts = {job_id: ([], [], []) for job_id in job_ids}
+    if not contacts:
+        return contacts
+    placeholders = ",".join("?" * len(contacts))
+    cur = conn.execute(f"""SELECT job_id, kind, value FROM job_contacts
+                           WHERE job_id IN ({placeholders}) ORDER BY id""", list(contacts))
+    for job_id, kind, value in cur.fetchall():
+        contacts[job_id][CONTACT_KINDS.index(kind)].append(value)
+    return contacts
+
+def get_jobs_by_contact(value: str, kind: str = None, limit: int = 50):
+    """Хэши вакансий, где встречается контакт (username с @ или без, email, ссылка), новые первыми."""
+    kinds = [kind] if kind else list(CONTACT_KINDS)
+    placeholders = ",".join("?" * len(kinds))
+    params = [_normalize_contact(k, value) for k in kinds] + kinds
+    with connection() as conn:
+        cur = conn.execute(f"""SELECT j.hash FROM job_contacts c JOIN jobs j ON j.id = c.job_id
+                               WHERE c.value_normalized IN ({placeholders}) AND c.kind IN ({placeholders})
+                               ORDER BY c.job_id DESC LIMIT ?""",
+                           params + [limit])
+        return [r[0] for r in cur.fetchall()]
+
+def count_jobs_by_contact(value: str, kind: str = None) -> int:
+    """Сколько вакансий пришло с этим контактом."""
+    kinds = [kind] if kind else list(CONTACT_KINDS)
+    placeholders = ",".join("?" * len(kinds))
+    params = [_normalize_contact(k, value) for k in kinds] + kinds
+    with connection() as conn:
+        cur = conn.execute(f"""SELECT COUNT(DISTINCT job_id) FROM job_contacts
+                               WHERE value_normalized IN ({placeholders}) AND kind IN ({placeholders})""",
+                           params)
+        return cur.fetchone()[0]
+
 def _normalize_username(username: str) -> str:
     """Нормализует username: убирает @ и приводит к нижнему регистру"""
     username = username.strip()
@@ -80,7 +583,7 @@ def _normalize_username(username: str) -> str:
     return username.lower()
 
 def already_sent(username: str, text_hash: str) -> bool:
-    with sqlite3.connect(DB_PATH) as conn:
+    with connection() as conn:
         normalized_username = _normalize_username(username)
         # Проверяем, отправляли ли мы резюме этому пользователю за последние 24 часа
         cur = conn.execute("""
@@ -94,57 +597,113 @@ def already_sent(username: str, text_hash: str) -> bool:
         return result is not None
 
 def mark_sent(username: str, text_hash: str):
-    with sqlite3.connect(DB_PATH) as conn:
+    with transaction() as conn:
         normalized_username = _normalize_username(username)
-        # Сохраняем запись с текущим временем
-        conn.execute("INSERT INTO jobs_sent (username, text_hash, sent_at) VALUES (?, ?, datetime('now'))",
+        # Одна запись на (username, вакансия): повторная отправка только обновляет время
+        conn.execute("""INSERT INTO jobs_sent (username, text_hash, sent_at) VALUES (?, ?, datetime('now'))
+                        ON CONFLICT (username, text_hash) DO UPDATE SET sent_at = excluded.sent_at""",
                      (normalized_username, text_hash))
 
+def get_recent_sent(window_seconds: int):
+    """Последняя отправка каждому username за окно: [(username, sent_at unix time)] — прогрев индекса дедупликации."""
+    with connection() as conn:
+        return conn.execute("""SELECT username, CAST(strftime('%s', MAX(sent_at)) AS REAL) FROM jobs_sent
+                               WHERE sent_at > datetime('now', ?) GROUP BY username""",
+                            (f"-{int(window_seconds)} seconds",)).fetchall()
+
+def get_notification_keys():
+    """Все пары (job_hash, sent_to_user) из job_notifications — прогрев индекса дедупликации."""
+    with connection() as conn:
+        return conn.execute("SELECT job_hash, sent_to_user FROM job_notifications").fetchall()
+
 def get_recent_jobs(limit: int = 10):
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute("""SELECT text, usernames, emails, links, prob, created_at
-                              FROM jobs ORDER BY id DESC LIMIT ?""", (limit,))
-        return cur.fetchall()
+    """Последние вакансии: (text, usernames, emails, links, prob, created_at), контакты — списками"""
+    with connection() as conn:
+        rows = conn.execute("""SELECT id, text, prob, created_at
+                               FROM jobs ORDER BY id DESC LIMIT ?""", (limit,)).fetchall()
+        contacts = _get_contacts(conn, [row[0] for row in rows])
+    return [(text, *contacts[job_id], prob, created_at) for job_id, text, prob, created_at in rows]
+
+PREVIEW_CHARS = 200  # сколько символов текста вакансии показывает /jobs
+
+def _created_at_id_bound(conn, since: str = None, until: str = None):
+    """
+    Граница id для фильтра по дате: вакансии пишутся по порядку, поэтому created_at
+    растёт вместе с id, и диапазон дат — это диапазон id (по индексу created_at, одна строка).
+    """
+    if since is not None:
+        row = conn.execute("SELECT id FROM jobs WHERE created_at >= ? ORDER BY created_at LIMIT 1",
+                           (since,)).fetchone()
+    else:
+        row = conn.execute("SELECT id FROM jobs WHERE created_at < ? ORDER BY created_at DESC LIMIT 1",
+                           (until,)).fetchone()
+    return row[0] if row else None
+
+def get_jobs_page(before_id: int = None, after_id: int = None, limit: int = 10, min_prob: float = None,
+                  chat_id: str = None, since: str = None, until: str = None, has_contacts: bool = False):
+    """
+    Страница вакансий для /jobs с курсором по id (без OFFSET): before_id — более старые,
+    after_id — более новые, без курсора — самые свежие. Фильтры: min_prob, chat_id,
+    since/until ('YYYY-MM-DD HH:MM:SS', until не включается), has_contacts.
+    Возвращает (rows, has_older, has_newer); строки — от новых к старым:
+    (id, preview, truncated, prob, created_at, chat_id, usernames, emails, links).
+    Текст читается только первые PREVIEW_CHARS символов.
+    """
+    conditions, params = [], []
+    with connection() as conn:
+        if since is not None:
+            low = _created_at_id_bound(conn, since=since)
+            if low is None:
+                return [], False, False
+            conditions.append("id >= ?")
+            params.append(low)
+        if until is not None:
+            high = _created_at_id_bound(conn, until=until)
+            if high is None:
+                return [], False, False
+            conditions.append("id <= ?")
+            params.append(high)
+        if min_prob is not None:
+            conditions.append("prob >= ?")
+            params.append(min_prob)
+        if chat_id is not None:
+            conditions.append("chat_id = ?")
+            params.append(str(chat_id))
+        if has_contacts:
+            conditions.append("EXISTS (SELECT 1 FROM job_contacts c WHERE c.job_id = jobs.id)")
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+            order = "ASC"
+        else:
+            if before_id is not None:
+                conditions.append("id < ?")
+                params.append(before_id)
+            order = "DESC"
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        rows = conn.execute(f"""SELECT id, substr(text, 1, ?), length(text) > ?, prob, created_at, chat_id
+                                FROM jobs {where} ORDER BY id {order} LIMIT ?""",
+                            [PREVIEW_CHARS, PREVIEW_CHARS] + params + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if order == "ASC":
+            rows.reverse()
+        contacts = _get_contacts(conn, [row[0] for row in rows])
+    rows = [(job_id, preview, bool(truncated), prob, created_at, chat, *contacts[job_id])
+            for job_id, preview, truncated, prob, created_at, chat in rows]
+    if after_id is not None:
+        return rows, True, more
+    return rows, more, before_id is not None
 
 def get_jobs_sent():
     """Отладочная функция для просмотра таблицы jobs_sent"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connection() as conn:
         cur = conn.execute("SELECT username, text_hash, sent_at FROM jobs_sent ORDER BY sent_at DESC")
         return cur.fetchall()
 
-def cleanup_duplicate_usernames():
-    """Очищает дублирующие записи в jobs_sent, оставляя только нормализованные username"""
-    with sqlite3.connect(DB_PATH) as conn:
-        # Получаем все записи
-        cur = conn.execute("SELECT username, text_hash, sent_at FROM jobs_sent")
-        records = cur.fetchall()
-        
-        # Группируем по нормализованному username и text_hash
-        normalized_records = {}
-        for username, text_hash, sent_at in records:
-            normalized_username = _normalize_username(username)
-            key = (normalized_username, text_hash)
-            if key not in normalized_records:
-                normalized_records[key] = (normalized_username, text_hash, sent_at)
-        
-        # Очищаем таблицу и вставляем только уникальные записи
-        conn.execute("DELETE FROM jobs_sent")
-        for normalized_username, text_hash, sent_at in normalized_records.values():
-            conn.execute("INSERT INTO jobs_sent (username, text_hash, sent_at) VALUES (?, ?, ?)",
-                        (normalized_username, text_hash, sent_at))
-        
-        print(f"🧹 Очищено дублирующих записей. Осталось {len(normalized_records)} уникальных записей.")
-
-def cleanup_old_records():
-    """Удаляет записи старше 7 дней"""
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute("DELETE FROM jobs_sent WHERE sent_at < datetime('now', '-7 days')")
-        deleted_count = cur.rowcount
-        print(f"🗑️ Удалено {deleted_count} старых записей (старше 7 дней)")
-
 def save_job_notification(job_hash: str, notification_msg_id: str, sent_to_user: str):
     """Сохраняет информацию об отправленном уведомлении о вакансии"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with transaction() as conn:
         conn.execute("""INSERT INTO job_notifications 
                         (job_hash, notification_msg_id, sent_to_user, status)
                         VALUES (?, ?, ?, 'pending')""",
@@ -152,29 +711,83 @@ def save_job_notification(job_hash: str, notification_msg_id: str, sent_to_user:
 
 def update_notification_status(notification_msg_id: str, status: str):
     """Обновляет статус уведомления (applied/not_applied)"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with transaction() as conn:
         conn.execute("""UPDATE job_notifications 
                         SET status = ? 
                         WHERE notification_msg_id = ?""",
                      (status, notification_msg_id))
 
+def get_job_notifications(job_hash: str):
+    """Уведомления о вакансии: [(notification_msg_id, sent_to_user, status)]"""
+    with connection() as conn:
+        return conn.execute("""SELECT notification_msg_id, sent_to_user, status FROM job_notifications
+                               WHERE job_hash = ?""", (job_hash,)).fetchall()
+
+def get_notification_recipients():
+    """Получатели уведомлений: [(chat_id, mode, digest_minutes)]"""
+    with connection() as conn:
+        return conn.execute("""SELECT chat_id, mode, digest_minutes FROM notification_recipients
+                               ORDER BY created_at, chat_id""").fetchall()
+
+def save_notification_recipient(chat_id: str, mode: str = "instant", digest_minutes: int = None):
+    with transaction() as conn:
+        conn.execute("""INSERT INTO notification_recipients (chat_id, mode, digest_minutes) VALUES (?, ?, ?)
+                        ON CONFLICT (chat_id) DO UPDATE SET mode = excluded.mode,
+                                                           digest_minutes = excluded.digest_minutes""",
+                     (str(chat_id), mode, digest_minutes))
+
+def delete_notification_recipient(chat_id: str) -> bool:
+    """Удаляет получателя вместе с его неотправленным дайджестом. True — получатель был."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM digest_items WHERE chat_id = ?", (str(chat_id),))
+        return conn.execute("DELETE FROM notification_recipients WHERE chat_id = ?",
+                            (str(chat_id),)).rowcount > 0
+
+def add_digest_items(job_hash: str, chat_ids, created_at: float) -> int:
+    """Ставит вакансию в дайджест чатов; уже стоящие пропускаются. Возвращает число новых."""
+    with transaction() as conn:
+        return conn.executemany("""INSERT OR IGNORE INTO digest_items (chat_id, job_hash, created_at)
+                                   VALUES (?, ?, ?)""",
+                                [(str(chat_id), job_hash, created_at) for chat_id in chat_ids]).rowcount
+
+def get_digest_items(chat_id: str):
+    """Вакансии, ждущие дайджеста чата: [(job_hash, created_at)] от старых к новым."""
+    with connection() as conn:
+        return conn.execute("""SELECT job_hash, created_at FROM digest_items WHERE chat_id = ?
+                               ORDER BY created_at""", (str(chat_id),)).fetchall()
+
+def finish_digest(chat_id: str, notification_msg_id: str, job_hashes, dropped=()):
+    """
+    Дайджест отправлен: вакансии job_hashes уходят из очереди и записываются в
+    job_notifications со статусом digest; dropped (вакансий уже нет) просто удаляются.
+    """
+    recipient = f"chat_{chat_id}"
+    with transaction() as conn:
+        conn.executemany("""INSERT INTO job_notifications (job_hash, notification_msg_id, sent_to_user, status)
+                            VALUES (?, ?, ?, 'digest')""",
+                         [(job_hash, notification_msg_id, recipient) for job_hash in job_hashes])
+        conn.executemany("DELETE FROM digest_items WHERE chat_id = ? AND job_hash = ?",
+                         [(str(chat_id), job_hash) for job_hash in [*job_hashes, *dropped]])
+
 def get_job_by_hash(job_hash: str):
-    """Получает информацию о вакансии по хэшу"""
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute("""SELECT text, usernames, emails, links, prob, created_at
-                              FROM jobs WHERE hash = ?""", (job_hash,))
-        return cur.fetchone()
+    """Вакансия по хэшу: (text, usernames, emails, links, prob, created_at), контакты — списками"""
+    with connection() as conn:
+        row = conn.execute("""SELECT id, text, prob, created_at
+                              FROM jobs WHERE hash = ?""", (job_hash,)).fetchone()
+        if row is None:
+            return None
+        job_id, text, prob, created_at = row
+        usernames, emails, links = _get_contacts(conn, [job_id])[job_id]
+    return text, usernames, emails, links, prob, created_at
 
 def get_pending_notifications_count():
     """Получает количество ожидающих уведомлений"""
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute("""SELECT COUNT(*) FROM job_notifications 
-                              WHERE status = 'pending'""")
-        return cur.fetchone()[0]
+    with connection() as conn:
+        return _counter_totals(conn, ["status:pending"])["status:pending"]
 
 def notification_already_sent(job_hash: str, target_user: str) -> bool:
     """Проверяет, было ли уже отправлено уведомление для данной вакансии"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connection() as conn:
         cur = conn.execute("""SELECT COUNT(*) FROM job_notifications 
                               WHERE job_hash = ? AND sent_to_user = ?""", 
                           (job_hash, target_user))
@@ -182,8 +795,258 @@ def notification_already_sent(job_hash: str, target_user: str) -> bool:
 
 def get_job_notification_status(job_hash: str, target_user: str):
     """Получает статус уведомления для вакансии"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with connection() as conn:
         cur = conn.execute("""SELECT status, created_at FROM job_notifications 
                               WHERE job_hash = ? AND sent_to_user = ?""", 
                           (job_hash, target_user))
         return cur.fetchone()
+
+
+def get_link_cache(url: str):
+    """Возвращает (emails, usernames, ok, expires_at) из кэша ссылок или None"""
+    with connection() as conn:
+        cur = conn.execute("""SELECT emails, usernames, ok, expires_at
+                              FROM link_cache WHERE url = ?""", (url,))
+        row = cur.fetchone()
+    if not row:
+        return None
+    emails, usernames, ok, expires_at = row
+    return json.loads(emails or "[]"), json.loads(usernames or "[]"), bool(ok), expires_at
+
+def save_link_cache(url: str, emails, usernames, ok: bool, expires_at: float):
+    """Сохраняет (или перезаписывает) результат обработки ссылки"""
+    with transaction() as conn:
+        conn.execute("""INSERT OR REPLACE INTO link_cache (url, emails, usernames, ok, expires_at)
+                        VALUES (?, ?, ?, ?, ?)""",
+                     (url, json.dumps(list(emails or [])), json.dumps(list(usernames or [])),
+                      1 if ok else 0, expires_at))
+
+def enqueue_outbox(job_hash: str, sends) -> int:
+    """Ставит отправки [(channel, recipient)] в outbox; уже поставленные пропускаются. Возвращает число новых."""
+    with transaction() as conn:
+        cur = conn.executemany("""INSERT OR IGNORE INTO outbox (channel, recipient, job_hash)
+                                  VALUES (?, ?, ?)""",
+                               [(channel, recipient, job_hash) for channel, recipient in sends])
+        return cur.rowcount
+
+def get_due_outbox(channel: str, now: float, limit: int):
+    """Отправки канала, которым пора: [(id, recipient, job_hash, attempts)] в порядке очереди."""
+    with connection() as conn:
+        return conn.execute("""SELECT id, recipient, job_hash, attempts FROM outbox
+                               WHERE status = 'pending' AND channel = ? AND next_attempt_at <= ?
+                               ORDER BY next_attempt_at, id LIMIT ?""", (channel, now, limit)).fetchall()
+
+def get_outbox_for_job(job_hash: str):
+    """Отправки резюме по вакансии: [(channel, recipient, status, attempts, last_error)] в порядке постановки."""
+    with connection() as conn:
+        return conn.execute("""SELECT channel, recipient, status, attempts, last_error FROM outbox
+                               WHERE job_hash = ? ORDER BY id""", (job_hash,)).fetchall()
+
+def get_next_outbox_attempt(channel: str):
+    """Время ближайшей попытки в канале (unix time) или None, если очередь пуста."""
+    with connection() as conn:
+        return conn.execute("""SELECT MIN(next_attempt_at) FROM outbox
+                               WHERE status = 'pending' AND channel = ?""", (channel,)).fetchone()[0]
+
+def finish_outbox(outbox_id: int, status: str, error: str = None):
+    """Закрывает отправку: sent (заодно пишет jobs_sent), skipped или failed. Возвращает (recipient, job_hash)."""
+    with transaction() as conn:
+        row = conn.execute("""UPDATE outbox SET status = ?, last_error = ?, attempts = attempts + 1,
+                                                sent_at = CASE WHEN ? = 'sent' THEN datetime('now') END
+                              WHERE id = ? RETURNING recipient, job_hash""",
+                           (status, error, status, outbox_id)).fetchone()
+        if row is not None and status == "sent":
+            mark_sent(*row)
+    return row
+
+def retry_outbox(outbox_id: int, next_attempt_at: float, error: str, count_attempt: bool = True):
+    """Откладывает отправку до next_attempt_at (FloodWait не считается попыткой)."""
+    with transaction() as conn:
+        conn.execute("""UPDATE outbox SET next_attempt_at = ?, last_error = ?, attempts = attempts + ?
+                        WHERE id = ?""", (next_attempt_at, error, 1 if count_attempt else 0, outbox_id))
+
+def get_outbox_backlog():
+    """{channel: сколько отправок ждёт}"""
+    with connection() as conn:
+        return dict(conn.execute("""SELECT channel, COUNT(*) FROM outbox
+                                    WHERE status = 'pending' GROUP BY channel""").fetchall())
+
+def get_peer_cache(username: str):
+    """(peer_type, peer_id, access_hash, error, expires_at) для username или None"""
+    with connection() as conn:
+        return conn.execute("""SELECT peer_type, peer_id, access_hash, error, expires_at
+                               FROM peer_cache WHERE username = ?""",
+                            (_normalize_username(username),)).fetchone()
+
+def save_peer_cache(username: str, peer_type: str, peer_id: int, access_hash: int, error: str,
+                    expires_at: float):
+    with transaction() as conn:
+        conn.execute("""INSERT OR REPLACE INTO peer_cache
+                        (username, peer_type, peer_id, access_hash, error, expires_at)
+                        VALUES (?, ?, ?, ?, ?, ?)""",
+                     (_normalize_username(username), peer_type, peer_id, access_hash, error, expires_at))
+
+def get_recent_contact_peers(jobs: int, now: float):
+    """
+    Действующие записи peer_cache для username из контактов jobs последних вакансий:
+    [(username, peer_type, peer_id, access_hash, error, expires_at)] — прогрев кэша при старте.
+    """
+    with connection() as conn:
+        return conn.execute("""SELECT p.username, p.peer_type, p.peer_id, p.access_hash, p.error, p.expires_at
+                               FROM peer_cache p
+                               WHERE p.username IN (SELECT value_normalized FROM job_contacts
+                                                    WHERE job_id > (SELECT MAX(id) FROM jobs) - ?
+                                                      AND kind = 'username')
+                                 AND p.expires_at > ?""", (jobs, now)).fetchall()
+
+def get_uploaded_file(path: str):
+    """(sha256, mtime, size, doc_id, access_hash, file_reference) для файла или None"""
+    with connection() as conn:
+        return conn.execute("""SELECT sha256, mtime, size, doc_id, access_hash, file_reference
+                               FROM uploaded_files WHERE path = ?""", (path,)).fetchone()
+
+def save_uploaded_file(path: str, sha256: str, mtime: float, size: int, doc_id: int, access_hash: int,
+                       file_reference: bytes):
+    with transaction() as conn:
+        conn.execute("""INSERT OR REPLACE INTO uploaded_files
+                        (path, sha256, mtime, size, doc_id, access_hash, file_reference)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                     (path, sha256, mtime, size, doc_id, access_hash, file_reference))
+
+def _counter_totals(conn, names):
+    placeholders = ",".join("?" * len(names))
+    rows = conn.execute(f"""SELECT name, value FROM counters
+                            WHERE name IN ({placeholders}) AND period = 'total' AND start = ''""", names)
+    totals = dict.fromkeys(names, 0)
+    totals.update(rows.fetchall())
+    return totals
+
+def get_stats(top_chats: int = 5):
+    """
+    Сводная статистика для /stats из counters: итоги, окна COUNTER_WINDOWS по дневным
+    корзинам и самые активные чаты. Время не зависит от размера истории.
+    """
+    names = ["jobs", "sent", "status:confirmed", "status:skipped", "status:pending"]
+    with connection() as conn:
+        totals = _counter_totals(conn, names)
+        windows = {}
+        for window, days in COUNTER_WINDOWS.items():
+            rows = conn.execute(f"""SELECT name, SUM(value) FROM counters
+                                    WHERE name IN ({",".join("?" * len(names))}) AND period = 'day'
+                                      AND start >= date('now', ?)
+                                    GROUP BY name""", names + [f"-{days - 1} days"]).fetchall()
+            counts = dict.fromkeys(names, 0)
+            counts.update(rows)
+            windows[window] = counts
+        chats = conn.execute("""SELECT substr(name, 6), value FROM counters
+                                WHERE name >= 'chat:' AND name < 'chat;' AND period = 'total' AND start = ''
+                                  AND value > 0
+                                ORDER BY value DESC LIMIT ?""", (top_chats,)).fetchall()
+        recent_sent = conn.execute("""SELECT username, sent_at FROM jobs_sent
+                                      ORDER BY sent_at DESC LIMIT 5""").fetchall()
+    return {
+        "total_jobs": totals["jobs"],
+        "total_sent": totals["sent"],
+        "confirmed": totals["status:confirmed"],
+        "skipped": totals["status:skipped"],
+        "pending": totals["status:pending"],
+        "windows": windows,
+        "top_chats": chats,
+        "recent_sent": recent_sent,
+    }
+
+# --- Полнотекстовый поиск ---
+# Ранжирует сам FTS5: bm25() по всем совпадениям корпуса (ORDER BY rank), страница — LIMIT/OFFSET,
+# из jobs читаются только строки страницы.
+SNIPPET_TOKENS = 24       # длина фрагмента текста в результатах, слов
+_token_re = re.compile(r"\w+")
+
+def _fts_phrase(phrase: str) -> str:
+    prefix = phrase.endswith("*")
+    return '"' + phrase.rstrip("*").replace('"', '""') + '"' + ("*" if prefix else "")
+
+def _query_tokens(groups):
+    """Слова запроса в нижнем регистре: [(слово, по_префиксу)]."""
+    tokens = []
+    for group in groups:
+        for phrase in group:
+            words = _token_re.findall(phrase.lower())
+            for i, word in enumerate(words):
+                tokens.append((word, phrase.endswith("*") and i == len(words) - 1))
+    return tokens
+
+def _token_matches(token: str, query_tokens) -> bool:
+    return any(token.startswith(word) if prefix else token == word for word, prefix in query_tokens)
+
+def _snippet(text: str, query_tokens) -> str:
+    """Фрагмент вокруг первого совпадения; совпавшие слова обрамлены \x02...\x03."""
+    spans = [(m.start(), m.end(), _token_matches(m.group().lower(), query_tokens))
+             for m in _token_re.finditer(text)]
+    first = next((i for i, (_, _, hit) in enumerate(spans) if hit), 0)
+    window = spans[max(first - SNIPPET_TOKENS // 3, 0):][:SNIPPET_TOKENS]
+    if not window:
+        return text[:200]
+    parts = []
+    pos = window[0][0]
+    for start, end, hit in window:
+        parts.append(text[pos:start])
+        parts.append(f"\x02{text[start:end]}\x03" if hit else text[start:end])
+        pos = end
+    prefix = "…" if window[0][0] > 0 else ""
+    suffix = "…" if window[-1][1] < len(text.rstrip()) else ""
+    return prefix + "".join(parts) + suffix
+
+def search_jobs(groups, chat_id: str = None, offset: int = 0, limit: int = 5):
+    """
+    Полнотекстовый поиск по вакансиям. groups — список групп синонимов, в выдаче — вакансии,
+    где есть хотя бы одно слово из каждой группы ("слово*" — по префиксу, см. src/bot/search.py).
+    Порядок — bm25 по всем совпадениям (при равенстве — новые выше), offset/limit — страница.
+    Возвращает до limit строк (hash, snippet, prob, created_at, chat_id); совпадения
+    в snippet обрамлены \x02...\x03.
+    """
+    fts_query = " AND ".join("(" + " OR ".join(_fts_phrase(p) for p in group) + ")" for group in groups)
+    params = []
+    chat_join = ""
+    if chat_id is not None:
+        chat_join = "JOIN jobs c ON c.id = jobs_fts.rowid AND c.chat_id = ?"
+        params.append(str(chat_id))
+    params += [fts_query, limit, offset]
+    with connection() as conn:
+        # bm25(): чем меньше, тем релевантнее
+        ids = [r[0] for r in conn.execute(f"""SELECT jobs_fts.rowid FROM jobs_fts {chat_join}
+                                              WHERE jobs_fts MATCH ?
+                                              ORDER BY bm25(jobs_fts), jobs_fts.rowid DESC
+                                              LIMIT ? OFFSET ?""", params)]
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = {row[0]: row for row in conn.execute(f"""SELECT id, hash, text, prob, created_at, chat_id
+                                                        FROM jobs WHERE id IN ({placeholders})""", ids)}
+
+    query_tokens = _query_tokens(groups)
+    return [(job_hash, _snippet(text, query_tokens), prob, created_at, chat)
+            for _, job_hash, text, prob, created_at, chat in (rows[i] for i in ids if i in rows)]
+
+def delete_expired_chunk(table: str, column: str, cutoff_sql: str, limit: int, condition_sql: str = None) -> int:
+    """
+    Удаляет до limit записей table, у которых column < cutoff_sql (SQL-выражение)
+    и выполнено condition_sql (если задано), по индексу на column. Возвращает число удалённых строк.
+    """
+    condition = f" AND ({condition_sql})" if condition_sql else ""
+    with transaction() as conn:
+        cur = conn.execute(f"""DELETE FROM {table} WHERE rowid IN (
+                                   SELECT rowid FROM {table} WHERE {column} < {cutoff_sql}{condition} LIMIT ?)""",
+                           (limit,))
+        return cur.rowcount
+
+def incremental_vacuum(pages: int) -> int:
+    """
+    Возвращает в ОС до pages свободных страниц файла БД; результат — сколько свободных осталось.
+    Вызывать вне транзакции: execute() делает у этой PRAGMA один шаг (= одну страницу),
+    поэтому выполняем её через executescript, который доводит её до конца.
+    """
+    if not incremental_vacuum_enabled():
+        return 0  # БД ещё не переведена (см. _enable_incremental_vacuum): уменьшать файл по частям нельзя
+    conn = get_connection()
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
@@ -0,0 +1,268 @@
+"""
+Индекс дедупликации в памяти перед already_sent и notification_already_sent.
+
+Обе проверки выполняются на каждый контакт и каждую вакансию; без индекса это
+чтение SQLite (с ожиданием писателя) на каждый вызов. Индекс прогревается при
+старте из jobs_sent и job_notifications и дальше обновляется сквозной записью
+из mark_sent / finish_outbox / save_job_notification (src/db/async_db.py):
+
+- SentIndex — username -> время последней отправки за SENT_WINDOW (то же окно
+  24 часа, что в database.already_sent). Отвечает без БД и «да», и «нет»;
+  при переполнении (SENT_MAX_ENTRIES) вытесняются самые старые записи, и пока
+  вытесненные не вышли бы из окна, промах уточняется в БД.
+- NotificationIndex — пары (job_hash, sent_to_user). По умолчанию фильтр Блума
+  (NOTIFY_BLOOM): «нет» — точно нет, «возможно» — уточняем в БД (повторы и
+  ложные срабатывания редки). С NOTIFY_BLOOM = False — точное множество.
+
+Пока индекс не прогрет, все проверки идут в БД.
+"""
+
+import collections
+import hashlib
+import math
+import sys
+import time
+
+from src.utils.metrics import register
+
+# --- Настройки ---
+SENT_WINDOW = 24 * 60 * 60      # окно повторной отправки, сек (как в database.already_sent)
+SENT_MAX_ENTRIES = 100_000      # максимум username в памяти
+NOTIFY_BLOOM = True             # False — точное множество пар вместо фильтра Блума
+NOTIFY_BLOOM_CAPACITY = 100_000 # минимальная ёмкость фильтра (при прогреве — не меньше 2x числа строк)
+NOTIFY_BLOOM_FP_RATE = 0.01     # доля ложных «возможно» при заполнении до ёмкости
+
+
+def _normalize_username(username: str) -> str:
+    """Как database._normalize_username."""
+    username = username.strip()
+    if username.startswith("@"):
+        username = username[1:]
+    return username.lower()
+
+
+class SentIndex:
+    """username -> время последней отправки, только в пределах окна."""
+
+    def __init__(self, window: float = SENT_WINDOW, max_entries: int = SENT_MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self._last_sent = {}
+        self._order = collections.deque()  # (sent_at, username) по возрастанию времени
+        self._evicted_until = 0.0  # до этого времени промах надо уточнять в БД
+        self.warmed = False
+
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.evicted = 0
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._order and (self._order[0][0] <= cutoff or len(self._last_sent) > self.max_entries):
+            sent_at, username = self._order.popleft()
+            if self._last_sent.get(username) != sent_at:
+                continue  # устаревшая запись очереди — username отправлялся позже
+            del self._last_sent[username]
+            if sent_at > cutoff:
+                # вытеснен из-за лимита, хотя ещё в окне
+                self.evicted += 1
+                self._evicted_until = max(self._evicted_until, sent_at + self.window)
+
+    def add(self, username: str, sent_at: float = None):
+        sent_at = time.time() if sent_at is None else sent_at
+        username = _normalize_username(username)
+        if sent_at <= self._last_sent.get(username, 0):
+            return
+        self._last_sent[username] = sent_at
+        self._order.append((sent_at, username))
+        self._expire(time.time())
+
+    def load(self, rows):
+        """Прогрев: [(username, sent_at unix time)] за последнее окно."""
+        for username, sent_at in sorted(rows, key=lambda row: row[1]):
+            self.add(username, sent_at)
+        self.warmed = True
+
+    def lookup(self, username: str):
+        """True / False — ответ из памяти, None — нужно спросить БД."""
+        if not self.warmed:
+            self.fallbacks += 1
+            return None
+        now = time.time()
+        self._expire(now)
+        sent_at = self._last_sent.get(_normalize_username(username))
+        if sent_at is not None and sent_at > now - self.window:
+            self.hits += 1
+            return True
+        if now < self._evicted_until:
+            self.fallbacks += 1
+            return None
+        self.misses += 1
+        return False
+
+    def memory_bytes(self) -> int:
+        return (sys.getsizeof(self._last_sent) + sys.getsizeof(self._order)
+                + sum(sys.getsizeof(username) + 24 for username in self._last_sent)  # ключ + float
+                + len(self._order) * 64)  # кортежи очереди
+
+    def stats(self):
+        return {
+            "sent_entries": len(self._last_sent),
+            "sent_hits": self.hits,
+            "sent_misses": self.misses,
+            "sent_db_fallbacks": self.fallbacks,
+            "sent_evicted": self.evicted,
+            "sent_memory_kb": self.memory_bytes() / 1024,
+        }
+
+
+class BloomFilter:
+    """Фильтр Блума на bytearray; позиции — двойное хэширование blake2b."""
+
+    def __init__(self, capacity: int, fp_rate: float = NOTIFY_BLOOM_FP_RATE):
+        self.capacity = capacity
+        self.bits = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._array)
+
+
+class NotificationIndex:
+    """
+    Пары (job_hash, sent_to_user) из job_notifications. Удаления по сроку
+    хранения индекс не видит до следующего прогрева: в режиме Блума это лишь
+    лишнее уточнение в БД, в режиме множества — уведомление не повторится.
+    """
+
+    def __init__(self, bloom: bool = NOTIFY_BLOOM):
+        self.bloom = bloom
+        self._keys = None   # фильтр Блума или set; None — не прогрет
+        self._pending = None  # добавления во время прогрева
+        self.warming = False
+
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _key(job_hash: str, sent_to_user: str) -> str:
+        return f"{job_hash}\x1f{sent_to_user}"
+
+    def add(self, job_hash: str, sent_to_user: str):
+        key = self._key(job_hash, sent_to_user)
+        if self._pending is not None:
+            self._pending.append(key)
+        if self._keys is not None:
+            self._keys.add(key)
+
+    def start_warm(self):
+        """Начало прогрева: добавления до его конца попадут и в новый индекс."""
+        self.warming = True
+        self._pending = []
+
+    def abort_warm(self):
+        self.warming = False
+        self._pending = None
+
+    def build(self, rows):
+        """
+        Новый индекс из rows — всех [(job_hash, sent_to_user)] из job_notifications.
+        Не трогает состояние, поэтому выполняется в потоке (фильтр на 50k пар — сотни мс).
+        """
+        if self.bloom:
+            index = BloomFilter(max(NOTIFY_BLOOM_CAPACITY, 2 * len(rows)))
+        else:
+            index = set()
+        for job_hash, sent_to_user in rows:
+            index.add(self._key(job_hash, sent_to_user))
+        return index
+
+    def finish_warm(self, index):
+        """Конец прогрева (в event loop): досыпаем добавления, пришедшие во время сборки, и подменяем индекс."""
+        for key in self._pending or []:
+            index.add(key)
+        self._keys = index
+        self._pending = None
+        self.warming = False
+
+    def load(self, rows):
+        """Прогрев целиком в текущем потоке."""
+        self.start_warm()
+        self.finish_warm(self.build(rows))
+
+    @property
+    def needs_rewarm(self) -> bool:
+        """Фильтр переполнен — ложных «возможно» становится много, пора пересобрать с большей ёмкостью."""
+        return self.bloom and self._keys is not None and self._keys.saturated and not self.warming
+
+    def lookup(self, job_hash: str, sent_to_user: str):
+        """True / False — ответ из памяти, None — нужно спросить БД."""
+        if self._keys is None:
+            self.fallbacks += 1
+            return None
+        found = self._key(job_hash, sent_to_user) in self._keys
+        if not found:
+            self.misses += 1
+            return False
+        if self.bloom:
+            self.fallbacks += 1  # «возможно» — уточняем в БД
+            return None
+        self.hits += 1
+        return True
+
+    def memory_bytes(self) -> int:
+        if self._keys is None:
+            return 0
+        if self.bloom:
+            return self._keys.memory_bytes()
+        return sys.getsizeof(self._keys) + sum(sys.getsizeof(key) for key in self._keys)
+
+    def stats(self):
+        stats = {
+            "notify_mode": "bloom" if self.bloom else "set",
+            "notify_hits": self.hits,
+            "notify_misses": self.misses,
+            "notify_db_fallbacks": self.fallbacks,
+            "notify_memory_kb": self.memory_bytes() / 1024,
+        }
+        if self.bloom and self._keys is not None:
+            stats["notify_entries"] = self._keys.count
+            stats["notify_capacity"] = self._keys.capacity
+        elif self._keys is not None:
+            stats["notify_entries"] = len(self._keys)
+        return stats
+
+
+class DedupIndex:
+    def __init__(self):
+        self.sent = SentIndex()
+        self.notifications = NotificationIndex()
+
+    def stats(self):
+        return {**self.sent.stats(), **self.notifications.stats()}
+
+
+dedup_index = DedupIndex()
+register("dedup", dedup_index.stats)
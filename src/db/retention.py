@@ -0,0 +1,199 @@
+"""
+Планировщик удаления старых данных. Вместо больших DELETE (которые надолго
+блокируют БД) удаляет записи небольшими пачками по индексу: за один тик —
+не дольше RETENTION_TICK_BUDGET_MS, между тиками пауза, записи идут через общий
+поток-писатель (src/db/async_db.py) вперемешку с обычными. После удаления
+файл БД уменьшается через incremental_vacuum, тоже по частям — если файл в режиме
+auto_vacuum=INCREMENTAL. Большую старую БД в этот режим переводит администратор
+(/convert_db -> request_convert): VACUUM идёт в потоке-писателе, остальные записи ждут в очереди.
+"""
+
+import asyncio
+import time
+
+from src.db import database
+from src.db.async_db import db_writer
+from src.utils.metrics import register
+
+# --- Политики хранения: таблица -> (колонка времени, SQL-выражение границы[, SQL-условие]) ---
+# Удаляются строки, у которых колонка < границы (и выполнено условие, если оно задано);
+# на колонке должен быть индекс.
+RETENTION_POLICIES = {
+    "jobs_sent": ("sent_at", "datetime('now', '-7 days')"),
+    "job_notifications": ("created_at", "datetime('now', '-30 days')"),
+    "jobs": ("created_at", "datetime('now', '-60 days')"),
+    "job_clusters": ("created_at", "datetime('now', '-60 days')"),
+    # только завершённые: ожидающие (в т.ч. на паузе после FloodWait или сбоя SMTP) не удаляем
+    "outbox": ("created_at", "datetime('now', '-30 days')", "status IN ('sent', 'failed', 'skipped')"),
+    "link_cache": ("expires_at", "CAST(strftime('%s', 'now') AS REAL)"),
+    "peer_cache": ("expires_at", "CAST(strftime('%s', 'now') AS REAL)"),
+    # дайджест отправляется за минуты; это страховка для зависших записей
+    "digest_items": ("created_at", "CAST(strftime('%s', 'now', '-7 days') AS REAL)"),
+}
+
+# --- Настройки ---
+RETENTION_INTERVAL = 60 * 60       # как часто запускать полный проход, сек
+RETENTION_TICK_PAUSE = 1.0         # пауза между тиками внутри прохода, сек
+RETENTION_TICK_BUDGET_MS = 50      # сколько максимум удаляем за один тик, мс
+RETENTION_CHUNK_SIZE = 500         # строк в одном DELETE
+VACUUM_PAGES_PER_TICK = 256        # страниц, возвращаемых ОС за один тик
+
+
+class RetentionScheduler:
+    """Фоновая задача: проход по RETENTION_POLICIES раз в interval или по запросу (/cleanup)."""
+
+    def __init__(self, policies: dict = None, interval: float = RETENTION_INTERVAL,
+                 tick_pause: float = RETENTION_TICK_PAUSE, tick_budget_ms: float = RETENTION_TICK_BUDGET_MS,
+                 chunk_size: int = RETENTION_CHUNK_SIZE, vacuum_pages: int = VACUUM_PAGES_PER_TICK):
+        self.policies = dict(RETENTION_POLICIES if policies is None else policies)
+        self.interval = interval
+        self.tick_pause = tick_pause
+        self.tick_budget = tick_budget_ms / 1000
+        self.chunk_size = chunk_size
+        self.vacuum_pages = vacuum_pages
+        self._task = None
+        self._wakeup = None
+        self._convert_task = None
+        self._busy = asyncio.Lock()  # проход очистки и перевод БД не идут одновременно
+
+        # Прогресс текущего / последнего прохода
+        self.phase = "idle"          # idle | delete | vacuum | convert
+        self.deleted = {}            # таблица -> удалено за проход
+        self.free_pages = 0          # свободных страниц осталось (во время vacuum)
+        self.ticks = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_duration = None
+        self.convert_started = None  # время начала перевода в auto_vacuum=INCREMENTAL
+
+        self.passes = 0
+        self.total_deleted = 0
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request_run(self) -> bool:
+        """Просит начать проход сейчас. False — проход уже идёт."""
+        if self.phase != "idle":
+            return False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def request_convert(self) -> bool:
+        """Запускает в фоне разовый перевод БД в auto_vacuum=INCREMENTAL. False — очистка или перевод уже идут."""
+        if self.phase != "idle":
+            return False
+        self.phase = "convert"
+        self.convert_started = time.time()
+        self._convert_task = asyncio.create_task(self._convert())
+        return True
+
+    async def _convert(self):
+        async with self._busy:
+            self.phase = "convert"
+            try:
+                elapsed = await db_writer.submit_exclusive(database.convert_to_incremental_vacuum)
+                if elapsed:
+                    print(f"🛠 БД переведена в auto_vacuum=INCREMENTAL за {elapsed:.1f} с")
+            except Exception as e:
+                print(f"❌ Ошибка перевода БД в auto_vacuum=INCREMENTAL: {e}")
+            finally:
+                self.phase = "idle"
+                self.convert_started = None
+
+    async def _loop(self):
+        while True:
+            try:
+                async with self._busy:
+                    await self.run_pass()
+            except Exception as e:
+                self.phase = "idle"
+                print(f"❌ Ошибка очистки старых данных: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_pass(self):
+        """Один полный проход: удаление по всем политикам, затем incremental_vacuum."""
+        started = time.monotonic()
+        self.last_started = time.time()
+        self.phase = "delete"
+        self.deleted = {table: 0 for table in self.policies}
+        self.ticks = 0
+
+        pending = list(self.policies)
+        while pending:
+            pending = await self._delete_tick(pending)
+            self.ticks += 1
+            if pending:
+                await asyncio.sleep(self.tick_pause)
+
+        if sum(self.deleted.values()):
+            self.phase = "vacuum"
+            while True:
+                # Не через писателя: incremental_vacuum нельзя выполнять внутри его групповой транзакции
+                self.free_pages = await asyncio.to_thread(database.incremental_vacuum, self.vacuum_pages)
+                self.ticks += 1
+                if not self.free_pages:
+                    break
+                await asyncio.sleep(self.tick_pause)
+
+        self.phase = "idle"
+        self.passes += 1
+        self.last_finished = time.time()
+        self.last_duration = time.monotonic() - started
+        if sum(self.deleted.values()):
+            print(f"🗑️ Очистка старых данных: {self.deleted} за {self.last_duration:.1f} с")
+
+    async def _delete_tick(self, tables):
+        """Удаляет пачками, пока не кончится бюджет тика. Возвращает таблицы, где ещё есть что удалять."""
+        deadline = time.monotonic() + self.tick_budget
+        pending = list(tables)
+        while pending and time.monotonic() < deadline:
+            table = pending[0]
+            column, cutoff, *condition = self.policies[table]
+            deleted = await db_writer.submit(database.delete_expired_chunk, table, column, cutoff,
+                                             self.chunk_size, *condition)
+            self.deleted[table] += deleted
+            self.total_deleted += deleted
+            if deleted < self.chunk_size:
+                pending.pop(0)
+        return pending
+
+    def progress(self):
+        """Состояние текущего (или последнего) прохода для /cleanup."""
+        return {
+            "phase": self.phase,
+            "deleted": dict(self.deleted),
+            "free_pages": self.free_pages,
+            "ticks": self.ticks,
+            "last_finished": self.last_finished,
+            "last_duration": self.last_duration,
+            "convert_elapsed": time.time() - self.convert_started if self.convert_started else None,
+        }
+
+    def stats(self):
+        return {
+            "phase": self.phase,
+            "passes": self.passes,
+            "total_deleted": self.total_deleted,
+            "last_duration_s": self.last_duration or 0.0,
+        }
+
+
+retention_scheduler = RetentionScheduler()
+register("retention", retention_scheduler.stats)
@@ -0,0 +1,91 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Настройки микро-батчинга классификации ---
+BATCH_MAX_SIZE = 32      # максимум сообщений в одной пачке
+BATCH_MAX_WAIT_MS = 20   # сколько максимум ждём, пока пачка наберётся, мс
+
+
+class MicroBatcher:
+    """
+    Собирает одиночные запросы на классификацию в пачки и прогоняет их
+    через predict_batch одним вызовом. Пачка уходит, как только набралось
+    max_size сообщений или прошло max_wait_ms с момента первого в пачке.
+    predict_batch выполняется в отдельном потоке (по одной пачке за раз),
+    чтобы векторизация и predict_proba не останавливали event loop.
+    """
+
+    def __init__(self, predict_batch, max_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.predict_batch = predict_batch
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+        self._running = set()  # задачи пачек, которые сейчас считаются
+
+        self.batches = 0
+        self.items = 0
+        self.max_batch = 0
+        self.flushed_by_size = 0
+        self.flushed_by_timer = 0
+
+    async def predict(self, text):
+        """Классифицирует text в составе ближайшей пачки, возвращает (label, prob)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_size:
+            self.flushed_by_size += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush_by_timer)
+
+        return await future
+
+    def _flush_by_timer(self):
+        self._timer = None
+        if self._pending:
+            self.flushed_by_timer += 1
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+
+        self.batches += 1
+        self.items += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._executor, self.predict_batch, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": self.items / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "flushed_by_size": self.flushed_by_size,
+            "flushed_by_timer": self.flushed_by_timer,
+            "batches_in_flight": len(self._running),
+        }
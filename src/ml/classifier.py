@@ -1,23 +1,103 @@
-import joblib
+import os
 import re
-from nltk.corpus import stopwords
 import string
+import threading
+import time
 
-# Загружаем модель и векторизатор
-model = joblib.load("src/ml/classifier.pkl")
-vectorizer = joblib.load("src/ml/vectorizer.pkl")
+MODEL_PATH = "src/ml/classifier.pkl"
+VECTORIZER_PATH = "src/ml/vectorizer.pkl"
+COMPACT_MODEL_DIR = "src/ml/compact_model"
+MODEL_BACKEND = "auto"  # "auto" — компактная модель, если она выгружена, иначе pickle; "compact" | "sklearn"
+
+punct_re = re.compile(r'[' + string.punctuation + ']')
+
+# Модель и стоп-слова загружаются лениво (или заранее через warm_up), а не при импорте
+_backend = None
+_stop_words = None
+_lock = threading.Lock()
+
+
+class SklearnBackend:
+    """Исходные joblib-пикли: TfidfVectorizer + LogisticRegression."""
+
+    name = "sklearn"
+
+    def __init__(self, vectorizer_path: str, model_path: str):
+        import joblib
+        self.vectorizer = joblib.load(vectorizer_path)
+        self.model = joblib.load(model_path)
+
+    def predict_batch(self, clean_texts):
+        features = self.vectorizer.transform(clean_texts)
+        proba = self.model.predict_proba(features)
+        # Метка — класс с максимальной вероятностью, отдельный model.predict не нужен
+        labels = self.model.classes_[proba.argmax(axis=1)]
+        return [(label, p[1]) for label, p in zip(labels, proba)]  # p[1] — вероятность класса 1
+
+
+def _load_stop_words():
+    """
+    Стоп-слова NLTK, с которыми обучалась модель. Без них меняются признаки и молча
+    меняются предсказания, поэтому при недоступности — ошибка, а не пустой список.
+    """
+    try:
+        from nltk.corpus import stopwords
+        return set(stopwords.words('russian')) | set(stopwords.words('english'))
+    except (ImportError, LookupError) as e:
+        raise RuntimeError(
+            f"Стоп-слова NLTK недоступны ({e.__class__.__name__}), а в компактной модели нет их снимка "
+            f"({COMPACT_MODEL_DIR}/stopwords.txt). Без них признаки не совпадут с обученной моделью. "
+            f"Установите: python -m nltk.downloader stopwords (и выгрузите снимок: python -m src.ml.compact_model)"
+        ) from e
+
+
+def _load_backend(backend: str):
+    if backend == "auto":
+        backend = "compact" if os.path.isdir(COMPACT_MODEL_DIR) else "sklearn"
+    if backend == "compact":
+        from src.ml.compact_model import CompactModel
+        return CompactModel(COMPACT_MODEL_DIR)
+    return SklearnBackend(VECTORIZER_PATH, MODEL_PATH)
+
+
+def warm_up(backend: str = None):
+    """
+    Загружает модель и стоп-слова. Вызывается при старте, чтобы первое
+    сообщение не ждало загрузки; повторные вызовы ничего не делают.
+    """
+    global _backend, _stop_words
+    with _lock:
+        if _backend is None:
+            started = time.perf_counter()
+            loaded = _load_backend(backend or MODEL_BACKEND)
+            if _stop_words is None:
+                # Компактная модель хранит снимок стоп-слов — тогда nltk вообще не импортируем
+                _stop_words = getattr(loaded, "stop_words", None)
+            if _stop_words is None:
+                _stop_words = _load_stop_words()
+            _backend = loaded  # только вместе со стоп-словами: без них модель не используется
+            print(f"🤖 Модель загружена ({_backend.name}) за {(time.perf_counter() - started) * 1000:.1f} мс")
+    return _backend
 
-stop_words = set(stopwords.words('russian')) | set(stopwords.words('english'))
 
 def preprocess_text(text):
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = _load_stop_words()
     text = text.lower()
-    text = re.sub(r'[' + string.punctuation + ']', ' ', text)
-    tokens = [w for w in text.split() if w not in stop_words]
+    text = punct_re.sub(' ', text)
+    tokens = [w for w in text.split() if w not in _stop_words]
     return " ".join(tokens)
 
 def predict(text):
-    clean_text = preprocess_text(text)
-    features = vectorizer.transform([clean_text])
-    prob = model.predict_proba(features)[0][1]  # вероятность класса 1
-    label = model.predict(features)[0]
-    return label, prob
+    return predict_batch([text])[0]
+
+def predict_batch(texts):
+    """
+    Классифицирует пачку текстов за один вызов модели (у sklearn — одна
+    разреженная матрица и один predict_proba). Возвращает список (label, prob).
+    """
+    if not texts:
+        return []
+    backend = _backend or warm_up()
+    return backend.predict_batch([preprocess_text(t) for t in texts])
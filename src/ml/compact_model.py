@@ -0,0 +1,169 @@
+"""
+Компактный формат модели для быстрого старта: словарь TF-IDF, веса idf и
+коэффициенты логистической регрессии без pickle и без импорта sklearn.
+
+Каталог модели:
+- meta.json   — параметры векторизатора, intercept и классы;
+- vocab.txt   — токены словаря, по одному на строку, в порядке индексов;
+- weights.f64 — idf[0..n) и coef[0..n) подряд, float64 little-endian (читается через mmap);
+- stopwords.txt — снимок стоп-слов NLTK, чтобы при старте не импортировать nltk (необязательно).
+"""
+
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from array import array
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+VOCAB_FILE = "vocab.txt"
+WEIGHTS_FILE = "weights.f64"
+STOPWORDS_FILE = "stopwords.txt"
+
+
+class CompactModel:
+    """TF-IDF + логистическая регрессия на чистом Python поверх memory-mapped весов."""
+
+    name = "compact"
+
+    def __init__(self, model_dir: str):
+        with open(os.path.join(model_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемый формат компактной модели: {meta.get('format')}")
+
+        self.n_features = meta["n_features"]
+        self.classes = meta["classes"]
+        self.intercept = meta["intercept"]
+        self.lowercase = meta["lowercase"]
+        self.binary = meta["binary"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.norm = meta["norm"]
+        self.token_re = re.compile(meta["token_pattern"])
+
+        with open(os.path.join(model_dir, VOCAB_FILE), encoding="utf-8") as f:
+            tokens = f.read().split("\n")[:self.n_features]
+        self.vocab = {token: i for i, token in enumerate(tokens)}
+
+        with open(os.path.join(model_dir, WEIGHTS_FILE), "rb") as f:
+            if sys.byteorder == "little":
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                weights = memoryview(self._mmap).cast("d")
+            else:
+                weights = array("d", f.read())
+                weights.byteswap()
+        self.idf = weights[:self.n_features]
+        self.coef = weights[self.n_features:2 * self.n_features]
+
+        self.stop_words = None
+        stopwords_path = os.path.join(model_dir, STOPWORDS_FILE)
+        if os.path.exists(stopwords_path):
+            with open(stopwords_path, encoding="utf-8") as f:
+                self.stop_words = set(f.read().split())
+
+    def _score(self, text: str) -> float:
+        if self.lowercase:
+            text = text.lower()
+        counts = {}
+        for token in self.token_re.findall(text):
+            i = self.vocab.get(token)
+            if i is not None:
+                counts[i] = counts.get(i, 0) + 1
+
+        idf = self.idf
+        weights = {}
+        for i, count in counts.items():
+            tf = 1 if self.binary else count
+            if self.sublinear_tf:
+                tf = 1 + math.log(tf)
+            weights[i] = tf * idf[i]
+
+        if self.norm == "l2":
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+        elif self.norm == "l1":
+            norm = sum(abs(w) for w in weights.values())
+        else:
+            norm = 1.0
+        if not norm:
+            norm = 1.0
+
+        coef = self.coef
+        return self.intercept + sum(w * coef[i] for i, w in weights.items()) / norm
+
+    def predict_batch(self, clean_texts):
+        results = []
+        for text in clean_texts:
+            score = self._score(text)
+            if score >= 0:
+                prob = 1.0 / (1.0 + math.exp(-score))
+            else:
+                e = math.exp(score)
+                prob = e / (1.0 + e)
+            label = self.classes[1] if prob > 0.5 else self.classes[0]
+            results.append((label, prob))
+        return results
+
+
+def export_compact(vectorizer, model, model_dir: str, stop_words=None):
+    """Сохраняет обученные TfidfVectorizer и LogisticRegression (и стоп-слова) в компактный формат."""
+    params = vectorizer.get_params()
+    unsupported = {
+        "analyzer": params["analyzer"] != "word",
+        "ngram_range": tuple(params["ngram_range"]) != (1, 1),
+        "preprocessor": params["preprocessor"] is not None,
+        "tokenizer": params["tokenizer"] is not None,
+        "stop_words": params["stop_words"] is not None,
+        "strip_accents": params["strip_accents"] is not None,
+        "use_idf": not params["use_idf"],
+        "classes": len(model.classes_) != 2,
+    }
+    bad = [name for name, is_bad in unsupported.items() if is_bad]
+    if bad:
+        raise ValueError(f"Компактный формат не поддерживает параметры: {', '.join(bad)}")
+
+    vocabulary = vectorizer.vocabulary_
+    n_features = len(vocabulary)
+    tokens = [None] * n_features
+    for token, i in vocabulary.items():
+        tokens[i] = token
+
+    os.makedirs(model_dir, exist_ok=True)
+    meta = {
+        "format": FORMAT_VERSION,
+        "n_features": n_features,
+        "classes": [c.item() if hasattr(c, "item") else c for c in model.classes_],
+        "intercept": float(model.intercept_[0]),
+        "lowercase": bool(params["lowercase"]),
+        "binary": bool(params["binary"]),
+        "sublinear_tf": bool(params["sublinear_tf"]),
+        "norm": params["norm"],
+        "token_pattern": params["token_pattern"],
+    }
+    with open(os.path.join(model_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(model_dir, VOCAB_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(tokens))
+
+    weights = array("d", [float(x) for x in vectorizer.idf_])
+    weights.extend(float(x) for x in model.coef_[0])
+    if sys.byteorder != "little":
+        weights.byteswap()
+    with open(os.path.join(model_dir, WEIGHTS_FILE), "wb") as f:
+        weights.tofile(f)
+
+    if stop_words:
+        with open(os.path.join(model_dir, STOPWORDS_FILE), "w", encoding="utf-8") as f:
+            f.write("\n".join(sorted(stop_words)))
+
+
+if __name__ == "__main__":
+    import joblib
+
+    from src.ml.classifier import COMPACT_MODEL_DIR, MODEL_PATH, VECTORIZER_PATH, _load_stop_words
+
+    export_compact(joblib.load(VECTORIZER_PATH), joblib.load(MODEL_PATH), COMPACT_MODEL_DIR,
+                   stop_words=_load_stop_words())
+    print(f"💾 Компактная модель сохранена в {COMPACT_MODEL_DIR}")
@@ -0,0 +1,159 @@
+import random
+from collections import deque
+
+# --- Настройки префильтра ---
+MIN_TEXT_LENGTH = 40            # короче — это реплика/стикер с подписью, а не вакансия
+CONTACT_ONLY_MIN_LENGTH = 120   # без слов-маркеров вакансии пропускаем только длинные сообщения с контактами
+ALLOWED_CHAT_IDS = set()        # если не пусто — обрабатываем только эти чаты
+BLOCKED_CHAT_IDS = set()        # чаты, которые никогда не обрабатываем
+BLOCKED_SENDER_IDS = set()      # отправители, которых пропускаем (боты-спамеры и т.п.)
+AUDIT_SAMPLE_RATE = 0.02        # доля отклонённых сообщений, которые всё равно прогоняем через модель
+
+VACANCY_MARKERS = [
+    "ваканс", "ищем", "ищу ", "требуется", "требуются", "в команду", "зарплат", "зп ", "з/п",
+    "оклад", "резюме", "опыт работы", "опыт от", "удален", "удалён", "занятость", "стажир",
+    "обязанности", "требования", "условия", "разработчик", "дизайнер", "аналитик", "тестировщик",
+    "рекрутер", "откликнуться", "отклик", "фриланс", "junior", "middle", "senior", "teamlead",
+    "hiring", "vacancy", "we are looking", "looking for", "job", "position", "salary", "remote",
+    "developer", "engineer", "full-time", "full time", "part-time", "relocation", "recruiter",
+]
+CONTACT_MARKERS = [
+    "@", "t.me/", "telegram.me/", "http://", "https://", "wa.me/", "mailto:",
+    "пишите", "писать в", "контакт", "contact", "dm ",
+]
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо–Корасик: за один проход по тексту находит вхождения
+    сразу всех ключевых слов. Ключи и текст сравниваются в нижнем регистре.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for keyword in keywords:
+            self._add(keyword.lower())
+        self._build()
+
+    def _add(self, keyword: str):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            node = nxt
+        self._out[node].add(keyword)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find_all(self, text: str, limit: int = None):
+        """Возвращает множество найденных ключей (останавливается, набрав limit штук)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+                if limit and len(found) >= limit:
+                    break
+        return found
+
+
+class Prefilter:
+    """
+    Дешёвый фильтр перед ML-моделью: отсекает свои сообщения, чаты/отправителей
+    из чёрного списка, слишком короткие тексты и тексты без маркеров вакансии.
+    Считает, сколько и почему отклонил, и выборочно проверяет отклонённое
+    полной моделью, чтобы можно было оценить потерю полноты.
+    """
+
+    def __init__(self, min_length: int = MIN_TEXT_LENGTH,
+                 contact_only_min_length: int = CONTACT_ONLY_MIN_LENGTH,
+                 audit_sample_rate: float = AUDIT_SAMPLE_RATE):
+        self.min_length = min_length
+        self.contact_only_min_length = contact_only_min_length
+        self.audit_sample_rate = audit_sample_rate
+        self._vacancy = AhoCorasick(VACANCY_MARKERS)
+        self._contacts = AhoCorasick(CONTACT_MARKERS)
+
+        self.checked = 0
+        self.passed = 0
+        self.rejected = {}
+        self.audited = 0
+        self.audit_missed = 0
+
+    def check(self, text: str, chat_id=None, sender_id=None, out: bool = False):
+        """Возвращает (passed, reason): reason — причина отказа или None."""
+        self.checked += 1
+        reason = self._reject_reason(text, chat_id, sender_id, out)
+        if reason is None:
+            self.passed += 1
+        else:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return reason is None, reason
+
+    def _reject_reason(self, text, chat_id, sender_id, out):
+        if out:
+            return "own_message"
+        if chat_id in BLOCKED_CHAT_IDS or (ALLOWED_CHAT_IDS and chat_id not in ALLOWED_CHAT_IDS):
+            return "chat"
+        if sender_id in BLOCKED_SENDER_IDS:
+            return "sender"
+
+        length = len(text.strip())
+        if length < self.min_length:
+            return "too_short"
+        if self._vacancy.find_all(text, limit=1):
+            return None
+        if length >= self.contact_only_min_length and self._contacts.find_all(text, limit=1):
+            return None
+        return "no_markers"
+
+    def should_audit(self, reason: str) -> bool:
+        """Нужно ли прогнать отклонённое сообщение через модель для оценки полноты."""
+        # Свои сообщения и чёрные списки — осознанный отказ, аудировать нечего
+        if reason not in ("too_short", "no_markers"):
+            return False
+        return random.random() < self.audit_sample_rate
+
+    def record_audit(self, is_vacancy: bool):
+        """Учитывает результат проверки отклонённого сообщения полной моделью."""
+        self.audited += 1
+        if is_vacancy:
+            self.audit_missed += 1
+
+    def stats(self):
+        rejected_total = sum(self.rejected.values())
+        stats = {
+            "checked": self.checked,
+            "passed": self.passed,
+            "rejected": rejected_total,
+            "reject_ratio": rejected_total / self.checked if self.checked else 0.0,
+        }
+        for reason, count in sorted(self.rejected.items()):
+            stats[f"rejected_{reason}"] = count
+        stats["audited"] = self.audited
+        stats["audit_missed"] = self.audit_missed
+        # Оценка доли вакансий среди отклонённого (по выборке аудита)
+        stats["audit_miss_ratio"] = self.audit_missed / self.audited if self.audited else 0.0
+        return stats
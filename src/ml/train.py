@@ -5,12 +5,15 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, f1_score
+from src.ml.compact_model import export_compact
+from src.ml.classifier import _load_stop_words
 
 # Пути
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "../../data/dataset.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "classifier.pkl")
 VECTORIZER_PATH = os.path.join(BASE_DIR, "vectorizer.pkl")
+COMPACT_MODEL_DIR = os.path.join(BASE_DIR, "compact_model")
 
 def train():
     print("📥 Загружаем данные...")
@@ -48,5 +51,9 @@ def train():
     print(f"💾 Модель сохранена в {MODEL_PATH}")
     print(f"💾 Векторизатор сохранен в {VECTORIZER_PATH}")
 
+    # Компактная копия для быстрого старта бота (без pickle и sklearn)
+    export_compact(vectorizer, model, COMPACT_MODEL_DIR, stop_words=_load_stop_words())
+    print(f"💾 Компактная модель сохранена в {COMPACT_MODEL_DIR}")
+
 if __name__ == "__main__":
     train()
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+
+# --- Настройки очереди входящих сообщений ---
+QUEUE_MAXSIZE = 1000          # сколько сообщений держим в памяти
+WORKERS = 16                  # сколько воркеров разбирают очередь (и максимум сообщений в пачке классификатора)
+BACKPRESSURE = "block"        # что делать при переполнении: "block" | "drop_oldest" | "spill"
+SPILL_PATH = "data/ingest_spill.jsonl"
+SPILL_REFILL_INTERVAL = 0.5   # как часто подтягиваем сообщения с диска обратно в очередь, сек
+SPILL_COMPACT_BYTES = 8 * 1024 * 1024  # прочитанное начало файла сжимаем, когда оно больше этого и больше непрочитанного
+STOP_DRAIN_TIMEOUT = 30       # сколько при остановке ждём, пока воркеры доработают текущие сообщения, сек
+
+POLICIES = ("block", "drop_oldest", "spill")
+
+
+class IngestQueue:
+    """
+    Ограниченная asyncio-очередь между обработчиком NewMessage и пулом воркеров.
+    Обработчик только кладёт сообщение в очередь, вся тяжёлая работа —
+    в process(item) на воркерах. Элементы — простые dict, чтобы их можно было
+    сбросить на диск при политике "spill".
+
+    Файл spill только дописывается; сколько из него уже прочитано — смещение в байтах
+    в spill_path + ".offset", поэтому подкачка читает только новые строки, а не весь файл.
+    Прочитанное начало файла удаляется, когда файл прочитан целиком (или когда оно
+    перевесило непрочитанный хвост — тогда хвост переписывается один раз).
+    """
+
+    def __init__(self, process, maxsize: int = QUEUE_MAXSIZE, workers: int = WORKERS,
+                 policy: str = BACKPRESSURE, spill_path: str = SPILL_PATH):
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {policy}")
+        self.process = process
+        self.maxsize = maxsize
+        self.workers = workers
+        self.policy = policy
+        self.spill_path = spill_path
+        self.offset_path = spill_path + ".offset"
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks = []
+        self._refill_task = None
+        self._current = {}  # номер воркера -> сообщение, которое он сейчас обрабатывает
+        self._stopping = False
+
+        self.enqueued = 0
+        self.picked = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.spill_pending = 0
+        self.spill_compactions = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.last_wait = 0.0
+
+    async def put(self, item: dict):
+        """Кладёт сообщение в очередь с учётом политики переполнения."""
+        item["enqueued_at"] = time.time()
+        self.enqueued += 1
+
+        if self.policy == "block":
+            await self._queue.put(item)
+        elif self.policy == "drop_oldest":
+            if self._queue.full():
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            self._queue.put_nowait(item)
+        else:
+            # Пока на диске что-то лежит, новые сообщения тоже идут на диск — сохраняем порядок
+            if self._queue.full() or self.spill_pending:
+                self._spill([item])
+            else:
+                self._queue.put_nowait(item)
+
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def _spill(self, items):
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self.spilled += len(items)
+        self.spill_pending += len(items)
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def _remove_spill(self):
+        for path in (self.spill_path, self.offset_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _refill_from_spill(self):
+        """Переносит сообщения с диска в очередь, пока в ней есть место (читает только непрочитанное)."""
+        free = self.maxsize - self._queue.qsize()
+        if free <= 0 or not os.path.exists(self.spill_path):
+            return
+        offset = self._read_offset()
+        moved = 0
+        with open(self.spill_path, "rb") as f:
+            f.seek(offset)
+            while moved < free:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # конец файла (или недописанная при сбое строка)
+                offset = f.tell()
+                if line.strip():
+                    self._queue.put_nowait(json.loads(line))
+                    moved += 1
+            size = f.seek(0, os.SEEK_END)
+
+        self.spill_pending = max(self.spill_pending - moved, 0)
+        if offset >= size:
+            self._remove_spill()  # прочитан целиком
+            self.spill_pending = 0
+        elif offset > SPILL_COMPACT_BYTES and offset > size - offset:
+            self._compact_spill(offset)
+        elif moved:
+            self._write_offset(offset)
+
+    def _compact_spill(self, offset: int):
+        """Переписывает непрочитанный хвост в новый файл; смещение — снова 0."""
+        tmp_path = self.spill_path + ".tmp"
+        with open(self.spill_path, "rb") as src, open(tmp_path, "wb") as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, self.spill_path)
+        self._write_offset(0)
+        self.spill_compactions += 1
+
+    async def _refill_loop(self):
+        while True:
+            try:
+                self._refill_from_spill()
+            except Exception as e:
+                print(f"❌ Ошибка чтения очереди с диска {self.spill_path}: {e}")
+            await asyncio.sleep(SPILL_REFILL_INTERVAL)
+
+    async def _worker(self, n: int):
+        while not self._stopping:
+            item = await self._queue.get()
+            self._current[n] = item
+            wait = time.time() - item.pop("enqueued_at", time.time())
+            self.picked += 1
+            self.last_wait = wait
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            try:
+                await self.process(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Воркер {n}: ошибка обработки сообщения {item.get('msg_id')}: {e}")
+            finally:
+                self._current.pop(n, None)
+                self._queue.task_done()
+            # Очередь опустела, а на диске ещё что-то есть — подкачиваем сразу, не ждём таймера
+            if self.spill_pending and self._queue.empty() and not self._stopping:
+                try:
+                    self._refill_from_spill()
+                except Exception as e:
+                    print(f"❌ Ошибка чтения очереди с диска {self.spill_path}: {e}")
+
+    async def start(self):
+        """Запускает воркеров (и подкачку с диска для политики spill)."""
+        if self.policy == "spill" and os.path.exists(self.spill_path):
+            # Сообщения, сброшенные на диск до перезапуска, тоже обработаем
+            with open(self.spill_path, "rb") as f:
+                f.seek(self._read_offset())
+                self.spill_pending = sum(1 for line in f if line.strip())
+            print(f"📥 На диске осталось {self.spill_pending} необработанных сообщений")
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        if self.policy == "spill":
+            self._refill_task = asyncio.create_task(self._refill_loop())
+        print(f"✅ Очередь сообщений запущена: {self.workers} воркеров, "
+              f"размер {self.maxsize}, политика {self.policy}")
+
+    async def stop(self, timeout: float = STOP_DRAIN_TIMEOUT):
+        """
+        Останавливает воркеров: свободные — сразу, занятые дорабатывают текущее сообщение
+        (до timeout, потом отменяются). При политике spill недоразобранное — и отменённые
+        на середине сообщения — уходит на диск, при других политиках об их потере пишем в лог.
+        """
+        self._stopping = True
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+        busy = []
+        for n, task in enumerate(self._tasks):
+            if n in self._current:
+                busy.append(task)
+            else:
+                task.cancel()  # ждёт в queue.get — сообщение из очереди не теряется
+        if busy:
+            print(f"⏳ Ждём, пока {len(busy)} воркеров доработают текущие сообщения...")
+            await asyncio.wait(busy, timeout=timeout)
+        interrupted = list(self._current.values())  # не успели за timeout
+        for task in busy:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *filter(None, [self._refill_task]), return_exceptions=True)
+        self._tasks = []
+        self._refill_task = None
+        self._current = {}
+
+        items = interrupted
+        while not self._queue.empty():
+            items.append(self._queue.get_nowait())
+            self._queue.task_done()
+        if not items:
+            return
+        if self.policy == "spill":
+            self._spill(items)
+            print(f"💾 {len(items)} сообщений сохранено на диск до следующего запуска")
+        else:
+            print(f"⚠ {len(items)} сообщений не обработано при остановке (политика {self.policy})")
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "workers": self.workers,
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "spill_pending": self.spill_pending,
+            "spill_compactions": self.spill_compactions,
+            "wait_avg_sec": self.wait_total / self.picked if self.picked else 0.0,
+            "wait_max_sec": self.wait_max,
+            "wait_last_sec": self.last_wait,
+        }
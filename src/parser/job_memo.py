@@ -0,0 +1,57 @@
+from src.db.async_db import get_job_by_hash
+from src.utils.helpers import LRUCache
+
+MEMO_SIZE = 10000  # сколько последних вакансий держим в памяти
+
+
+class JobMemo:
+    """
+    Мемоизация результатов по хэшу текста: одна и та же вакансия, разосланная
+    по многим чатам, классифицируется и обогащается только один раз.
+    Сначала смотрим в LRU в памяти, потом в таблицу jobs.
+    """
+
+    def __init__(self, size: int = MEMO_SIZE):
+        self._memory = LRUCache(size)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    async def get(self, job_hash: str):
+        """Возвращает (label, prob, emails, usernames, links) или None."""
+        entry = self._memory.get(job_hash)
+        if entry is not None:
+            self.memory_hits += 1
+            return entry
+
+        row = await get_job_by_hash(job_hash)
+        if row is None or row[4] is None:
+            self.misses += 1
+            return None
+
+        _, usernames, emails, links, prob, _ = row
+        # В таблице хранится только вероятность; метка у бинарной LR — это prob >= 0.5
+        entry = (
+            1 if prob >= 0.5 else 0,
+            prob,
+            list(emails),
+            list(usernames),
+            list(links),
+        )
+        self.db_hits += 1
+        self._memory.put(job_hash, entry)
+        return entry
+
+    def put(self, job_hash: str, label, prob, emails, usernames, links):
+        self._memory.put(job_hash, (label, prob, list(emails), list(usernames), list(links)))
+
+    def stats(self):
+        hits = self.memory_hits + self.db_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "memory_size": len(self._memory),
+        }
@@ -0,0 +1,118 @@
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.db.async_db import get_link_cache, save_link_cache
+from src.utils.helpers import LRUCache
+from src.utils.metrics import register
+
+# --- Настройки кэша ссылок ---
+CACHE_TTL = 24 * 60 * 60       # сколько живут найденные на странице контакты, сек
+NEGATIVE_TTL = 60 * 60         # сколько не трогаем ссылку после ошибки/таймаута, сек
+MEMORY_CACHE_SIZE = 5000       # размер LRU в памяти
+
+# Параметры, которые не меняют содержимое страницы (метки рекламы и рефералки)
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "ref", "ref_src", "utm_referrer"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Приводит URL к каноническому виду для ключа кэша:
+    схема и хост в нижнем регистре, без фрагмента, без utm_* и прочих меток,
+    параметры отсортированы, без стандартного порта и лишнего / в конце.
+    """
+    url = url.strip().rstrip(".,;:!?)]}>\"'")
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class LinkCache:
+    """
+    Двухуровневый кэш результатов обработки ссылок: LRU в памяти + таблица link_cache в SQLite.
+    Храним только найденные контакты, а не HTML. Ошибки и таймауты кэшируются
+    отрицательно на NEGATIVE_TTL, чтобы не долбить одну и ту же битую ссылку.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, negative_ttl: float = NEGATIVE_TTL,
+                 memory_size: int = MEMORY_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = LRUCache(memory_size)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    async def get(self, url: str):
+        """
+        Возвращает (emails, usernames, ok) для ссылки или None, если в кэше её нет.
+        ok=False — ссылка недавно падала, качать её снова не нужно.
+        """
+        key = normalize_url(url)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None and entry[3] < now:
+            self._memory.pop(key)
+            entry = None
+        if entry is not None:
+            self.memory_hits += 1
+        else:
+            entry = await get_link_cache(key)
+            if entry is None or entry[3] < now:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self._memory.put(key, entry)
+
+        emails, usernames, ok, _ = entry
+        if not ok:
+            self.negative_hits += 1
+        return list(emails), list(usernames), ok
+
+    async def put(self, url: str, emails, usernames):
+        """Запоминает контакты, найденные на странице."""
+        await self._store(url, list(emails), list(usernames), True, self.ttl)
+
+    async def put_failure(self, url: str):
+        """Запоминает, что ссылка не открылась (ошибка, не 200, таймаут)."""
+        await self._store(url, [], [], False, self.negative_ttl)
+
+    async def _store(self, url, emails, usernames, ok, ttl):
+        key = normalize_url(url)
+        expires_at = time.time() + ttl
+        self._memory.put(key, (emails, usernames, ok, expires_at))
+        await save_link_cache(key, emails, usernames, ok, expires_at)
+
+    def stats(self):
+        hits = self.memory_hits + self.db_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "memory_size": len(self._memory),
+        }
+
+
+# Общий экземпляр для парсера
+link_cache = LinkCache()
+register("link_cache", link_cache.stats)
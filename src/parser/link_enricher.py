@@ -0,0 +1,147 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.parser.link_cache import link_cache
+from src.parser.message_parser import extract_page_contacts
+
+# --- Настройки обогащения ссылок ---
+MAX_CONCURRENT_REQUESTS = 20  # сколько страниц качаем одновременно (на весь процесс)
+MAX_PER_DOMAIN = 3            # сколько одновременных запросов к одному домену
+REQUEST_TIMEOUT = 5           # таймаут одного запроса, сек
+MESSAGE_DEADLINE = 8          # общий дедлайн на все ссылки одного сообщения, сек
+MAX_PAGE_SIZE = 2 * 1024 * 1024  # больше не читаем, контакты обычно в начале страницы
+USER_AGENT = "Mozilla/5.0"
+
+class LinkFetchError(Exception):
+    """Страница не открылась (не 200)."""
+
+
+class LinkEnricher:
+    """
+    Асинхронно скачивает страницы по ссылкам из сообщения и ищет на них контакты.
+    Одна общая HTTP-сессия с пулом соединений, глобальный и доменный лимиты
+    параллельности и общий дедлайн на сообщение. Если передан cache (LinkCache),
+    повторные ссылки не скачиваются, а упавшие не перезапрашиваются до истечения TTL.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_REQUESTS,
+                 max_per_domain: int = MAX_PER_DOMAIN,
+                 request_timeout: float = REQUEST_TIMEOUT,
+                 message_deadline: float = MESSAGE_DEADLINE,
+                 cache=None):
+        self.cache = cache
+        self.max_concurrent = max_concurrent
+        self.max_per_domain = max_per_domain
+        self.request_timeout = request_timeout
+        self.message_deadline = message_deadline
+        self._session = None
+        self._global_limit = asyncio.Semaphore(max_concurrent)
+        self._domain_limits = {}
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrent,
+                limit_per_host=self.max_per_domain,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def close(self):
+        """Закрывает HTTP-сессию (вызывать при остановке)."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _domain_limit(self, domain: str):
+        limit = self._domain_limits.get(domain)
+        if limit is None:
+            # Не даём словарю бесконечно расти: выкидываем свободные семафоры
+            if len(self._domain_limits) > 1000:
+                self._domain_limits = {
+                    d: s for d, s in self._domain_limits.items() if s.locked()
+                }
+            limit = asyncio.Semaphore(self.max_per_domain)
+            self._domain_limits[domain] = limit
+        return limit
+
+    async def fetch_contacts(self, link: str):
+        """Скачивает одну страницу и возвращает (emails, usernames)."""
+        domain = (urlsplit(link).hostname or "").lower()
+        session = await self._get_session()
+        async with self._global_limit, self._domain_limit(domain):
+            async with session.get(link, allow_redirects=True) as response:
+                if response.status != 200:
+                    raise LinkFetchError(f"HTTP {response.status}")
+                content_type = response.headers.get("Content-Type", "")
+                if content_type and "html" not in content_type and "text" not in content_type:
+                    return [], []
+                body = await response.content.read(MAX_PAGE_SIZE)
+                html = body.decode(response.charset or "utf-8", errors="replace")
+
+        # Разбор HTML — CPU-работа, уводим её из event loop
+        return await asyncio.to_thread(extract_page_contacts, html)
+
+    async def _fetch_cached(self, link: str):
+        if self.cache is None:
+            return await self.fetch_contacts(link)
+
+        cached = await self.cache.get(link)
+        if cached is not None:
+            emails, usernames, ok = cached
+            return emails, usernames
+
+        try:
+            emails, usernames = await self.fetch_contacts(link)
+        except Exception:
+            # Ошибки и таймауты кэшируем отрицательно; отмена по дедлайну сюда не попадает
+            await self.cache.put_failure(link)
+            raise
+        await self.cache.put(link, emails, usernames)
+        return emails, usernames
+
+    async def enrich(self, links, deadline: float = None):
+        """
+        Параллельно обрабатывает все ссылки сообщения.
+        Всё, что не успело за дедлайн, отменяется; возвращаем то, что успели собрать.
+        """
+        emails, usernames = [], []
+        links = list(dict.fromkeys(links or []))
+        if not links:
+            return emails, usernames
+
+        deadline = self.message_deadline if deadline is None else deadline
+        started = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._fetch_cached(link)): link for link in links}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            print(f"⏱ Дедлайн {deadline} сек: не успели обработать {len(pending)} ссылок "
+                  f"из {len(links)} ({time.perf_counter() - started:.2f} сек)")
+
+        for task in done:
+            link = tasks[task]
+            try:
+                page_emails, page_usernames = task.result()
+            except Exception as e:
+                print(f"⚠ Ошибка при обработке ссылки {link}: {e!r}")
+                continue
+            emails += page_emails
+            usernames += page_usernames
+
+        return emails, usernames
+
+
+# Общий экземпляр для парсера
+link_enricher = LinkEnricher(cache=link_cache)
@@ -0,0 +1,77 @@
+import re
+
+from bs4 import BeautifulSoup
+
+# --- Единые правила извлечения контактов (для парсера и для бота) ---
+# Всё ищется одним проходом по тексту: на каждой позиции сначала пробуем ссылку,
+# потом email, потом t.me/..., потом @username. Поэтому "hr@company.com" — это email,
+# а не email + мусорный username "@company".
+CONTACT_RE = re.compile(r"""
+    (?P<url>https?://[^\s<>"'`]+)
+  | (?<![A-Za-z0-9._%+-])(?P<email>[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})
+  | (?<![\w/.])(?:t|telegram)\.me/(?P<tme>[A-Za-z][A-Za-z0-9_]{3,31})
+  | (?<![\w@.])@(?P<username>[A-Za-z][A-Za-z0-9_]{3,31})
+""", re.VERBOSE)
+TME_LINK_RE = re.compile(r"(?:https?://)?(?:www\.)?(?:t|telegram)\.me/([A-Za-z][A-Za-z0-9_]{3,31})(?![A-Za-z0-9_])")
+HTML_TAG_RE = re.compile(r"<(?:a|p|div|span|br|b|i|u|s|strong|em|code|pre|li|ul|ol|h[1-6]|html|body)\b[^>]*>", re.IGNORECASE)
+
+URL_TRAILING_PUNCTUATION = ".,;:!?)]}»"
+# Служебные пути t.me, которые не являются username
+TME_RESERVED = {"joinchat", "addstickers", "addlist", "share", "proxy", "socks", "boost"}
+
+
+def _scan(text: str, emails: dict, usernames: dict, links: dict):
+    """Один проход регулярки по тексту; результаты — в dict (упорядоченные множества)."""
+    for m in CONTACT_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "url":
+            url = m.group("url").rstrip(URL_TRAILING_PUNCTUATION)
+            links.setdefault(url, None)
+            tme = TME_LINK_RE.match(url, url.index("//") + 2)
+            if tme and tme.group(1).lower() not in TME_RESERVED:
+                usernames.setdefault(tme.group(1).lower(), "@" + tme.group(1))
+        elif kind == "email":
+            email = m.group("email")
+            emails.setdefault(email.lower(), email)
+        elif kind == "tme":
+            if m.group("tme").lower() not in TME_RESERVED:
+                usernames.setdefault(m.group("tme").lower(), "@" + m.group("tme"))
+        else:
+            usernames.setdefault(m.group("username").lower(), "@" + m.group("username"))
+
+
+def _html_to_text(html: str, with_text: bool = True):
+    """Текст страницы + href всех ссылок (в href часто прячется t.me/username или mailto:)."""
+    soup = BeautifulSoup(html, "html.parser")
+    parts = [soup.get_text(separator=" ", strip=True) if with_text else html]
+    parts += [a["href"] for a in soup.find_all("a", href=True)]
+    return "\n".join(parts)
+
+
+def extract_contacts(text: str):
+    """
+    Достаёт контакты из текста сообщения: (emails, usernames, links).
+    Usernames — с "@", без дублей (без учёта регистра), порядок как в тексте.
+    HTML разбирается только если в тексте действительно есть разметка.
+    """
+    emails, usernames, links = {}, {}, {}
+    # Быстрый выход: без "@", "://" и ".me/" контактов в тексте быть не может
+    if not text or ("@" not in text and "://" not in text and ".me/" not in text):
+        return [], [], []
+    if "<" in text and HTML_TAG_RE.search(text):
+        # В сообщении разметки мало: сам текст сканируем как есть, из HTML берём только href
+        text = _html_to_text(text, with_text=False)
+    _scan(text, emails, usernames, links)
+    return list(emails.values()), list(usernames.values()), list(links)
+
+
+def extract_page_contacts(html: str):
+    """Достаёт (emails, usernames) со скачанной HTML-страницы."""
+    emails, usernames, links = {}, {}, {}
+    _scan(_html_to_text(html), emails, usernames, links)
+    return list(emails.values()), list(usernames.values())
+
+
+def is_telegram_link(url: str) -> bool:
+    """Ссылка на t.me/telegram.me — качать её бессмысленно, username уже извлечён."""
+    return TME_LINK_RE.match(url) is not None
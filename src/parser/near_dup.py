@@ -0,0 +1,214 @@
+"""
+Поиск почти одинаковых вакансий: репост с другим эмодзи, хэштегом или
+переставленными строками попадает в тот же кластер, что и оригинал, и не
+классифицируется, не уведомляется и не рассылается заново.
+
+Текст -> шинглы по SHINGLE_SIZE слов внутри строк (без хэштегов) -> MinHash-подпись из NUM_PERM значений.
+Подпись режется на LSH_BANDS полос; тексты, совпавшие хотя бы в одной полосе, —
+кандидаты, из них берём самый похожий с оценкой сходства >= порога. Поиск
+идёт только по корзинам своих полос, без перебора всех кластеров.
+
+В памяти — подписи NEAR_DUP_MAX_CLUSTERS последних кластеров (одна на кластер,
+по первой вакансии), в SQLite (job_clusters) — они же, чтобы после перезапуска
+загрузить индекс заново (warm).
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from src.db.async_db import get_cluster_signatures, get_recent_job_texts, save_cluster_signature, set_job_cluster
+
+# --- Настройки ---
+NEAR_DUP_THRESHOLD = 0.8         # оценка сходства Жаккара, с которой тексты — одна вакансия
+NEAR_DUP_MAX_CLUSTERS = 20000    # сколько последних кластеров держим в памяти
+NUM_PERM = 128                   # длина MinHash-подписи
+LSH_BANDS = 16                   # 16 полос по 8 значений: при сходстве 0.8 кандидат найдётся в ~95% случаев
+SHINGLE_SIZE = 3                 # слов в шингле
+
+_ROWS = NUM_PERM // LSH_BANDS
+_word_re = re.compile(r"\w+")
+_hashtag_re = re.compile(r"#\w+")  # хэштеги в репостах меняют чаще всего, в сравнении их не учитываем
+
+
+def _coefficients(salt: str, shape):
+    """Детерминированные нечётные 64-битные множители: подписи хранятся в БД и должны совпадать между запусками."""
+    values = [int.from_bytes(hashlib.blake2b(f"{salt}{i}".encode(), digest_size=8).digest(), "little") | 1
+              for i in range(int(np.prod(shape)))]
+    return np.array(values, dtype=np.uint64).reshape(shape)
+
+
+# h_i(x) = старшие 32 бита (a_i * x + b_i) mod 2^64 — multiply-shift хэширование
+_PERM_A = _coefficients("a", (NUM_PERM,))
+_PERM_B = _coefficients("b", (NUM_PERM,))
+_BAND_MIX = _coefficients("band", (LSH_BANDS, _ROWS))
+
+
+def signature(text: str):
+    """MinHash-подпись текста (np.uint32[NUM_PERM]) или None, если в тексте нет слов."""
+    shingles = set()
+    # Шинглы не переходят через границу строк: перестановка строк их не меняет
+    for line in _hashtag_re.sub(" ", (text or "").lower()).splitlines():
+        words = _word_re.findall(line)
+        size = min(SHINGLE_SIZE, len(words))
+        shingles.update(" ".join(words[i:i + size]) for i in range(len(words) - size + 1) if size)
+    if not shingles:
+        return None
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] * _PERM_A + _PERM_B) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a, b) -> float:
+    """Оценка сходства Жаккара по двум подписям."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(sig):
+    with np.errstate(over="ignore"):
+        return (sig.reshape(LSH_BANDS, _ROWS).astype(np.uint64) * _BAND_MIX).sum(axis=1).tolist()
+
+
+class NearDupIndex:
+    """LSH-индекс кластеров: assign() сопоставляет тексту канонический хэш кластера."""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, max_clusters: int = NEAR_DUP_MAX_CLUSTERS):
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self._signatures = OrderedDict()  # cluster_hash -> подпись, от давно не встречавшихся к свежим
+        self._buckets = {}                # ключ полосы -> cluster_hash или [cluster_hash, ...] (обычно один)
+
+        self.lookups = 0
+        self.near_dups = 0
+        self.new_clusters = 0
+        self.candidates = 0
+        self.evicted = 0
+        self.lookup_time = 0.0
+
+    def _add(self, cluster_hash: str, sig):
+        self._signatures[cluster_hash] = sig
+        for key in _band_keys(sig):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = cluster_hash
+            elif isinstance(bucket, list):
+                bucket.append(cluster_hash)
+            else:
+                self._buckets[key] = [bucket, cluster_hash]
+        while len(self._signatures) > self.max_clusters:
+            old_hash, old_sig = self._signatures.popitem(last=False)
+            for key in _band_keys(old_sig):
+                bucket = self._buckets[key]
+                if isinstance(bucket, list):
+                    bucket.remove(old_hash)
+                    if len(bucket) == 1:
+                        self._buckets[key] = bucket[0]
+                else:
+                    del self._buckets[key]
+            self.evicted += 1
+
+    def lookup(self, sig):
+        """Самый похожий кластер: (cluster_hash, сходство) или (None, 0.0)."""
+        candidates = set()
+        for key in _band_keys(sig):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, list):
+                candidates.update(bucket)
+            elif bucket is not None:
+                candidates.add(bucket)
+        self.candidates += len(candidates)
+        best, best_score = None, 0.0
+        for cluster_hash in candidates:
+            score = similarity(sig, self._signatures[cluster_hash])
+            if score > best_score:
+                best, best_score = cluster_hash, score
+        if best_score >= self.threshold:
+            return best, best_score
+        return None, 0.0
+
+    def _assign(self, job_hash: str, text: str):
+        """Синхронная часть assign: (cluster_hash, подпись нового кластера или None)."""
+        started = time.perf_counter()
+        self.lookups += 1
+        try:
+            if job_hash in self._signatures:
+                self._signatures.move_to_end(job_hash)
+                return job_hash, None
+            sig = signature(text)
+            if sig is None:
+                return job_hash, None
+            cluster_hash, _ = self.lookup(sig)
+            if cluster_hash is not None:
+                self.near_dups += 1
+                self._signatures.move_to_end(cluster_hash)
+                return cluster_hash, None
+            self.new_clusters += 1
+            self._add(job_hash, sig)
+            return job_hash, sig
+        finally:
+            self.lookup_time += time.perf_counter() - started
+
+    async def assign(self, job_hash: str, text: str) -> str:
+        """
+        Канонический хэш кластера для текста: хэш первой похожей вакансии или job_hash,
+        если похожих нет (тогда текст становится новым кластером и пишется в БД).
+        Индекс в памяти обновляется до первого await, поэтому два одновременных
+        репоста попадут в один кластер.
+        """
+        cluster_hash, sig = self._assign(job_hash, text)
+        if sig is not None:
+            await save_cluster_signature(job_hash, sig.tobytes())
+        return cluster_hash
+
+    async def warm(self):
+        """
+        Загружает подписи последних кластеров из БД. В первый раз (таблица пустая)
+        кластеризует последние сохранённые вакансии.
+        """
+        started = time.perf_counter()
+        rows = await get_cluster_signatures(self.max_clusters)
+        for cluster_hash, blob in rows:
+            self._add(cluster_hash, np.frombuffer(blob, dtype=np.uint32))
+        if rows:
+            print(f"🧬 Индекс похожих вакансий: {len(rows)} кластеров за {time.perf_counter() - started:.1f} с")
+            return
+
+        writes = []
+        members = 0
+        for job_hash, text in await get_recent_job_texts(self.max_clusters):
+            cluster_hash, sig = self._assign(job_hash, text)
+            if sig is not None:
+                writes.append(save_cluster_signature(job_hash, sig.tobytes()))
+            elif cluster_hash != job_hash:
+                writes.append(set_job_cluster(job_hash, cluster_hash))
+                members += 1
+        # Все записи разом — писатель соберёт их в несколько групповых коммитов
+        await asyncio.gather(*writes)
+        print(f"🧬 Кластеризованы сохранённые вакансии: {len(self._signatures)} кластеров, "
+              f"{members} повторов за {time.perf_counter() - started:.1f} с")
+
+    def memory_bytes(self) -> int:
+        """Примерный объём индекса в памяти."""
+        signatures = len(self._signatures) * (NUM_PERM * 4 + 200)
+        buckets = len(self._buckets) * 70 + sum(len(b) * 8 + 56 for b in self._buckets.values()
+                                                  if isinstance(b, list))
+        return signatures + buckets
+
+    def stats(self):
+        return {
+            "clusters": len(self._signatures),
+            "buckets": len(self._buckets),
+            "lookups": self.lookups,
+            "near_dups": self.near_dups,
+            "new_clusters": self.new_clusters,
+            "avg_candidates": self.candidates / self.lookups if self.lookups else 0.0,
+            "avg_lookup_ms": self.lookup_time / self.lookups * 1000 if self.lookups else 0.0,
+            "evicted": self.evicted,
+            "memory_mb": self.memory_bytes() / 2 ** 20,
+        }
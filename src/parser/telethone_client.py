@@ -1,13 +1,19 @@
 from telethon import TelegramClient, events
 from config.config import API_ID, API_HASH
-from src.db.database import save_job, mark_sent, already_sent, get_jobs_sent
-from src.ml.classifier import predict
+from src.db.database import _hash_text
+from src.db.async_db import save_job
+from src.ml.classifier import predict, predict_batch
+from src.ml.batcher import MicroBatcher
+from src.ml.prefilter import Prefilter
 from src.bot.handlers import send_resume_via_telethon
 from src.utils.email_sender import send_resume_email
 from src.bot.notifications import send_job_notification
-import re
-import requests
-from bs4 import BeautifulSoup
+from src.parser.link_enricher import link_enricher
+from src.parser.message_parser import extract_contacts, is_telegram_link
+from src.parser.ingest_queue import IngestQueue
+from src.parser.job_memo import JobMemo
+from src.parser.near_dup import NearDupIndex
+from src.utils.metrics import register
 import asyncio
 from telethon.errors import FloodWaitError
 
@@ -16,6 +22,17 @@ THRESHOLD = 0.60  # минимальный порог вероятности
 RESUME_PATH = "data/resume.pdf"
 BLOCKED_USERNAMES = {"@teletype", "@telegram","@gmail", "@quinton_nietfeld", "@kovesh"}
 BLOCKED_EMAIL_DOMAINS = ["teletype.in", "telegram.org", "noreply"]
+MICRO_BATCHING = True  # классифицировать сообщения пачками (см. src/ml/batcher.py)
+
+classify_batcher = MicroBatcher(predict_batch)
+register("classifier_batches", classify_batcher.stats)
+prefilter = Prefilter()
+register("prefilter", prefilter.stats)
+job_memo = JobMemo()
+register("job_memo", job_memo.stats)
+near_dup = NearDupIndex()
+register("near_dup", near_dup.stats)
+analyzing = {}  # cluster_hash -> future разбора, который уже идёт
 
 # Глобальная переменная для хранения экземпляра бота
 bot_instance = None
@@ -26,54 +43,16 @@ def set_bot_instance(bot):
     bot_instance = bot
 
 # --- Функция для извлечения контактов ---
-def extract_contacts_from_text(text):
-    emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
-    usernames = []
-    links = re.findall(r"https?://\S+", text)
-
-    # --- Проверяем HTML (если есть) ---
-    soup = BeautifulSoup(text, "html.parser")
-
-    # Ищем <a href="...t.me/...">@username</a>
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        if "t.me/" in href or "telegram.me/" in href:
-            uname = re.search(r"t\.me/([a-zA-Z0-9_]{3,32})", href)
-            if uname:
-                usernames.append("@" + uname.group(1))
-
-    # --- Извлекаем username из обычного текста ---
-    usernames += re.findall(r"@([a-zA-Z0-9_]{3,32})", text)
-    usernames = ["@" + u if not u.startswith("@") else u for u in usernames]
-
-    # --- Обрабатываем ссылки (ищем контакты на странице) ---
-    for link in links:
-        try:
-            response = requests.get(link, timeout=5, headers={"User-Agent": "Mozilla/5.0"})
-            if response.status_code == 200:
-                html = response.text
-                page_soup = BeautifulSoup(html, "html.parser")
-
-                # 1. Извлекаем весь текст страницы
-                page_text = page_soup.get_text(separator=" ", strip=True)
-
-                # 2. Ищем email
-                emails += re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", page_text)
-
-                # 3. Ищем usernames
-                page_usernames = re.findall(r"@([a-zA-Z0-9_]{3,32})", page_text)
-                usernames += ["@" + u for u in page_usernames]
+async def extract_contacts_from_text(text):
+    emails, usernames, links = extract_contacts(text)
 
-                # 4. Ищем в <a href>
-                for a in page_soup.find_all("a", href=True):
-                    href = a["href"]
-                    if "t.me/" in href or "telegram.me/" in href:
-                        uname = re.search(r"t\.me/([a-zA-Z0-9_]{3,32})", href)
-                        if uname:
-                            usernames.append("@" + uname.group(1))
-
-        except Exception as e:
-            print(f"⚠ Ошибка при обработке ссылки {link}: {e}")
+    # --- Обрабатываем ссылки (ищем контакты на страницах, параллельно и без блокировки loop) ---
+    # t.me-ссылки не качаем: username из них уже извлечён
+    page_emails, page_usernames = await link_enricher.enrich(
+        [link for link in links if not is_telegram_link(link)]
+    )
+    emails += page_emails
+    usernames += page_usernames
 
     return list(set(emails)), list(set(usernames)), links
 
@@ -111,9 +90,123 @@ def filter_contacts(emails, usernames):
 
     return filtered_emails, filtered_usernames
 
+async def classify(text):
+    """Классификация с микро-батчингом: воркеры ждут общую пачку до BATCH_MAX_WAIT_MS."""
+    if MICRO_BATCHING:
+        return await classify_batcher.predict(text)
+    return predict(text)
+
+async def analyze_message(item):
+    """Полный разбор нового текста: модель, контакты (с обогащением ссылок), сохранение в jobs."""
+    text = item["text"]
+
+    # --- Классификация текста ---
+    label, prob = await classify(text)
+
+    # --- Извлекаем контакты ---
+    emails, usernames, links = await extract_contacts_from_text(text)
+    
+    print("🔍 ДО фильтрации:")
+    print("Emails:", emails)
+    print("Usernames:", usernames)
+    print("Links:", links)
+
+    # --- Фильтруем запрещённые ---
+    emails, usernames = filter_contacts(emails, usernames)
+    
+    print("🔍 ПОСЛЕ фильтрации:")
+    print("Emails:", emails)
+    print("Usernames:", usernames)
+    print("Links:", links)
+
+    await save_job(
+        text=text,
+        chat_id=item["chat_id"],
+        msg_id=item["msg_id"],
+        prob=prob,
+        usernames=usernames,
+        links=links,
+        emails=emails,
+        cluster_hash=item.get("cluster_hash")
+    )
+    return label, prob, emails, usernames, links
+
+async def resolve_cluster(item, cluster_hash):
+    """
+    Результат кластера: сохранённый (память / таблица jobs) или полный разбор item.
+    Возвращает (результат, разобран ли item) — разобранный item уже сохранён в jobs.
+    """
+    memo = await job_memo.get(cluster_hash)
+    if memo is not None:
+        return memo, False
+    result = await analyze_message(item)
+    job_memo.put(cluster_hash, *result)
+    return result, True
+
+# --- Обработка одного сообщения (выполняется воркерами очереди) ---
+async def process_message(item):
+    text = item["text"]
+
+    # --- Дешёвый префильтр: отсекаем очевидно не-вакансии до модели и HTTP ---
+    passed, reason = prefilter.check(text, item.get("chat_id"), item.get("sender_id"), item.get("out", False))
+    if not passed:
+        if prefilter.should_audit(reason):
+            label, prob = await classify(text)
+            prefilter.record_audit(label == 1 and prob >= THRESHOLD)
+        return
+
+    # --- Повтор (кросс-пост той же или почти той же вакансии): берём готовый результат кластера ---
+    job_hash = _hash_text(text)
+    cluster_hash = await near_dup.assign(job_hash, text)
+    item["cluster_hash"] = cluster_hash
+    resolving = analyzing.get(cluster_hash)
+    owner = resolving is None
+    if owner:
+        # Регистрируемся до похода в БД за сохранённым результатом: дубли, пришедшие
+        # в это время, ждут этот разбор, а не запускают модель ещё раз
+        resolving = analyzing[cluster_hash] = asyncio.ensure_future(resolve_cluster(item, cluster_hash))
+        try:
+            (label, prob, emails, usernames, links), analyzed = await resolving
+        finally:
+            analyzing.pop(cluster_hash, None)
+    else:
+        # Тот же кластер прямо сейчас разбирается другим воркером — ждём его результат
+        (label, prob, emails, usernames, links), _ = await resolving
+        analyzed = False
+    if not analyzed:
+        print(f"♻ Вакансия {job_hash} уже разобрана (кластер {cluster_hash}), используем сохранённый результат")
+        if job_hash != cluster_hash or not owner:
+            # Почти-дубль — и сообщение, дождавшееся чужого разбора (его строку никто не сохранил), —
+            # сохраняем со ссылкой на кластер (для /search, /jobs и истории); точный повтор INSERT OR IGNORE пропустит
+            await save_job(text=text, chat_id=item["chat_id"], msg_id=item["msg_id"], prob=prob,
+                           usernames=usernames, links=links, emails=emails, cluster_hash=cluster_hash)
+
+    print(f"\n📌 Новое сообщение:")
+    print(f"Текст: {text[:120]}...")
+    print(f"Вероятность вакансии: {prob:.4f}, Метка: {label}")
+    print(f"Usernames: {usernames}, Links: {links}, Emails: {emails}")
+
+    if label == 1 and prob >= THRESHOLD:
+        # Отправляем уведомление о вакансии (одно на кластер: у почти-дублей тот же cluster_hash)
+        if bot_instance:
+            try:
+                await send_job_notification(bot_instance, cluster_hash)
+                print(f"📨 Уведомление о вакансии отправлено")
+            except Exception as e:
+                print(f"❌ Ошибка отправки уведомления: {e}")
+        
+        # Резюме теперь отправляется автоматически в функции уведомлений
+        print("ℹ Резюме будет отправлено автоматически через уведомления")
+    else:
+        print("❌ Не подходит или нет контактов.")
+
+ingest_queue = IngestQueue(process_message)
+register("ingest_queue", ingest_queue.stats)
+
 async def start_parser():
     await client.start()
     print("✅ Telethon parser запущен...")
+    await ingest_queue.start()
 
     @client.on(events.NewMessage)
     async def handler(event):
@@ -121,53 +214,17 @@ async def start_parser():
         if not text.strip():
             return
 
-        # --- Классификация текста ---
-        label, prob = predict(text)
-
-        # --- Извлекаем контакты ---
-        emails, usernames, links = extract_contacts_from_text(text)
-        
-        print("🔍 ДО фильтрации:")
-        print("Emails:", emails)
-        print("Usernames:", usernames)
-        print("Links:", links)
-
-        # --- Фильтруем запрещённые ---
-        emails, usernames = filter_contacts(emails, usernames)
-        
-        print("🔍 ПОСЛЕ фильтрации:")
-        print("Emails:", emails)
-        print("Usernames:", usernames)
-        print("Links:", links)
-
-        job_hash = save_job(
-            text=text,
-            chat_id=event.chat_id,
-            msg_id=event.message.id,
-            prob=prob,
-            usernames=usernames,
-            links=links,
-            emails=emails
-        )
-
-        print(f"\n📌 Новое сообщение:")
-        print(f"Текст: {text[:120]}...")
-        print(f"Вероятность вакансии: {prob:.4f}, Метка: {label}")
-        print(f"Usernames: {usernames}, Links: {links}, Emails: {emails}")
-
-        if label == 1 and prob >= THRESHOLD:
-            # Отправляем уведомление о вакансии
-            if bot_instance:
-                try:
-                    await send_job_notification(bot_instance, job_hash, "iliyasls")
-                    print(f"📨 Уведомление о вакансии отправлено")
-                except Exception as e:
-                    print(f"❌ Ошибка отправки уведомления: {e}")
-            
-            # Резюме теперь отправляется автоматически в функции уведомлений
-            print("ℹ Резюме будет отправлено автоматически через уведомления")
-        else:
-            print("❌ Не подходит или нет контактов.")
-
-    await client.run_until_disconnected()
-
+        # Тяжёлая работа — в воркерах, здесь только ставим в очередь
+        await ingest_queue.put({
+            "text": text,
+            "chat_id": event.chat_id,
+            "msg_id": event.message.id,
+            "sender_id": event.sender_id,
+            "out": event.out,
+        })
+
+    try:
+        await client.run_until_disconnected()
+    finally:
+        await ingest_queue.stop()
+        await link_enricher.close()
@@ -1,32 +1,11 @@
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email.mime.text import MIMEText
-from email import encoders
 from config.config import EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD
+from src.utils.mailer import Mailer
+from src.utils.metrics import register
 
-def send_resume_email(to_email, resume_path):
-    msg = MIMEMultipart()
-    msg['From'] = EMAIL_USER
-    msg['To'] = to_email
-    msg['Subject'] = "Резюме на вакансию"
+# Пул SMTP-соединений, закэшированное вложение и лимит скорости — см. src/utils/mailer.py
+mailer = Mailer(EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASSWORD)
+register("email", mailer.stats)
 
-    body = "Здравствуйте! Отправляю свое резюме на рассмотрение."
-    msg.attach(MIMEText(body, 'plain'))
-
-    with open(resume_path, "rb") as f:
-        part = MIMEBase('application', 'octet-stream')
-        part.set_payload(f.read())
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition', f'attachment; filename="resume.pdf"')
-        msg.attach(part)
-
-    try:
-        server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        server.sendmail(EMAIL_USER, to_email, msg.as_string())
-        server.quit()
-        print(f"📧 Email отправлен -> {to_email}")
-    except Exception as e:
-        print(f"⚠ Ошибка отправки email {to_email}: {e}")
+async def send_resume_email(to_email, resume_path):
+    """Отправляет резюме на to_email. Возвращает (success: bool, error: str|None)"""
+    return await mailer.send_resume(to_email, resume_path)
@@ -0,0 +1,213 @@
+"""
+Асинхронная отправка резюме по email (aiosmtplib).
+
+Раньше на каждого получателя открывалось новое SMTP-соединение (connect +
+STARTTLS + login), PDF заново читался и кодировался в base64, а всё это
+выполнялось синхронно. Здесь:
+- SmtpPool держит до size авторизованных соединений и переиспользует их
+  (простаивающие дольше SMTP_IDLE_TIMEOUT закрываются — сервер всё равно их рвёт);
+- AttachmentCache кодирует вложение один раз и пересобирает только при
+  изменении файла (mtime/размер);
+- Mailer отправляет пачки параллельно — не больше, чем соединений в пуле.
+  Скорость писем ограничивает очередь отправок (OUTBOX_RATES["email"] в
+  src/bot/outbox.py); свой лимит (per_minute) — только для прямых вызовов в обход неё.
+"""
+
+import asyncio
+import os
+import time
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import aiosmtplib
+
+from src.utils.rate_limit import TokenBucket
+
+# --- Настройки ---
+SMTP_POOL_SIZE = 3             # соединений с SMTP-сервером (и параллельных отправок)
+SMTP_IDLE_TIMEOUT = 120        # простаивающее дольше соединение не переиспользуем, сек
+SMTP_TIMEOUT = 30              # таймаут одной SMTP-операции, сек
+EMAIL_SUBJECT = "Резюме на вакансию"
+EMAIL_BODY = "Здравствуйте! Отправляю свое резюме на рассмотрение."
+ATTACHMENT_NAME = "resume.pdf"
+
+
+class SmtpPool:
+    """Пул авторизованных соединений aiosmtplib; не больше size одновременно."""
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None,
+                 size: int = SMTP_POOL_SIZE, start_tls: bool = None, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.start_tls = start_tls  # None — STARTTLS, если сервер его поддерживает
+        self.timeout = timeout
+        self._idle = []  # [(smtp, время возврата в пул)]
+        self._slots = asyncio.Semaphore(size)
+
+        self.connects = 0
+        self.reconnects = 0
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(hostname=self.host, port=self.port, username=self.username,
+                               password=self.password, start_tls=self.start_tls, timeout=self.timeout)
+        await smtp.connect()  # вместе с STARTTLS и login
+        self.connects += 1
+        return smtp
+
+    @staticmethod
+    async def _discard(smtp):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _take(self):
+        while self._idle:
+            smtp, released = self._idle.pop()
+            if smtp.is_connected and time.monotonic() - released < SMTP_IDLE_TIMEOUT:
+                return smtp
+            await self._discard(smtp)
+        return await self._connect()
+
+    async def send(self, message):
+        """Отправляет письмо через свободное соединение; исключения aiosmtplib пробрасываются."""
+        async with self._slots:
+            smtp = await self._take()
+            try:
+                try:
+                    await smtp.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # сервер закрыл соединение, пока оно лежало в пуле — одна попытка с новым
+                    self.reconnects += 1
+                    smtp.close()
+                    smtp = await self._connect()
+                    await smtp.send_message(message)
+            except aiosmtplib.SMTPRecipientsRefused:
+                # ответ сервера про адрес, соединение исправно
+                try:
+                    await smtp.rset()
+                    self._idle.append((smtp, time.monotonic()))
+                except Exception:
+                    smtp.close()
+                raise
+            except BaseException:
+                smtp.close()
+                raise
+            self._idle.append((smtp, time.monotonic()))
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            await self._discard(smtp)
+
+
+class AttachmentCache:
+    """Закодированная MIME-часть вложения; пересобирается при изменении файла."""
+
+    def __init__(self, filename: str = ATTACHMENT_NAME):
+        self.filename = filename
+        self._parts = {}  # path -> ((mtime, size), Future[MIMEBase])
+
+        self.builds = 0
+        self.hits = 0
+
+    def _build(self, path: str):
+        with open(path, "rb") as f:
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(f.read())
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition", f'attachment; filename="{self.filename}"')
+        return part
+
+    async def get(self, path: str):
+        st = os.stat(path)
+        version = (st.st_mtime, st.st_size)
+        cached = self._parts.get(path)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return await cached[1]
+        # параллельные письма пачки ждут одну и ту же сборку
+        build = asyncio.ensure_future(asyncio.to_thread(self._build, path))
+        self._parts[path] = (version, build)
+        self.builds += 1
+        try:
+            return await build
+        except Exception:
+            if self._parts.get(path, (None, None))[1] is build:
+                del self._parts[path]
+            raise
+
+
+class Mailer:
+    """Письма с резюме: пул соединений + закэшированное вложение (+ лимит скорости, если задан per_minute)."""
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None, sender: str = None,
+                 pool_size: int = SMTP_POOL_SIZE, per_minute: float = None, burst: int = 1,
+                 start_tls: bool = None):
+        self.sender = sender or username
+        self.pool = SmtpPool(host, port, username, password, pool_size, start_tls)
+        self.attachments = AttachmentCache()
+        # По умолчанию без лимита: его держит outbox; per_minute — для вызовов в обход очереди
+        self.bucket = TokenBucket(per_minute / 60, burst) if per_minute else None
+
+        self.sent = 0
+        self.failed = 0
+        self.send_ms = 0.0
+
+    async def _message(self, to_email: str, resume_path: str):
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = to_email
+        msg["Subject"] = EMAIL_SUBJECT
+        msg.attach(MIMEText(EMAIL_BODY, "plain"))
+        # одна и та же закодированная часть во всех письмах — base64 не пересчитывается
+        msg.attach(await self.attachments.get(resume_path))
+        return msg
+
+    async def send_resume(self, to_email: str, resume_path: str):
+        """Возвращает (success, error); error "email_recipient_refused" — адрес отклонён сервером."""
+        if self.bucket is not None:
+            await self.bucket.acquire()
+        start = time.perf_counter()
+        try:
+            await self.pool.send(await self._message(to_email, resume_path))
+        except aiosmtplib.SMTPRecipientsRefused:
+            self.failed += 1
+            print(f"⚠ Адрес {to_email} отклонён SMTP-сервером")
+            return False, "email_recipient_refused"
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+            self.failed += 1
+            print(f"⚠ Ошибка отправки email {to_email}: {e}")
+            return False, f"{e.__class__.__name__}: {e}"
+        self.sent += 1
+        self.send_ms += (time.perf_counter() - start) * 1000
+        print(f"📧 Email отправлен -> {to_email}")
+        return True, None
+
+    async def send_batch(self, emails, resume_path: str):
+        """Параллельная отправка (не больше pool_size одновременно): [(success, error)] в порядке emails."""
+        return await asyncio.gather(*(self.send_resume(email, resume_path) for email in emails))
+
+    async def close(self):
+        await self.pool.close()
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "avg_send_ms": self.send_ms / self.sent if self.sent else 0.0,
+            "connects": self.pool.connects,
+            "reconnects": self.pool.reconnects,
+            "idle_connections": self.pool.idle,
+            "attachment_builds": self.attachments.builds,
+            "attachment_hits": self.attachments.hits,
+        }
@@ -0,0 +1,36 @@
+"""Реестр метрик: компоненты регистрируют функцию, возвращающую dict со счётчиками."""
+
+import html
+
+_providers = {}
+
+
+def register(name: str, provider):
+    """Регистрирует источник метрик под именем name (повторная регистрация заменяет)."""
+    _providers[name] = provider
+
+
+def collect():
+    """Снимает текущие значения всех зарегистрированных метрик."""
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
+
+
+def format_metrics(snapshot=None):
+    """Форматирует метрики в текст для ответа бота."""
+    snapshot = collect() if snapshot is None else snapshot
+    if not snapshot:
+        return "Метрик пока нет."
+    lines = []
+    for name, values in snapshot.items():
+        lines.append(f"<b>{name}</b>")
+        for key, value in values.items():
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            lines.append(f"  {key}: {html.escape(str(value))}")
+    return "\n".join(lines)
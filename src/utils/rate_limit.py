@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket: в среднем rate операций в секунду, всплеск до capacity.
+    acquire() ждёт, пока появится токен; pause(seconds) обнуляет запас и не выдаёт
+    токены до конца паузы (FloodWait и т.п.).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._updated = max(now, self._updated)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        now = time.monotonic()
+        self._tokens = 0
+        self._updated = now
+        self._paused_until = max(self._paused_until, now + seconds)
+
+    def paused_for(self) -> float:
+        """Сколько секунд ещё длится пауза."""
+        return max(0.0, self._paused_until - time.monotonic())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Проверка асинхронной отправки резюме по email (src/utils/mailer.py) на локальном
+SMTP-сервере aiosmtpd: соединения переиспользуются (login один раз на соединение),
+вложение кодируется один раз и пересобирается при изменении файла, отклонённый
+адрес возвращается ошибкой, а не проглатывается.
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+from email import message_from_bytes
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from src.utils.mailer import Mailer
+
+USER, PASSWORD = "bot@example.com", "secret"
+REFUSED = "nobody@example.com"
+
+
+class Inbox:
+    """Обработчик aiosmtpd: складывает письма, отклоняет адрес REFUSED."""
+
+    def __init__(self):
+        self.messages = []
+        self.logins = 0
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REFUSED:
+            return "550 5.1.1 User unknown"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 Message accepted"
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins += 1
+        return AuthResult(success=auth_data.login == USER.encode() and auth_data.password == PASSWORD.encode())
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run(scenario):
+    inbox = Inbox()
+    port = _free_port()
+    controller = Controller(inbox, hostname="127.0.0.1", port=port, authenticator=inbox.authenticate,
+                            auth_require_tls=False)
+    controller.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            resume = os.path.join(tmp, "resume.pdf")
+            with open(resume, "wb") as f:
+                f.write(b"%PDF-1.4 test resume")
+            mailer = Mailer("127.0.0.1", port, USER, PASSWORD, pool_size=3)
+
+            async def main():
+                try:
+                    await scenario(mailer, resume)
+                finally:
+                    await mailer.close()
+
+            asyncio.run(main())
+            return inbox, mailer
+    finally:
+        controller.stop()
+
+
+def test_batch_reuses_connections_and_attachment():
+    emails = [f"hr{i}@corp.com" for i in range(12)]
+
+    async def scenario(mailer, resume):
+        results = await mailer.send_batch(emails, resume)
+        assert results == [(True, None)] * len(emails)
+
+    inbox, mailer = _run(scenario)
+    assert sorted(m["To"] for m in inbox.messages) == sorted(emails)
+    # соединений (и login) не больше размера пула, а не по одному на письмо
+    assert mailer.pool.connects <= 3 and inbox.logins == mailer.pool.connects
+    assert mailer.attachments.builds == 1
+    attachment = inbox.messages[0].get_payload()[1]
+    assert attachment.get_filename() == "resume.pdf"
+    assert attachment.get_payload(decode=True) == b"%PDF-1.4 test resume"
+
+
+def test_attachment_rebuilt_after_file_change():
+    async def scenario(mailer, resume):
+        assert await mailer.send_resume("hr@corp.com", resume) == (True, None)
+        with open(resume, "wb") as f:
+            f.write(b"%PDF-1.4 updated resume")
+        assert await mailer.send_resume("hr@corp.com", resume) == (True, None)
+
+    inbox, mailer = _run(scenario)
+    assert mailer.attachments.builds == 2
+    assert inbox.messages[-1].get_payload()[1].get_payload(decode=True) == b"%PDF-1.4 updated resume"
+
+
+def test_refused_recipient_is_reported():
+    async def scenario(mailer, resume):
+        assert await mailer.send_resume(REFUSED, resume) == (False, "email_recipient_refused")
+        # соединение после отказа остаётся в пуле
+        assert await mailer.send_resume("hr@corp.com", resume) == (True, None)
+
+    inbox, mailer = _run(scenario)
+    assert mailer.failed == 1 and mailer.sent == 1
+    assert mailer.pool.connects == 1
+
+
+def test_unreachable_server_is_reported():
+    mailer = Mailer("127.0.0.1", _free_port(), USER, PASSWORD)
+
+    async def main():
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            success, error = await mailer.send_resume("hr@corp.com", f.name)
+        await mailer.close()
+        return success, error
+
+    success, error = asyncio.run(main())
+    assert not success and error
+
+
+if __name__ == "__main__":
+    test_batch_reuses_connections_and_attachment()
+    test_attachment_rebuilt_after_file_change()
+    test_refused_recipient_is_reported()
+    test_unreachable_server_is_reported()
+    print("\n✅ Отправка email работает")
@@ -7,9 +7,8 @@
 """
 
 import asyncio
-import sqlite3
-from src.db.database import init_db, save_job, get_job_by_hash, notification_already_sent
-from src.bot.notifications import send_job_notification
+from src.db.database import init_db, save_job, get_job_by_hash, notification_already_sent, get_stats, get_notification_recipients
+from src.bot.notifications import send_job_notification, notification_recipient
 from src.bot.bot import bot
 
 async def test_new_functionality():
@@ -65,7 +64,7 @@ async def test_new_functionality():
     # Тест 1: Отправляем уведомление первый раз
     print("\n🧪 Тест 1: Отправка уведомления...")
     try:
-        msg_id = await send_job_notification(bot, job_hash, "iliyasls")
+        msg_id = await send_job_notification(bot, job_hash)
         if msg_id and msg_id != "already_sent":
             print(f"✅ Уведомление отправлено успешно! ID сообщения: {msg_id}")
         elif msg_id == "already_sent":
@@ -78,7 +77,7 @@ async def test_new_functionality():
     # Тест 2: Пытаемся отправить уведомление повторно (должно быть заблокировано)
     print("\n🧪 Тест 2: Попытка повторной отправки...")
     try:
-        msg_id = await send_job_notification(bot, job_hash, "iliyasls")
+        msg_id = await send_job_notification(bot, job_hash)
         if msg_id == "already_sent":
             print("✅ Дублирование предотвращено - уведомление не отправлено повторно")
         else:
@@ -88,7 +87,8 @@ async def test_new_functionality():
     
     # Тест 3: Проверяем статус уведомления
     print("\n🧪 Тест 3: Проверка статуса уведомления...")
-    is_sent = notification_already_sent(job_hash, "iliyasls")
+    chat_id = get_notification_recipients()[0][0]
+    is_sent = notification_already_sent(job_hash, notification_recipient(chat_id))
     if is_sent:
         print("✅ Уведомление найдено в БД")
     else:
@@ -97,17 +97,12 @@ async def test_new_functionality():
 async def test_stats():
     """Тестирует команду статистики"""
     
-    with sqlite3.connect("data/db.sqlite3") as conn:
-        # Общее количество вакансий
-        total_jobs = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
-        
-        # Количество отправленных резюме
-        total_sent = conn.execute("SELECT COUNT(*) FROM jobs_sent").fetchone()[0]
-        
-        # Статистика уведомлений
-        confirmed = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'confirmed'").fetchone()[0]
-        skipped = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'skipped'").fetchone()[0]
-        pending = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'pending'").fetchone()[0]
+    stats = get_stats()
+    total_jobs = stats["total_jobs"]
+    total_sent = stats["total_sent"]
+    confirmed = stats["confirmed"]
+    skipped = stats["skipped"]
+    pending = stats["pending"]
     
     print(f"\n📊 Статистика:")
     print(f"   Всего вакансий: {total_jobs}")
@@ -4,8 +4,7 @@
 """
 
 import asyncio
-import sqlite3
-from src.db.database import init_db, save_job, get_job_by_hash
+from src.db.database import init_db, save_job, get_job_by_hash, get_stats
 from src.bot.notifications import send_job_notification
 from src.bot.bot import bot
 
@@ -60,7 +59,7 @@ async def test_notification():
     # Отправляем уведомление
     print("📨 Отправляем тестовое уведомление...")
     try:
-        msg_id = await send_job_notification(bot, job_hash, "iliyasls")
+        msg_id = await send_job_notification(bot, job_hash)
         if msg_id:
             print(f"✅ Уведомление отправлено успешно! ID сообщения: {msg_id}")
         else:
@@ -71,24 +70,19 @@ async def test_notification():
 async def test_stats():
     """Тестирует команду статистики"""
     
-    with sqlite3.connect("data/db.sqlite3") as conn:
-        # Общее количество вакансий
-        total_jobs = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
-        
-        # Количество отправленных резюме
-        total_sent = conn.execute("SELECT COUNT(*) FROM jobs_sent").fetchone()[0]
-        
-        # Статистика уведомлений
-        applied = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'applied'").fetchone()[0]
-        not_applied = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'not_applied'").fetchone()[0]
-        pending = conn.execute("SELECT COUNT(*) FROM job_notifications WHERE status = 'pending'").fetchone()[0]
+    stats = get_stats()
+    total_jobs = stats["total_jobs"]
+    total_sent = stats["total_sent"]
+    confirmed = stats["confirmed"]
+    skipped = stats["skipped"]
+    pending = stats["pending"]
     
     print(f"📊 Статистика:")
     print(f"   Всего вакансий: {total_jobs}")
     print(f"   Отправлено резюме: {total_sent}")
     print(f"   Уведомления:")
-    print(f"     - Откликнулся: {applied}")
-    print(f"     - Пропустил: {not_applied}")
+    print(f"     - Подтверждено: {confirmed}")
+    print(f"     - Пропущено: {skipped}")
     print(f"     - Ожидает: {pending}")
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Проверка очереди отправок (src/bot/outbox.py) на временной БД: две вакансии
+одного рекрутера в одной выборке не должны уйти ему параллельно — резюме
+отправляется один раз, вторая строка закрывается как already_sent.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from src.bot.outbox import OutboxScheduler
+from src.db import async_db, database
+
+
+def test_one_send_per_recipient_in_batch():
+    sends = []
+
+    async def send(recipient, job_hash):
+        sends.append((recipient, job_hash))
+        await asyncio.sleep(0.05)  # обе строки успели бы пройти already_sent до mark_sent
+        return True, None
+
+    async def main():
+        await async_db.enqueue_outbox("job_a", [("telegram", "@Recruiter")])
+        await async_db.enqueue_outbox("job_b", [("telegram", "recruiter")])
+        scheduler = OutboxScheduler(rates={"telegram": (6000, 100)}, concurrency={"telegram": 4})
+        scheduler.set_sender("telegram", send)
+        await scheduler._drain(scheduler.channels["telegram"])
+        return scheduler.channels["telegram"], await async_db.get_outbox_for_job("job_b")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "outbox.sqlite3")
+        try:
+            database.init_db()
+            channel, job_b = asyncio.run(main())
+        finally:
+            database.close_connections()
+
+    assert sends == [("@Recruiter", "job_a")]
+    assert channel.sent == 1 and channel.skipped == 1 and channel.deferred == 1
+    assert [status for _, _, status, _, _ in job_b] == ["skipped"]
+
+
+if __name__ == "__main__":
+    test_one_send_per_recipient_in_batch()
+    print("\n✅ Очередь отправок: одна отправка на получателя")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Проверка планов горячих запросов: после миграций ни один из них не должен
+делать полный проход по таблице (SCAN без индекса).
+
+SQL берётся не из копий, а перехватывается у настоящих функций database.py
+(set_trace_callback), затем для каждого запроса смотрим EXPLAIN QUERY PLAN.
+"""
+
+import functools
+import os
+import re
+import tempfile
+
+from src.db import database
+from src.db.retention import RETENTION_POLICIES
+
+# "SCAN jobs_sent" — полный проход; "SCAN ... USING [COVERING] INDEX" — проход по индексу
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+
+
+def hot_calls():
+    """Функции, которые выполняются на каждое сообщение / уведомление / команду бота."""
+    calls = {
+        "save_job": lambda: database.save_job("Ищем Python-разработчика", "chat", "1", 0.9, ["@hr"], [], []),
+        "already_sent": lambda: database.already_sent("@hr", "hash"),
+        "mark_sent": lambda: database.mark_sent("@hr", "hash"),
+        "get_job_by_hash": lambda: database.get_job_by_hash("hash"),
+        "notification_already_sent": lambda: database.notification_already_sent("hash", "chat_1"),
+        "get_job_notification_status": lambda: database.get_job_notification_status("hash", "chat_1"),
+        "save_job_notification": lambda: database.save_job_notification("hash", "42", "chat_1"),
+        "update_notification_status": lambda: database.update_notification_status("42", "confirmed"),
+        "get_pending_notifications_count": database.get_pending_notifications_count,
+        "get_stats": database.get_stats,
+        "get_jobs_by_contact": lambda: database.get_jobs_by_contact("@Recruiter_X"),
+        "count_jobs_by_contact": lambda: database.count_jobs_by_contact("hr@corp.com", "email"),
+        "get_link_cache": lambda: database.get_link_cache("https://example.com/"),
+        "get_cluster_signatures": lambda: database.get_cluster_signatures(100),
+        # /jobs: первая страница — проход по rowid с конца (LIMIT), дальше — курсор по id
+        "get_jobs_page:older": lambda: database.get_jobs_page(before_id=1000, min_prob=0.6),
+        "get_jobs_page:newer": lambda: database.get_jobs_page(after_id=1000, has_contacts=True),
+        "get_jobs_page:chat": lambda: database.get_jobs_page(before_id=1000, chat_id="-100123"),
+        "get_jobs_page:dates": lambda: database.get_jobs_page(since="2026-10-01", until="2026-10-02"),
+        # Очередь отправок (src/bot/outbox.py)
+        "get_due_outbox": lambda: database.get_due_outbox("telegram", 1e10, 20),
+        "get_next_outbox_attempt": lambda: database.get_next_outbox_attempt("telegram"),
+        "get_outbox_backlog": database.get_outbox_backlog,
+        "get_outbox_for_job": lambda: database.get_outbox_for_job("hash"),
+        "get_job_notifications": lambda: database.get_job_notifications("hash"),
+        "finish_outbox": lambda: database.finish_outbox(1, "sent"),
+        "retry_outbox": lambda: database.retry_outbox(1, 0, "floodwait_5s", count_attempt=False),
+        "get_peer_cache": lambda: database.get_peer_cache("@hr"),
+        "get_recent_contact_peers": lambda: database.get_recent_contact_peers(5000, 0),
+        "get_digest_items": lambda: database.get_digest_items("1"),
+        "finish_digest": lambda: database.finish_digest("1", "42", ["hash"]),
+        "get_recent_sent": lambda: database.get_recent_sent(24 * 60 * 60),
+        "get_uploaded_file": lambda: database.get_uploaded_file("data/resume.pdf"),
+    }
+    # Пачки планировщика очистки — по одной на каждую политику хранения
+    for table, (column, cutoff, *condition) in RETENTION_POLICIES.items():
+        calls[f"retention:{table}"] = functools.partial(database.delete_expired_chunk, table, column, cutoff, 500,
+                                                        *condition)
+    return calls
+
+
+def collect_plans():
+    plans = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "plans.sqlite3")
+        try:
+            database.init_db()
+            conn = database.get_connection()
+            for name, call in hot_calls().items():
+                statements = []
+                conn.set_trace_callback(statements.append)
+                try:
+                    call()
+                finally:
+                    conn.set_trace_callback(None)
+                for sql in statements:
+                    if not re.match(r"\s*(SELECT|UPDATE|DELETE)\b", sql, re.IGNORECASE):
+                        continue
+                    details = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                    plans.setdefault(name, []).append((" ".join(sql.split()), details))
+        finally:
+            database.close_connections()
+    return plans
+
+
+def test_no_full_scans():
+    plans = collect_plans()
+    assert set(plans) >= {"already_sent", "notification_already_sent", "get_job_notification_status",
+                          "update_notification_status", "get_job_by_hash"}
+    full_scans = [
+        f"{name}: {sql} -> {detail}"
+        for name, queries in plans.items()
+        for sql, details in queries
+        for detail in details
+        if FULL_SCAN_RE.match(detail)
+    ]
+    assert not full_scans, "Полный проход по таблице:\n" + "\n".join(full_scans)
+
+
+def test_migrations_are_idempotent():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "migrations.sqlite3")
+        try:
+            database.init_db()
+            version = database.get_schema_version()
+            database.init_db()
+            assert version == database.MIGRATIONS[-1][0]
+            assert database.get_schema_version() == version
+        finally:
+            database.close_connections()
+
+
+if __name__ == "__main__":
+    for name, queries in collect_plans().items():
+        print(f"\n🔎 {name}")
+        for sql, details in queries:
+            print(f"   {sql[:100]}")
+            for detail in details:
+                mark = "❌" if FULL_SCAN_RE.match(detail) else "✅"
+                print(f"      {mark} {detail}")
+    test_no_full_scans()
+    test_migrations_are_idempotent()
+    print("\n✅ Полных проходов по таблицам нет")